@@ -0,0 +1,97 @@
+''' Time the queries of inventory.analytics on a generated adjacency list.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_analytics --size 10000 --links 100000
+
+    Every link is reported by both of its ends, so --links 50000 is 100k
+    edges - neighbor records, as inventory.topology counts them.
+
+    The diff is taken against a copy of the adjacency list with --changes
+    links removed, devices added and versions changed - from the adjacency
+    lists, and from the files as diff_files() reads them. The topology is
+    loaded links_only, as inventory.analytics loads it - the full store is
+    timed too, to compare.
+'''
+import argparse
+import copy
+import json
+import os
+import random
+import tempfile
+import time
+
+from inventory.analytics import Graph, diff, diff_files
+from inventory.topology import Topology
+from benchmarks.topology import adjacency_list
+
+
+def changed_copy(adj_list, changes, seed):
+    ''' adj_list with changes links removed, leaf devices added and versions changed '''
+    rng = random.Random(seed)
+    adj_list = copy.deepcopy(adj_list)
+    names = sorted(adj_list)
+    for i in range(changes):
+        device = adj_list[rng.choice(names)]
+        if len(device) > 1:
+            local_intf = rng.choice(sorted(device))
+            neighbor = device.pop(local_intf)
+            adj_list[neighbor['device_name']].pop(neighbor['remote_interface'], None)
+        device = adj_list[rng.choice(names)]
+        device['Gi9/0/{}'.format(i)] = dict(device_name='NEW{}.example.com'.format(i),
+                                            remote_interface='Gi0/1', device_class='cisco_ios')
+        for neighbor in adj_list[rng.choice(names)].values():
+            neighbor['os_version'] = 'upgraded'
+    return adj_list
+
+
+def timed(label, func, *args):
+    start = time.time()
+    result = func(*args)
+    print('{:30} {:8.3f}s'.format(label, time.time() - start))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--links', type=int, default=100000)
+    parser.add_argument('--changes', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    adj_list = adjacency_list(args.size, args.links, seed=args.seed)
+    # sparse enough to have single points of failure
+    tree = adjacency_list(args.size, args.size + args.size // 10, seed=args.seed)
+    newer = changed_copy(adj_list, args.changes, args.seed)
+
+    timed('Topology.from_adj_list', Topology.from_adj_list, adj_list)
+    topology = timed('  links_only', Topology.from_adj_list, adj_list, True)
+    graph = timed('Graph', Graph, topology)
+    names = topology.names
+    path = timed('shortest_path', graph.shortest_path, names[0], names[-1])
+    components = timed('components', graph.components)
+    points = timed('articulation_points', graph.articulation_points)
+    bridges = timed('bridges', graph.bridges)
+    print('  {} hops, {} components, {} articulation points, {} bridges'.format(
+        len(path) - 1, len(components), len(points), len(bridges)))
+
+    sparse = Graph(Topology.from_adj_list(tree, links_only=True))
+    points = timed('articulation_points (sparse)', sparse.articulation_points)
+    bridges = timed('bridges (sparse)', sparse.bridges)
+    print('  {} articulation points, {} bridges'.format(len(points), len(bridges)))
+
+    result = timed('diff', diff, adj_list, newer)
+    print('  ' + ', '.join('{} {}'.format(len(value), field) for field, value in result._asdict().items()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, name) for name in ('old.json', 'new.json')]
+        for path, adjacency in zip(paths, (adj_list, newer)):
+            with open(path, 'w') as fh:
+                fh.write(json.dumps(adjacency))
+        print('  {:.1f} MB per file'.format(os.path.getsize(paths[0]) / 1e6))
+        timed('diff_files', diff_files, *paths)
+
+
+if __name__ == '__main__':
+    main()
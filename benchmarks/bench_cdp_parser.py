@@ -0,0 +1,84 @@
+''' Compare the old whole-output CDP regexes with the per-record parser.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_cdp_parser
+
+    The old path is the regex discover_neighbors used to compile on every
+    call and run with finditer over the whole output. The new path is
+    BaseParser.parse_neighbors, which splits the output into one record
+    per neighbor and parses each one on its own.
+
+    Every size is run twice: once with every neighbor advertising an IP
+    address, and once with some neighbors advertising none. The old regex
+    has to scan into the following records to find an address for those,
+    which is where its lazy spans backtrack.
+'''
+import argparse
+import re
+import timeit
+
+from parsers.cisco import CiscoBaseParser, CiscoNxosParser
+from benchmarks.cdp_samples import cdp_output, IOS_RECORD, NXOS_RECORD
+
+OLD_IOS_REGEX = "Device ID: (?P<device_device>[\w\d\_\-\.]+)[\W\w]+?\n"\
+   "\s+IP [Aa]ddress: (?P<device_ip>[0-9\.]+)\n" \
+   "(?:\s+IPv6 address: (?P<device_ipv6>[a-z0-9\:]+)(?:\s+\(global unicast\)\n)?)?" \
+   "[\n\W\w]*?" \
+   "Platform:\s*[Cc]isco\s(?P<device_model>[\w\d\-\_\.]+)[\W\w\s]+?\n" \
+   "Interface: (?P<local_interface>[A-Za-z0-9/\-]+)" \
+   ".*: (?P<device_interface>[A-Za-z0-9/\-]+)\n" \
+   "[\n\W\w\S\s]*?" \
+   "Version.*\n" \
+   "(?P<device_version>[\w\W]+?)\n"
+
+OLD_NXOS_REGEX = "Device ID:(?P<device_name>[\w\d\_\-\.]+)[\W\w]+?\n"\
+   "\s+IPv4 [Aa]ddress: (?P<device_ip>[0-9\.]+)\n" \
+   "(?:\s+IPv6 [Aa]ddress: (?!fe80)(?P<device_ipv6>[a-z0-9\:]+)\n)?" \
+   "[\n\W\w]*?" \
+   "Platform:\s*(?P<device_model>[\w\d\-\_\.]+)[\W\w\s]+?\n" \
+   "Interface: (?P<local_interface>[A-Za-z0-9/]+)" \
+   ".*: (?P<device_interface>[A-Za-z0-9/\-]+)\n" \
+   "[\n\W\w\S\s]*?" \
+   "Version.*\n" \
+   "(?P<device_version>[\w\W]+?)\n"
+
+
+def old_parse(regex, output):
+    re.purge()
+    neighbor_re = re.compile(regex)
+    return [n.groupdict() for n in neighbor_re.finditer(output) if n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 250, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-ip-every', type=int, default=10,
+                        help='every Nth neighbor of the second run has no IP address')
+    args = parser.parse_args()
+
+    cases = (('ios', IOS_RECORD, OLD_IOS_REGEX, CiscoBaseParser('bench', None)),
+             ('nxos', NXOS_RECORD, OLD_NXOS_REGEX, CiscoNxosParser('bench', None)))
+
+    print('{:<6} {:>7} {:>9} {:>9} {:>9} {:>12} {:>12} {:>8}'.format(
+        'os', 'no-ip', 'neighbors', 'old found', 'new found',
+        'old nbrs/s', 'new nbrs/s', 'speedup'))
+    for os_name, record, old_regex, device in cases:
+        for no_ip_every in (0, args.no_ip_every):
+            for size in args.sizes:
+                output = cdp_output(size, record, no_ip_every)
+                old_found = len(old_parse(old_regex, output))
+                new_found = len(device.parse_neighbors(output))
+
+                old = min(timeit.repeat(lambda: old_parse(old_regex, output),
+                                        number=1, repeat=args.repeat))
+                new = min(timeit.repeat(lambda: device.parse_neighbors(output),
+                                        number=1, repeat=args.repeat))
+                print('{:<6} {:>7} {:>9} {:>9} {:>9} {:>12.0f} {:>12.0f} {:>7.1f}x'.format(
+                    os_name, no_ip_every or '-', size, old_found, new_found,
+                    size / old, size / new, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+''' Compare the level-by-level thread pool crawl with the asyncio crawl.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_crawl_engines --size 2000 --concurrency 16
+
+    Both engines crawl the same simulated topology. The level barrier of the
+    thread pool engine shows up as idle worker time: a slow device holds up
+    the whole level while the other workers wait for the next one.
+'''
+import argparse
+import time
+
+from inventory.crawler import ENGINES
+from benchmarks.topology import SimulatedTopology
+
+
+def run_engine(name, topology, concurrency):
+    engine = ENGINES[name]
+    start = time.time()
+    adj_list, failed = engine(topology.root, topology.neighbors(topology.root),
+                              topology.visit, concurrency=concurrency)
+    return time.time() - start, adj_list, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mean-latency', type=float, default=0.005)
+    parser.add_argument('--slow-fraction', type=float, default=0.01)
+    parser.add_argument('--fail-fraction', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    topology = SimulatedTopology(args.size, seed=args.seed, mean_latency=args.mean_latency,
+                                 slow_fraction=args.slow_fraction,
+                                 fail_fraction=args.fail_fraction)
+    # ideal wall time if workers were never idle
+    busy = sum(topology.latency.values()) - topology.latency[topology.root]
+    print('{} devices, {} workers, ideal {:.2f}s'.format(
+        args.size, args.concurrency, busy / args.concurrency))
+
+    results = {}
+    for name in sorted(ENGINES):
+        elapsed, adj_list, failed = run_engine(name, topology, args.concurrency)
+        results[name] = (adj_list, sorted(failed))
+        print('{:<12} {:8.2f}s  {:6d} visited  {:4d} failed  {:8.1f} nodes/s  {:5.1f}% utilization'.format(
+            name, elapsed, len(adj_list), len(failed), len(adj_list) / elapsed,
+            100.0 * busy / (elapsed * args.concurrency)))
+
+    first = results[sorted(ENGINES)[0]]
+    if any(result != first for result in results.values()):
+        raise SystemExit('engines returned different adjacency/failed lists!')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+''' Makespan of a crawl with a FIFO frontier against a prioritized one.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_frontier --size 2000 --concurrency 16
+
+    The simulated devices take per_neighbor_latency for each of their CDP
+    neighbors on top of their own latency, so the cores and distribution
+    switches are the long visits, along with the few slow devices. Each
+    engine crawls the topology with the devices queued
+
+        fifo        in the order they were found
+        model       by model class only, as on a first run
+        history     by model class, then visit time and degree in the
+                    previous crawl
+
+    The previous crawl is the topology's own latencies and neighbors, as
+    if it was crawled the night before. The crawl starts from an access
+    switch, as it does when the root is not a core.
+'''
+import argparse
+import time
+
+from inventory.crawler import ENGINES
+from inventory.frontier import DevicePriority, degrees_of
+from benchmarks.topology import SimulatedTopology
+
+
+def run_engine(name, topology, root, concurrency, priority):
+    start = time.time()
+    adj_list, failed = ENGINES[name](root, topology.neighbors(root),
+                                     topology.visit, concurrency=concurrency, priority=priority)
+    return time.time() - start, adj_list, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--engine', choices=sorted(ENGINES), action='append',
+                        help='engines to run (default: threadpool and asyncio)')
+    parser.add_argument('--mean-latency', type=float, default=0.005)
+    parser.add_argument('--per-neighbor-latency', type=float, default=0.005)
+    parser.add_argument('--slow-fraction', type=float, default=0.01)
+    parser.add_argument('--fail-fraction', type=float, default=0.01)
+    parser.add_argument('--root', help='device the crawl starts from (default: the last access switch)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    topology = SimulatedTopology(args.size, seed=args.seed, mean_latency=args.mean_latency,
+                                 slow_fraction=args.slow_fraction,
+                                 fail_fraction=args.fail_fraction,
+                                 per_neighbor_latency=args.per_neighbor_latency)
+    root = args.root or topology.names[-1]
+    previous = dict((name, topology.neighbors(name)) for name in topology.names)
+    priorities = (('fifo', None),
+                  ('model', DevicePriority()),
+                  ('history', DevicePriority(degrees_of(previous), topology.latency)))
+
+    # no schedule can beat the busy time spread over every worker, nor the
+    # longest single visit
+    latencies = [latency for name, latency in topology.latency.items() if name != root]
+    bound = max(sum(latencies) / args.concurrency, max(latencies))
+    print('{} devices, {} workers, lower bound {:.2f}s'.format(args.size, args.concurrency, bound))
+
+    for engine in args.engine or ('threadpool', 'asyncio'):
+        results = {}
+        for label, priority in priorities:
+            elapsed, adj_list, failed = run_engine(engine, topology, root, args.concurrency, priority)
+            results[label] = (adj_list, sorted(failed))
+            print('{:<12} {:<14} makespan {:7.2f}s  {:5.2f}x lower bound  {:6d} visited  {:4d} failed'.format(
+                engine, label, elapsed, elapsed / bound, len(adj_list), len(failed)))
+        if any(result != results['fifo'] for result in results.values()):
+            raise SystemExit('{}: the order of the frontier changed the adjacency/failed lists!'.format(engine))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+''' Import time of the crawl's modules, from python -X importtime.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_import_time
+        python -m benchmarks.bench_import_time --check --budget 150
+
+    Every module is imported in a fresh interpreter. Reports the time it
+    took with everything it imported, the slowest of those, and any of the
+    HEAVY packages it pulled in - django, netmiko/paramiko and xmltodict
+    are only meant to be imported when a crawl starts or a device is
+    visited. With --check the exit status is 1 if a module cannot be
+    imported, imports one of them or takes longer than --budget ms, so a
+    regression fails CI.
+'''
+import argparse
+import subprocess
+import sys
+
+MODULES = ('inventory.crawler', 'inventory.retry', 'inventory.frontier',
+           'inventory.topology', 'inventory.analytics', 'inventory.persistence',
+           'parsers.registry', 'parsers.base', 'parsers.cisco', 'parsers.sessions',
+           'inventory.gather_inventory')
+
+HEAVY = ('django', 'netmiko', 'paramiko', 'xmltodict')
+
+
+def import_times(module):
+    '''
+    [(name, self us, cumulative us)] of module and everything it imported,
+    module last, as python -X importtime reports them - not what the
+    interpreter imports at startup. Raises RuntimeError if the import fails
+    '''
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    times, errors = [], []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            # the header line
+            continue
+        # nested imports are indented by two spaces per level
+        name = fields[2].rstrip()
+        times.append((name.strip(), int(fields[0]), int(fields[1]), name[:2] != '  '))
+    if proc.returncode:
+        raise RuntimeError(errors[-1] if errors else 'exit status {}'.format(proc.returncode))
+    # the import of module is the last top level line, what it imported is
+    # listed after the top level line before it
+    end = max(i for i, (name, _, _, top) in enumerate(times) if top and name == module)
+    start = max([i + 1 for i, (_, _, _, top) in enumerate(times[:end]) if top] or [0])
+    return [(name, own, cumulative) for name, own, cumulative, _ in times[start:end + 1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--top', type=int, default=3, help='slowest imports shown per module')
+    parser.add_argument('--budget', type=float, default=150.0, help='ms allowed per module')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with status 1 if a module fails to import, is over budget '
+                             'or imports a HEAVY package')
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        try:
+            times = import_times(module)
+        except RuntimeError as e:
+            print('{:<28} could not be imported - {}'.format(module, e))
+            failures.append(module)
+            continue
+        total = times[-1][2] / 1000.0
+        heavy = sorted(set(name.split('.')[0] for name, _, _ in times
+                           if name.split('.')[0] in HEAVY))
+        slowest = sorted(((cumulative, name) for name, _, cumulative in times
+                          if '.' not in name and name != module.split('.')[0]),
+                         reverse=True)[:args.top]
+        print('{:<28} {:7.1f} ms  {}{}'.format(
+            module, total, ', '.join('{} {:.1f}'.format(name, us / 1000.0) for us, name in slowest),
+            '  HEAVY: {}'.format(', '.join(heavy)) if heavy else ''))
+        if heavy or total > args.budget:
+            failures.append(module)
+
+    if args.check and failures:
+        raise SystemExit('failing to import, over budget or importing {}: {}'.format(
+            '/'.join(HEAVY), ', '.join(failures)))
+
+
+if __name__ == '__main__':
+    main()
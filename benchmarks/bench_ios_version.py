@@ -0,0 +1,77 @@
+''' Facts per second out of IOS / IOS-XE 'show version': the four
+    separate regex searches CiscoBaseParser used to run against the single
+    pass of parsers.cisco.version_facts().
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_ios_version --repeat 2000
+
+    The corpus is in benchmarks/version_samples.py. Both paths are checked
+    against the facts expected of each sample.
+'''
+import argparse
+import re
+import time
+
+from parsers.cisco import version_facts
+from parsers.general_functions import parse_uptime
+from benchmarks.version_samples import SAMPLES
+
+
+def four_scan_facts(version):
+    ''' what CiscoBaseParser.find_* did before version_facts() '''
+    facts = {}
+    match = re.search(r'Cisco IOS Software, (.*)', version)
+    facts['os_version'] = match.group(1) if match else None
+    match = re.search(r'Processor board ID (.*)', version)
+    facts['serial_number'] = match.group(1) if match else None
+    match = re.search(r'uptime is (.*)', version)
+    facts['uptime'] = parse_uptime(match.group(1)) if match else None
+    match = re.search(r'.*bytes of (physical )?memory', version)
+    facts['model'] = match.group().split()[1] if match else None
+    return facts
+
+
+def single_pass_facts(version):
+    facts = version_facts(version)
+    if facts['uptime']:
+        facts['uptime'] = parse_uptime(facts['uptime'])
+    return facts
+
+
+def facts_per_second(func, outputs, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        for output in outputs:
+            func(output)
+    return repeat * len(outputs) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    outputs = [output for _, output, _ in SAMPLES]
+    print('{} samples, {:.1f} KB on average'.format(
+        len(outputs), sum(len(output) for output in outputs) / 1024.0 / len(outputs)))
+
+    for name, output, expected in SAMPLES:
+        for label, func in (('four scans', four_scan_facts), ('single pass', single_pass_facts)):
+            wrong = sorted(field for field, value in func(output).items()
+                           if value != expected[field])
+            if wrong:
+                print('  {:22} {:12} wrong: {}'.format(name, label, ', '.join(wrong)))
+
+    old_rate = facts_per_second(four_scan_facts, outputs, args.repeat)
+    new_rate = facts_per_second(single_pass_facts, outputs, args.repeat)
+    print('four scans  {:10.0f} devices/s'.format(old_rate))
+    print('single pass {:10.0f} devices/s  ({:.1f}x)'.format(new_rate, new_rate / old_rate))
+
+    for name, output, expected in SAMPLES:
+        if single_pass_facts(output) != expected:
+            raise SystemExit('{}: {} != {}'.format(name, single_pass_facts(output), expected))
+
+
+if __name__ == '__main__':
+    main()
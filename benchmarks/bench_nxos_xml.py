@@ -0,0 +1,78 @@
+''' Compare the NX-OS facts extraction: xmltodict + find_key against the
+    pull parser in parsers/xml_facts.py.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_nxos_xml --repeat 200
+
+    Both paths get the same fields out of the 'show version | xml' and
+    'show inventory | xml' of a fully loaded Nexus 7K chassis.
+'''
+import argparse
+import time
+
+import xmltodict
+
+from parsers.cisco import CiscoNxosParser
+from parsers.xml_facts import extract_fields
+from benchmarks.nxos_samples import inventory_xml, version_xml
+
+
+def find_key(obj, key):
+    '''recursive function to find key containing desired key in the XML dict'''
+    if key in obj:
+        return obj[key]
+    for val in obj.values():
+        if isinstance(val, dict):
+            result = find_key(val, key)
+            if result:
+                return result
+
+
+def xmltodict_facts(version, inventory):
+    ''' what CiscoNxosParser did before parsers/xml_facts.py '''
+    version_data = find_key(xmltodict.parse(version), '__readonly__')
+    inv_data = find_key(xmltodict.parse(inventory), 'ROW_inv')[0]
+    facts = dict((field, version_data[field]) for field in
+                 CiscoNxosParser.version_fields + CiscoNxosParser.version_optional_fields
+                 if field in version_data)
+    facts['productid'] = inv_data['productid']
+    return facts
+
+
+def pull_parser_facts(version, inventory):
+    facts = extract_fields(version, CiscoNxosParser.version_fields,
+                           CiscoNxosParser.version_optional_fields)
+    facts.update(extract_fields(inventory, CiscoNxosParser.inventory_fields))
+    return facts
+
+
+def timed(func, repeat, *args):
+    start = time.time()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--slots', type=int, default=18)
+    args = parser.parse_args()
+
+    version, inventory = version_xml(), inventory_xml(slots=args.slots)
+    print('show version | xml: {:.1f} KB, show inventory | xml: {:.1f} KB'.format(
+        len(version) / 1024.0, len(inventory) / 1024.0))
+
+    old_time, old_facts = timed(xmltodict_facts, args.repeat, version, inventory)
+    new_time, new_facts = timed(pull_parser_facts, args.repeat, version, inventory)
+    print('xmltodict + find_key {:8.3f} ms per device'.format(1000 * old_time))
+    print('pull parser          {:8.3f} ms per device  ({:.1f}x)'.format(
+        1000 * new_time, old_time / new_time))
+
+    if old_facts != new_facts:
+        raise SystemExit('extracted facts differ!\n{}\n{}'.format(old_facts, new_facts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+''' Crawl a simulated network through the real parsers.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_replay --size 2000 --engine asyncio
+
+    Every device is logged into, discovered and has its facts gathered by
+    parsers/cisco.py, over the simulated SSH backend in parsers/simulated.py
+    instead of netmiko, with the session pool gather_inventory uses. Reports
+    nodes/sec, p50/p99 per-device visit time and the peak RSS of the
+    process (and of the worker processes, for the multiprocess engine).
+
+    Every device is visited by gather_inventory.visit_device, the visit
+    the crawl itself makes, with no database writer. The one log line per
+    device it prints is thrown away unless --log is given.
+
+    Discovery and facts commands go out as one batch per device, the way
+    gather_inventory sends them. --no-batch sends them one send_command at
+    a time instead, to compare.
+
+    With --latency-profile PATH the parsers time every command into the
+    profile at PATH and, from the second run on, time out commands from it
+    (see parsers/latency.py). A hung command (--command-failure-rate) then
+    costs its learned timeout instead of the default one.
+
+    --aaa-rate and --block-sessions make the simulated network refuse
+    logins the way a throttling AAA server and devices out of VTY lines do.
+    --max-per-group and --login-rate set the session pool limits that keep
+    a wide crawl under them (see parsers/sessions.py):
+
+        python -m benchmarks.bench_replay --concurrency 200 --aaa-rate 50 --block-sessions 32
+        python -m benchmarks.bench_replay --concurrency 200 --aaa-rate 50 --block-sessions 32 \
+            --max-per-group 32 --login-rate 45
+
+    Devices that fail on a timeout or a dropped session are retried after
+    the crawl, up to --retry-attempts visits (see inventory/retry.py).
+    --connect-failure-rate makes logins fail at random, the way a
+    congested link does, to compare:
+
+        python -m benchmarks.bench_replay --connect-failure-rate 0.05 --retry-attempts 1
+        python -m benchmarks.bench_replay --connect-failure-rate 0.05 --retry-attempts 3
+
+    With --recorded DIR the outputs captured from real devices in DIR are
+    replayed instead of a generated topology.
+'''
+import argparse
+from collections import Counter, namedtuple
+import contextlib
+import functools
+import os
+import resource
+import time
+
+from inventory.crawl_state import CrawlState
+from inventory.crawler import ENGINES
+from inventory.gather_inventory import visit_device
+from inventory.retry import RetryPolicy, crawl_with_retries
+from parsers.base import facts_stats
+from parsers.metrics import metrics
+from parsers.latency import LatencyProfile
+from parsers.sessions import SessionPool
+from parsers.simulated import RecordedNetwork
+from benchmarks.topology import SimulatedTopology
+
+Credentials = namedtuple('Credentials', 'username password')
+
+CREDENTIALS = Credentials('bench', 'bench')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def peak_rss_mb():
+    ''' peak RSS of this process and of its finished children, in MB (Linux reports KB) '''
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024.0, children / 1024.0
+
+
+def run(engine_name, network, root_name, root_class, concurrency, domains, batch=True,
+        latency_profile=None, session_options=None, retry_policy=None, log=False):
+    session_pool = SessionPool(max_sessions=concurrency * 2, **(session_options or {}))
+    visit = functools.partial(visit_device, session_pool=session_pool,
+                              latency_profile=latency_profile, credentials=CREDENTIALS,
+                              batch=batch)
+    elapsed_times = []
+
+    def on_result(result):
+        if result.elapsed is not None:
+            elapsed_times.append(result.elapsed)
+
+    engine_options = dict(concurrency=concurrency, on_result=on_result)
+    if engine_name == 'multiprocess':
+        engine_options['teardown'] = session_pool.close_all
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(network.installed())
+        if not log:
+            devnull = stack.enter_context(open(os.devnull, 'w'))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        start = time.time()
+        for attempt in range(retry_policy.attempts if retry_policy else 1):
+            root = visit(dict(device_name=root_name, device_class=root_class))
+            if root.neighbors is not None:
+                break
+        if root.neighbors is None:
+            raise SystemExit('could not crawl the root {}'.format(root_name))
+        state = CrawlState(domains=domains, metrics=metrics)
+        adj_list, failed = crawl_with_retries(ENGINES[engine_name], root_name, root.neighbors,
+                                              visit, state=state, policy=retry_policy,
+                                              **engine_options)
+        elapsed = time.time() - start
+        session_pool.close_all()
+
+    return elapsed, adj_list, state.failure_report(), elapsed_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='asyncio')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--handshake-latency', type=float, default=0.02)
+    parser.add_argument('--command-latency', type=float, default=0.01)
+    parser.add_argument('--round-trip-latency', type=float, default=0.005)
+    parser.add_argument('--delay-padding', type=float, default=0.01,
+                        help='seconds send_command waits per unit of delay_factor')
+    parser.add_argument('--slow-fraction', type=float, default=0.01)
+    parser.add_argument('--unreachable-fraction', type=float, default=0.01)
+    parser.add_argument('--connect-failure-rate', type=float, default=0.0)
+    parser.add_argument('--command-failure-rate', type=float, default=0.0)
+    parser.add_argument('--retry-attempts', type=int, default=3,
+                        help='max visits of a device that fails on a timeout or connection error')
+    parser.add_argument('--retry-backoff', type=float, default=0.5)
+    parser.add_argument('--aaa-rate', type=int, help='logins per second the simulated AAA takes')
+    parser.add_argument('--block-sessions', type=int,
+                        help='sessions a simulated /24 of devices takes at once')
+    parser.add_argument('--max-per-group', type=int, help='session pool limit per /24')
+    parser.add_argument('--login-rate', type=float, help='session pool new logins per second')
+    parser.add_argument('--login-burst', type=float)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-json', action='store_true',
+                        help="simulate NX-OS releases that don't answer '| json'")
+    parser.add_argument('--no-batch', action='store_true',
+                        help='send commands one at a time instead of in one batch per device')
+    parser.add_argument('--latency-profile', metavar='PATH',
+                        help='learn command timeouts in the profile at PATH')
+    parser.add_argument('--recorded', metavar='DIR',
+                        help='replay outputs recorded in DIR instead of a generated topology')
+    parser.add_argument('--root', help='root device of the recorded network')
+    parser.add_argument('--root-class', default='cisco_ios')
+    parser.add_argument('--metrics-textfile', help='write the Prometheus metrics of the run here')
+    parser.add_argument('--log', action='store_true', help='print the log line of every device')
+    args = parser.parse_args()
+
+    options = dict(seed=args.seed, handshake_latency=args.handshake_latency,
+                   default_latency=args.command_latency,
+                   round_trip_latency=args.round_trip_latency,
+                   delay_padding=args.delay_padding, slow_fraction=args.slow_fraction,
+                   unreachable_fraction=args.unreachable_fraction,
+                   connect_failure_rate=args.connect_failure_rate,
+                   command_failure_rate=args.command_failure_rate,
+                   aaa_rate=args.aaa_rate, block_sessions=args.block_sessions)
+    session_options = dict(max_per_group=args.max_per_group, login_rate=args.login_rate,
+                           login_burst=args.login_burst)
+    if args.recorded:
+        if not args.root:
+            raise SystemExit('--recorded needs --root')
+        network = RecordedNetwork(args.recorded, **options)
+        root_name, root_class = args.root, args.root_class
+    else:
+        topology = SimulatedTopology(args.size, seed=args.seed)
+        network = topology.network(json_output=not args.no_json, **options)
+        root_name = topology.root
+        root_class = network.device_class(root_name)
+
+    latency_profile = LatencyProfile.load(args.latency_profile) if args.latency_profile else None
+
+    elapsed, adj_list, failed, elapsed_times = run(
+        args.engine, network, root_name, root_class, args.concurrency, ('example.com',),
+        batch=not args.no_batch, latency_profile=latency_profile,
+        session_options=session_options,
+        retry_policy=RetryPolicy(args.retry_attempts, args.retry_backoff), log=args.log)
+    own_rss, children_rss = peak_rss_mb()
+
+    print('{} engine, {} workers, {}: {} visited, {} failed in {:.2f}s'.format(
+        args.engine, args.concurrency, 'serial commands' if args.no_batch else 'batched commands',
+        len(adj_list), len(failed), elapsed))
+    print('{:10.1f} nodes/s'.format((len(adj_list) + len(failed)) / elapsed))
+    if failed:
+        reasons = Counter(failure['reason'] for failure in failed)
+        print('{:10d} failed after {} visits: {}'.format(
+            len(failed), max(failure['attempts'] for failure in failed),
+            ', '.join('{} {}'.format(count, reason) for reason, count in sorted(reasons.items()))))
+    if network.throttled:
+        print('{:10d} logins refused by the network (AAA / VTY lines)'.format(network.throttled))
+    print('{:10.1f} ms p50 per device'.format(1000 * percentile(elapsed_times, 50)))
+    print('{:10.1f} ms p99 per device'.format(1000 * percentile(elapsed_times, 99)))
+    workers = ''
+    if args.engine == 'multiprocess':
+        workers = ' ({:.1f} MB worker processes)'.format(children_rss)
+    print('{:10.1f} MB peak RSS{}'.format(own_rss, workers))
+    if args.engine != 'multiprocess':
+        print(facts_stats.summary())
+        print(metrics.summary())
+    if args.metrics_textfile:
+        metrics.write_textfile(args.metrics_textfile)
+
+    if latency_profile:
+        latency_profile.save()
+        print(latency_profile.summary())
+
+
+if __name__ == '__main__':
+    main()
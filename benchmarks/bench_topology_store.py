@@ -0,0 +1,40 @@
+''' Memory of the adjacency list as dicts against inventory.topology.Topology.
+
+    Run from the top of the repository:
+
+        python -m benchmarks.bench_topology_store --size 10000 --links 100000
+
+    The adjacency list is generated by benchmarks.topology.adjacency_list,
+    converted to a Topology and back, and checked to come back unchanged.
+'''
+import argparse
+import time
+
+from inventory.topology import Topology
+from benchmarks.topology import adjacency_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--links', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    adj_list = adjacency_list(args.size, args.links, seed=args.seed)
+
+    start = time.time()
+    topology = Topology.from_adj_list(adj_list)
+    build_time = time.time() - start
+    start = time.time()
+    round_trip = topology.to_adj_list()
+    back_time = time.time() - start
+
+    print(topology.memory_report(adj_list))
+    print('from_adj_list {:.2f}s, to_adj_list {:.2f}s'.format(build_time, back_time))
+    if round_trip != adj_list:
+        raise SystemExit('to_adj_list() differs from the adjacency list!')
+
+
+if __name__ == '__main__':
+    main()
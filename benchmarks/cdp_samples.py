@@ -0,0 +1,69 @@
+''' Synthetic 'show cdp neigh detail' outputs for the parser benchmarks. '''
+
+IOS_RECORD = '''-------------------------
+Device ID: {name}.example.com
+Entry address(es): 
+  IP address: 10.{a}.{b}.1
+  IPv6 address: 2001:DB8:{a:X}:{b:X}::1  (global unicast)
+  IPv6 address: FE80::{a:X}:{b:X}  (link-local)
+Platform: cisco WS-C3850-48T,  Capabilities: Switch IGMP 
+Interface: GigabitEthernet1/0/{port},  Port ID (outgoing port): TenGigabitEthernet1/1/{uplink}
+Holdtime : 150 sec
+
+Version :
+Cisco IOS Software, IOS-XE Software, Catalyst L3 Switch Software (CAT3K_CAA-UNIVERSALK9-M), Version 03.06.06E RELEASE SOFTWARE (fc1)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2016 by Cisco Systems, Inc.
+Compiled Sat 17-Dec-16 00:33 by prod_rel_team
+
+advertisement version: 2
+VTP Management Domain: ''
+Native VLAN: 1
+Duplex: full
+Management address(es): 
+  IP address: 10.{a}.{b}.1
+
+'''
+
+NXOS_RECORD = '''----------------------------------------
+Device ID:{name}(FOX{a:04d}{b:04d})
+System Name: {name}
+
+Interface address(es):
+    IPv4 Address: 10.{a}.{b}.1
+    IPv6 Address: fe80::{a:x}:{b:x}
+Platform: N9K-C93180YC-EX, Capabilities: Router Switch IGMP Filtering Supports-STP-Dispute
+Interface: Ethernet1/{port}, Port ID (outgoing port): Ethernet1/{uplink}
+Holdtime: 170 sec
+
+Version:
+Cisco Nexus Operating System (NX-OS) Software, Version 7.0(3)I7(5)
+
+Advertisement Version: 2
+
+Native VLAN: 1
+Duplex: full
+
+MTU: 9216
+Physical Location: DC1
+Mgmt address(es):
+    IPv4 Address: 172.16.{a}.{b}
+
+'''
+
+
+def cdp_output(count, record=IOS_RECORD, no_ip_every=0):
+    '''
+    build the output of 'show cdp neigh detail' with `count` neighbors.
+    With no_ip_every=N every Nth neighbor advertises no addresses at all,
+    as IP phones and some appliances do.
+    '''
+    records = []
+    for i in range(count):
+        text = record.format(name='SW{}'.format(i), a=i // 250, b=i % 250,
+                             port=i + 1, uplink=i % 4 + 1)
+        if no_ip_every and i % no_ip_every == 0:
+            text = '\n'.join(line for line in text.split('\n')
+                             if 'ddress: ' not in line)
+        records.append(text)
+    return ''.join(records)
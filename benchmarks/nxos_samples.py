@@ -0,0 +1,120 @@
+''' 'show version | xml' and 'show inventory | xml' outputs of a Nexus 7K
+    for the NX-OS facts benchmark, with as many modules, power supplies and
+    fans as a fully loaded 18-slot chassis.
+'''
+
+HEADER = '''<?xml version="1.0" encoding="ISO-8859-1"?>
+<nf:rpc-reply xmlns:nf="urn:ietf:params:xml:ns:netconf:base:1.0" xmlns="http://www.cisco.com/nxos:1.0:{ns}">
+ <nf:data>
+'''
+FOOTER = ''' </nf:data>
+</nf:rpc-reply>
+'''
+
+VERSION = '''  <show>
+   <version>
+    <__XML__OPT_Cmd_sysmgr_show_version___readonly__>
+     <__readonly__>
+      <header_str>Cisco Nexus Operating System (NX-OS) Software
+TAC support: http://www.cisco.com/tac
+Copyright (c) 2002-2016, Cisco Systems, Inc. All rights reserved.
+The copyrights to certain works contained herein are owned by
+other third parties and are used and distributed under license.</header_str>
+      <bios_ver_str>2.12.0</bios_ver_str>
+      <kickstart_ver_str>6.2(16)</kickstart_ver_str>
+      <sys_ver_str>6.2(16)</sys_ver_str>
+      <bios_cmpl_time>05/29/2013</bios_cmpl_time>
+      <kick_file_name>bootflash:///n7000-s2-kickstart.6.2.16.bin</kick_file_name>
+      <kick_cmpl_time> 3/29/2016 2:00:00</kick_cmpl_time>
+      <kick_tmstmp>04/16/2016 11:33:04</kick_tmstmp>
+      <isan_file_name>bootflash:///n7000-s2-dk9.6.2.16.bin</isan_file_name>
+      <isan_cmpl_time> 3/29/2016 2:00:00</isan_cmpl_time>
+      <isan_tmstmp>04/16/2016 13:01:08</isan_tmstmp>
+      <chassis_id>Nexus7000 C7018 (18 Slot) Chassis</chassis_id>
+      <module_id>Supervisor Module-2</module_id>
+      <cpu_name>Intel(R) Xeon(R) CPU        </cpu_name>
+      <memory>32745060</memory>
+      <mem_type>kB</mem_type>
+      <proc_board_id>JAF1234ABCD</proc_board_id>
+      <host_name>N7K-CORE1</host_name>
+      <bootflash_size>2007040</bootflash_size>
+      <slot0_size>7989768</slot0_size>
+      <kern_uptm_days>412</kern_uptm_days>
+      <kern_uptm_hrs>7</kern_uptm_hrs>
+      <kern_uptm_mins>31</kern_uptm_mins>
+      <kern_uptm_secs>18</kern_uptm_secs>
+      <rr_usecs>553212</rr_usecs>
+      <rr_ctime>Mon Jan  4 09:12:44 2016</rr_ctime>
+      <rr_reason>Reset Requested by CLI command reload</rr_reason>
+      <rr_sys_ver>6.2(14)</rr_sys_ver>
+      <rr_service></rr_service>
+      <manufacturer>Cisco Systems, Inc.</manufacturer>
+      <TABLE_package_list>
+{packages}      </TABLE_package_list>
+     </__readonly__>
+    </__XML__OPT_Cmd_sysmgr_show_version___readonly__>
+   </version>
+  </show>
+'''
+
+PACKAGE = '''       <ROW_package_list>
+        <package_id>n7000-s2-dk9.6.2.16.pkg{n}</package_id>
+       </ROW_package_list>
+'''
+
+INVENTORY = '''  <show>
+   <inventory>
+    <__XML__OPT_Cmd_show_inv___readonly__>
+     <__readonly__>
+      <TABLE_inv>
+{rows}      </TABLE_inv>
+     </__readonly__>
+    </__XML__OPT_Cmd_show_inv___readonly__>
+   </inventory>
+  </show>
+'''
+
+ROW = '''       <ROW_inv>
+        <name>"{name}"</name>
+        <desc>"{desc}"</desc>
+        <productid>{productid}</productid>
+        <vendorid>{vendorid}</vendorid>
+        <serialnum>{serial}</serialnum>
+       </ROW_inv>
+'''
+
+
+def version_xml(packages=40):
+    return (HEADER.format(ns='sysmgrcli') +
+            VERSION.format(packages=''.join(PACKAGE.format(n=n) for n in range(packages))) +
+            FOOTER)
+
+
+def inventory_xml(slots=18, fabrics=5, power_supplies=4, fans=4):
+    rows = [ROW.format(name='Chassis', desc='Nexus7000 C7018 (18 Slot) Chassis ',
+                       productid='N7K-C7018', vendorid='V02', serial='TBM12345678')]
+    for slot in range(1, slots + 1):
+        if slot in (9, 10):
+            name, productid = 'Supervisor Module-2', 'N7K-SUP2E'
+        else:
+            name, productid = '10/40 Gbps Ethernet Module', 'N7K-F312FQ-25'
+        rows.append(ROW.format(name='Slot {}'.format(slot), desc=name, productid=productid,
+                               vendorid='V01', serial='JAF{:08d}'.format(slot)))
+        # transceivers of the module
+        for port in range(1, 13):
+            rows.append(ROW.format(name='Ethernet{}/{}'.format(slot, port),
+                                   desc='QSFP 40G SR4', productid='QSFP-40G-SR4',
+                                   vendorid='V03', serial='AVM{:04d}{:04d}'.format(slot, port)))
+    for n in range(1, fabrics + 1):
+        rows.append(ROW.format(name='Fabric Module {}'.format(n), desc='Fabric card module',
+                               productid='N7K-C7018-FAB-2', vendorid='V01',
+                               serial='JAF2{:07d}'.format(n)))
+    for n in range(1, power_supplies + 1):
+        rows.append(ROW.format(name='Power Supply {}'.format(n), desc='Nexus7000 C7018 Power Supply',
+                               productid='N7K-AC-6.0KW', vendorid='V03',
+                               serial='DTM{:08d}'.format(n)))
+    for n in range(1, fans + 1):
+        rows.append(ROW.format(name='Fan {}'.format(n), desc='Nexus7000 C7018 Fan Module',
+                               productid='N7K-C7018-FAN', vendorid='V01',
+                               serial='FOX{:08d}'.format(n)))
+    return HEADER.format(ns='sysmgrcli') + INVENTORY.format(rows=''.join(rows)) + FOOTER
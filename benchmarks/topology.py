@@ -0,0 +1,136 @@
+''' Synthetic network topologies for the benchmarks.
+
+    The generated network looks like a campus: a pair of cores, a layer of
+    distribution switches hanging off both cores, and access switches that
+    either hang off a pair of distribution switches or are daisy-chained
+    off an earlier access switch, which gives the BFS many levels. Every
+    device gets a latency drawn once from a seeded generator, with a small
+    fraction of slow devices, so runs are repeatable. per_neighbor_latency
+    adds the time a device takes to list each of its CDP neighbors.
+'''
+import json
+import random
+import time
+
+from inventory.crawler import VisitResult
+from parsers.simulated import SimulatedNetwork
+
+
+class SimulatedTopology(object):
+
+    def __init__(self, size=2000, seed=1, mean_latency=0.005,
+                 slow_fraction=0.01, slow_latency=0.25, fail_fraction=0.0,
+                 chain_fraction=0.5, per_neighbor_latency=0.0):
+        self.size = size
+        rng = random.Random(seed)
+
+        names = ['CORE{}'.format(i) for i in range(2)]
+        distribution = max(2, size // 40)
+        names += ['DIST{}'.format(i) for i in range(distribution)]
+        names += ['ACC{}'.format(i) for i in range(size - len(names))]
+        self.names = names
+
+        # adjacency of device name -> {local interface: neighbor name}
+        self.links = dict((name, {}) for name in names)
+        cores = names[:2]
+        dists = names[2:2 + distribution]
+        access = names[2 + distribution:]
+
+        self._link(cores[0], cores[1])
+        for dist in dists:
+            for core in cores:
+                self._link(core, dist)
+        for i, acc in enumerate(access):
+            if i and rng.random() < chain_fraction:
+                self._link(access[rng.randrange(i)], acc)
+            else:
+                for dist in rng.sample(dists, 2):
+                    self._link(dist, acc)
+
+        self.latency = {}
+        self.failing = set()
+        for name in names:
+            if rng.random() < slow_fraction:
+                self.latency[name] = slow_latency * (0.5 + rng.random())
+            else:
+                self.latency[name] = rng.expovariate(1.0 / mean_latency)
+            self.latency[name] += per_neighbor_latency * len(self.links[name])
+            if name not in cores and rng.random() < fail_fraction:
+                self.failing.add(name)
+
+    def _link(self, a, b):
+        a_intf = 'Eth1/{}'.format(len(self.links[a]) + 1)
+        b_intf = 'Eth1/{}'.format(len(self.links[b]) + 1)
+        self.links[a][a_intf] = (b, b_intf)
+        self.links[b][b_intf] = (a, a_intf)
+
+    @property
+    def root(self):
+        return self.names[0]
+
+    def model(self, name):
+        if name.startswith('CORE'):
+            return 'N7K-C7010'
+        if name.startswith('DIST'):
+            return 'N9K-C93180YC-EX'
+        return 'WS-C3750X-48P'
+
+    def neighbors(self, name):
+        ''' neighbor table of a device, in the format returned by the parsers '''
+        return dict((local_intf, dict(device_name=remote, device_class='cisco_ios',
+                                      device_model=self.model(remote),
+                                      remote_interface=remote_intf))
+                    for local_intf, (remote, remote_intf) in self.links[name].items())
+
+    def visit(self, device):
+        ''' stand-in for gather_inventory.get_neighbors '''
+        name = device['device_name']
+        time.sleep(self.latency[name])
+        if name in self.failing:
+            return VisitResult(name, None, None, self.latency[name])
+        return VisitResult(name, self.neighbors(name), {}, self.latency[name])
+
+    def network(self, **kwargs):
+        '''
+        parsers.simulated.SimulatedNetwork of this topology, for crawls that
+        go through the real parsers: the core and distribution layers run
+        NX-OS, the access switches IOS. kwargs are the latency and failure
+        options of SimulatedNetwork.
+        '''
+        device_classes = dict((name, 'cisco_ios' if name.startswith('ACC') else 'cisco_nxos')
+                              for name in self.names)
+        return SimulatedNetwork(self.links, device_classes, **kwargs)
+
+
+def adjacency_list(size=10000, links=100000, seed=1, devices_per_model=50):
+    '''
+    adjacency list of size devices joined by random links, in the format
+    gather_inventory writes - every neighbor record is complete, as if
+    parsed from CDP. Round-tripped through JSON, so no strings are shared
+    between records, as in an adjacency list read from file.
+    '''
+    rng = random.Random(seed)
+    names = ['SW{:05d}.example.com'.format(i) for i in range(size)]
+    details = [dict(ip_address='10.{}.{}.{}'.format(i >> 16, (i >> 8) & 255, i & 255),
+                    ipv6_address=None,
+                    device_model='WS-C3850-{}P'.format(24 + 24 * ((i // devices_per_model) % 2)),
+                    os_version='IOS-XE Software, Catalyst L3 Switch Software '
+                               '(CAT3K_CAA-UNIVERSALK9-M), Version 03.06.0{}E'.format(i % 8),
+                    device_class='cisco_ios', device_vendor='cisco')
+               for i in range(size)]
+    adj_list = dict((name, {}) for name in names)
+
+    def add(a, b):
+        a_intf = 'Gi1/0/{}'.format(len(adj_list[names[a]]) + 1)
+        b_intf = 'Gi1/0/{}'.format(len(adj_list[names[b]]) + 1)
+        adj_list[names[a]][a_intf] = dict(details[b], device_name=names[b], remote_interface=b_intf)
+        adj_list[names[b]][b_intf] = dict(details[a], device_name=names[a], remote_interface=a_intf)
+
+    # a spanning tree first so the network is connected, then random links
+    for i in range(1, size):
+        add(rng.randrange(i), i)
+    for _ in range(links - (size - 1)):
+        a, b = rng.randrange(size), rng.randrange(size)
+        if a != b:
+            add(a, b)
+    return json.loads(json.dumps(adj_list))
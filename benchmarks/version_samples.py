@@ -0,0 +1,379 @@
+''' 'show version' outputs of IOS and IOS-XE trains, for the facts benchmark.
+
+    SAMPLES is a list of (name, output, expected facts).
+'''
+
+IOS_122_C3750 = '''Cisco IOS Software, C3750 Software (C3750-IPSERVICESK9-M), Version 12.2(55)SE10, RELEASE SOFTWARE (fc2)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2015 by Cisco Systems, Inc.
+Compiled Wed 11-Feb-15 11:46 by prod_rel_team
+Image text-base: 0x01000000, data-base: 0x02F00000
+
+ROM: Bootstrap program is C3750 boot loader
+BOOTLDR: C3750 Boot Loader (C3750-HBOOT-M) Version 12.2(44)SE5, RELEASE SOFTWARE (fc1)
+
+ACC-3750-01 uptime is 3 years, 12 weeks, 4 days, 7 hours, 21 minutes
+System returned to ROM by power-on
+System restarted at 10:14:52 UTC Mon Jan 4 2016
+System image file is "flash:/c3750-ipservicesk9-mz.122-55.SE10/c3750-ipservicesk9-mz.122-55.SE10.bin"
+
+
+This product contains cryptographic features and is subject to United
+States and local country laws governing import, export, transfer and
+use. Delivery of Cisco cryptographic products does not imply
+third-party authority to import, export, distribute or use encryption.
+Importers, exporters, distributors and users are responsible for
+compliance with U.S. and local country laws. By using this product you
+agree to comply with applicable laws and regulations. If you are unable
+to comply with U.S. and local laws, return this product immediately.
+
+A summary of U.S. laws governing Cisco cryptographic products may be found at:
+http://www.cisco.com/wwl/export/crypto/tool/stqrg.html
+
+If you require further assistance please contact us by sending email to
+export@cisco.com.
+
+cisco WS-C3750G-24TS-1U (PowerPC405) processor (revision H0) with 131072K bytes of memory.
+Processor board ID FOC1033Z1EY
+Last reset from power-on
+1 Virtual Ethernet interface
+28 Gigabit Ethernet interfaces
+The password-recovery mechanism is enabled.
+
+512K bytes of flash-simulated non-volatile configuration memory.
+Base ethernet MAC Address       : 00:19:E8:00:00:01
+Motherboard assembly number     : 73-10219-09
+Power supply part number        : 341-0108-02
+Motherboard serial number       : FOC10330AAA
+Power supply serial number      : DCA10310BBB
+Model revision number           : H0
+Motherboard revision number     : A0
+Model number                    : WS-C3750G-24TS-S1U
+System serial number            : FOC1033Z1EY
+Top Assembly Part Number        : 800-26859-03
+Top Assembly Revision Number    : C0
+Version ID                      : V05
+CLEI Code Number                : COMB600BRA
+Hardware Board Revision Number  : 0x09
+
+
+Switch Ports Model              SW Version            SW Image
+------ ----- -----              ----------            ----------
+*    1 28    WS-C3750G-24TS-1U  12.2(55)SE10          C3750-IPSERVICESK9-M
+
+
+Configuration register is 0xF
+'''
+
+IOS_15_ISR = '''Cisco IOS Software, C2900 Software (C2900-UNIVERSALK9-M), Version 15.2(4)M6a, RELEASE SOFTWARE (fc1)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2014 by Cisco Systems, Inc.
+Compiled Tue 15-Apr-14 19:21 by prod_rel_team
+
+ROM: System Bootstrap, Version 15.0(1r)M15, RELEASE SOFTWARE (fc1)
+
+WAN-RTR-01 uptime is 1 year, 2 weeks, 6 days, 1 hour, 5 minutes
+System returned to ROM by reload at 09:12:31 EST Thu Mar 3 2016
+System restarted at 09:14:02 EST Thu Mar 3 2016
+System image file is "flash0:c2900-universalk9-mz.SPA.152-4.M6a.bin"
+Last reload type: Normal Reload
+Last reload reason: Reload Command
+
+
+
+This product contains cryptographic features and is subject to United
+States and local country laws governing import, export, transfer and
+use. Delivery of Cisco cryptographic products does not imply
+third-party authority to import, export, distribute or use encryption.
+Importers, exporters, distributors and users are responsible for
+compliance with U.S. and local country laws. By using this product you
+agree to comply with applicable laws and regulations. If you are unable
+to comply with U.S. and local laws, return this product immediately.
+
+A summary of U.S. laws governing Cisco cryptographic products may be found at:
+http://www.cisco.com/wwl/export/crypto/tool/stqrg.html
+
+If you require further assistance please contact us by sending email to
+export@cisco.com.
+
+Cisco CISCO2921/K9 (revision 1.0) with 1007584K/40960K bytes of memory.
+Processor board ID FTX1523AHH7
+3 Gigabit Ethernet interfaces
+2 Serial(sync/async) interfaces
+1 terminal line
+DRAM configuration is 64 bits wide with parity enabled.
+255K bytes of non-volatile configuration memory.
+250880K bytes of ATA System CompactFlash 0 (Read/Write)
+
+
+License Info:
+
+License UDI:
+
+-------------------------------------------------
+Device#   PID                   SN
+-------------------------------------------------
+*0        CISCO2921/K9          FTX1523AHH7
+
+
+
+Technology Package License Information for Module:'c2900'
+
+-----------------------------------------------------------------
+Technology    Technology-package           Technology-package
+              Current       Type           Next reboot
+------------------------------------------------------------------
+ipbase        ipbasek9      Permanent      ipbasek9
+security      securityk9    Permanent      securityk9
+uc            None          None           None
+data          datak9        Permanent      datak9
+
+Configuration register is 0x2102
+'''
+
+IOS_XE_3_C3850 = '''Cisco IOS Software, IOS-XE Software, Catalyst L3 Switch Software (CAT3K_CAA-UNIVERSALK9-M), Version 03.06.06E RELEASE SOFTWARE (fc1)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2016 by Cisco Systems, Inc.
+Compiled Sat 17-Dec-16 00:33 by prod_rel_team
+
+
+
+Cisco IOS-XE software, Copyright (c) 2005-2016 by cisco Systems, Inc.
+All rights reserved.  Certain components of Cisco IOS-XE software are
+licensed under the GNU General Public License ("GPL") Version 2.0.  The
+software code licensed under GPL Version 2.0 is free software that comes
+with ABSOLUTELY NO WARRANTY.  You can redistribute and/or modify such
+GPL code under the terms of GPL Version 2.0.
+(http://www.gnu.org/licenses/gpl-2.0.html) For more details, see the
+documentation or "License Notice" file accompanying the IOS-XE software,
+or the applicable URL provided on the flyer accompanying the IOS-XE
+software.
+
+
+
+ROM: IOS-XE ROMMON
+BOOTLDR: CAT3K_CAA Boot Loader (CAT3K_CAA-HBOOT-M) Version 3.58, RELEASE SOFTWARE (P)
+
+DIST-3850-02 uptime is 42 weeks, 1 day, 3 hours, 10 minutes
+Uptime for this control processor is 42 weeks, 1 day, 3 hours, 12 minutes
+System returned to ROM by Power Failure or Unknown at 05:10:54 UTC Sat Feb 18 2017
+System restarted at 05:15:09 UTC Sat Feb 18 2017
+System image file is "flash:packages.conf"
+Last reload reason: Power Failure or Unknown
+
+
+
+This product contains cryptographic features and is subject to United
+States and local country laws governing import, export, transfer and
+use. Delivery of Cisco cryptographic products does not imply
+third-party authority to import, export, distribute or use encryption.
+Importers, exporters, distributors and users are responsible for
+compliance with U.S. and local country laws. By using this product you
+agree to comply with applicable laws and regulations. If you are unable
+to comply with U.S. and local laws, return this product immediately.
+
+A summary of U.S. laws governing Cisco cryptographic products may be found at:
+http://www.cisco.com/wwl/export/crypto/tool/stqrg.html
+
+If you require further assistance please contact us by sending email to
+export@cisco.com.
+
+License Level: Ipservicesk9
+License Type: Permanent
+Next reload license Level: Ipservicesk9
+
+cisco WS-C3850-48T (MIPS) processor with 4194304K bytes of physical memory.
+Processor board ID FOC1845X0QM
+4 Virtual Ethernet interfaces
+52 Gigabit Ethernet interfaces
+4 Ten Gigabit Ethernet interfaces
+2048K bytes of non-volatile configuration memory.
+4194304K bytes of physical memory.
+250456K bytes of Crash Files at crashinfo:.
+1609272K bytes of Flash at flash:.
+0K bytes of Dummy USB Flash at usbflash0:.
+0K bytes of  at webui:.
+
+Base Ethernet MAC Address          : f4:cf:e2:00:00:01
+Motherboard Assembly Number        : 73-15800-08
+Motherboard Serial Number          : FOC18440AAA
+Model Revision Number              : P0
+Motherboard Revision Number        : A0
+Model Number                       : WS-C3850-48T
+System Serial Number               : FOC1845X0QM
+
+
+Switch Ports Model              SW Version        SW Image              Mode
+------ ----- -----              ----------        ----------            ----
+*    1 56    WS-C3850-48T       03.06.06E         cat3k_caa-universalk9 INSTALL
+
+
+Configuration register is 0x102
+'''
+
+IOS_XE_16_C9300 = '''Cisco IOS XE Software, Version 16.09.03
+Cisco IOS Software [Fuji], Catalyst L3 Switch Software (CAT9K_IOSXE), Version 16.9.3, RELEASE SOFTWARE (fc2)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2019 by Cisco Systems, Inc.
+Compiled Wed 20-Mar-19 07:56 by mcpre
+
+
+Cisco IOS-XE software, Copyright (c) 2005-2019 by cisco Systems, Inc.
+All rights reserved.  Certain components of Cisco IOS-XE software are
+licensed under the GNU General Public License ("GPL") Version 2.0.  The
+software code licensed under GPL Version 2.0 is free software that comes
+with ABSOLUTELY NO WARRANTY.  You can redistribute and/or modify such
+GPL code under the terms of GPL Version 2.0.  For more details, see the
+documentation or "License Notice" file accompanying the IOS-XE software,
+or the applicable URL provided on the flyer accompanying the IOS-XE
+software.
+
+
+ROM: IOS-XE ROMMON
+BOOTLDR: System Bootstrap, Version 16.10.1r[FC2], RELEASE SOFTWARE (P)
+
+ACC-9300-17 uptime is 21 weeks, 6 days, 22 hours, 48 minutes
+Uptime for this control processor is 21 weeks, 6 days, 22 hours, 50 minutes
+System returned to ROM by Reload Command at 12:05:41 UTC Tue Jun 11 2019
+System image file is "flash:packages.conf"
+Last reload reason: Reload Command
+
+
+
+This product contains cryptographic features and is subject to United
+States and local country laws governing import, export, transfer and
+use. Delivery of Cisco cryptographic products does not imply
+third-party authority to import, export, distribute or use encryption.
+Importers, exporters, distributors and users are responsible for
+compliance with U.S. and local country laws. By using this product you
+agree to comply with applicable laws and regulations. If you are unable
+to comply with U.S. and local laws, return this product immediately.
+
+A summary of U.S. laws governing Cisco cryptographic products may be found at:
+http://www.cisco.com/wwl/export/crypto/tool/stqrg.html
+
+If you require further assistance please contact us by sending email to
+export@cisco.com.
+
+
+Technology Package License Information:
+
+------------------------------------------------------------------------------
+Technology-package                                     Technology-package
+Current                        Type                       Next reboot
+------------------------------------------------------------------------------
+network-advantage       Smart License                 network-advantage
+dna-advantage           Subscription Smart License    dna-advantage
+AIR License Level: AIR DNA Advantage
+Next reload AIR license Level: AIR DNA Advantage
+
+
+Smart Licensing Status: REGISTERED/AUTHORIZED
+
+cisco C9300-48P (X86) processor with 1392780K/6147K bytes of memory.
+Processor board ID FCW2125L0BH
+36 Virtual Ethernet interfaces
+56 Gigabit Ethernet interfaces
+8 Ten Gigabit Ethernet interfaces
+2048K bytes of non-volatile configuration memory.
+8388608K bytes of physical memory.
+1638400K bytes of Crash Files at crashinfo:.
+11264000K bytes of Flash at flash:.
+0K bytes of WebUI ODM Files at webui:.
+
+Base Ethernet MAC Address          : 70:0f:6a:00:00:01
+Motherboard Assembly Number        : 73-17955-06
+Motherboard Serial Number          : FOC21250AAA
+Model Revision Number              : B0
+Motherboard Revision Number        : A0
+Model Number                       : C9300-48P
+System Serial Number               : FCW2125L0BH
+
+
+Switch Ports Model              SW Version        SW Image              Mode
+------ ----- -----              ----------        ----------            ----
+*    1 64    C9300-48P          16.9.3            CAT9K_IOSXE           INSTALL
+
+
+Configuration register is 0x102
+'''
+
+IOS_XE_17_ASR1K = '''Cisco IOS XE Software, Version 17.03.04a
+Cisco IOS Software [Amsterdam], ASR1000 Software (X86_64_LINUX_IOSD-UNIVERSALK9-M), Version 17.3.4a, RELEASE SOFTWARE (fc3)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2021 by Cisco Systems, Inc.
+Compiled Tue 20-Jul-21 04:59 by mcpre
+
+
+Cisco IOS-XE software, Copyright (c) 2005-2021 by cisco Systems, Inc.
+All rights reserved.  Certain components of Cisco IOS-XE software are
+licensed under the GNU General Public License ("GPL") Version 2.0.  The
+software code licensed under GPL Version 2.0 is free software that comes
+with ABSOLUTELY NO WARRANTY.  You can redistribute and/or modify such
+GPL code under the terms of GPL Version 2.0.  For more details, see the
+documentation or "License Notice" file accompanying the IOS-XE software,
+or the applicable URL provided on the flyer accompanying the IOS-XE
+software.
+
+
+ROM: 16.3(2r)
+
+PE-ASR-02 uptime is 2 years, 4 weeks, 3 days, 5 hours, 0 minutes
+Uptime for this control processor is 2 years, 4 weeks, 3 days, 5 hours, 2 minutes
+System returned to ROM by SSO Switchover at 01:10:31 UTC Fri Oct 1 2021
+System image file is "bootflash:asr1000-universalk9.17.03.04a.SPA.bin"
+Last reload reason: redundancy force-switchover
+
+
+
+This product contains cryptographic features and is subject to United
+States and local country laws governing import, export, transfer and
+use. Delivery of Cisco cryptographic products does not imply
+third-party authority to import, export, distribute or use encryption.
+Importers, exporters, distributors and users are responsible for
+compliance with U.S. and local country laws. By using this product you
+agree to comply with applicable laws and regulations. If you are unable
+to comply with U.S. and local laws, return this product immediately.
+
+A summary of U.S. laws governing Cisco cryptographic products may be found at:
+http://www.cisco.com/wwl/export/crypto/tool/stqrg.html
+
+If you require further assistance please contact us by sending email to
+export@cisco.com.
+
+Smart Licensing Status: Smart Licensing Using Policy
+
+cisco ASR1002-X (2RU-X) processor (revision 2KP) with 3783877K/6147K bytes of memory.
+Processor board ID FOX1919GHXA
+Router operating mode: Autonomous
+6 Gigabit Ethernet interfaces
+32768K bytes of non-volatile configuration memory.
+16777216K bytes of physical memory.
+6684671K bytes of eUSB flash at bootflash:.
+
+Configuration register is 0x2102
+'''
+
+SAMPLES = [
+    ('IOS 12.2 C3750', IOS_122_C3750,
+     dict(os_version='C3750 Software (C3750-IPSERVICESK9-M), Version 12.2(55)SE10, RELEASE SOFTWARE (fc2)',
+          serial_number='FOC1033Z1EY', model='WS-C3750G-24TS-1U',
+          uptime=3 * 52 * 604800 + 12 * 604800 + 4 * 86400 + 7 * 3600 + 21 * 60)),
+    ('IOS 15.2 ISR', IOS_15_ISR,
+     dict(os_version='C2900 Software (C2900-UNIVERSALK9-M), Version 15.2(4)M6a, RELEASE SOFTWARE (fc1)',
+          serial_number='FTX1523AHH7', model='CISCO2921/K9',
+          uptime=52 * 604800 + 2 * 604800 + 6 * 86400 + 3600 + 5 * 60)),
+    ('IOS-XE 3.6 C3850', IOS_XE_3_C3850,
+     dict(os_version='IOS-XE Software, Catalyst L3 Switch Software (CAT3K_CAA-UNIVERSALK9-M), '
+                     'Version 03.06.06E RELEASE SOFTWARE (fc1)',
+          serial_number='FOC1845X0QM', model='WS-C3850-48T',
+          uptime=42 * 604800 + 86400 + 3 * 3600 + 10 * 60)),
+    ('IOS-XE 16.9 C9300', IOS_XE_16_C9300,
+     dict(os_version='Catalyst L3 Switch Software (CAT9K_IOSXE), Version 16.9.3, RELEASE SOFTWARE (fc2)',
+          serial_number='FCW2125L0BH', model='C9300-48P',
+          uptime=21 * 604800 + 6 * 86400 + 22 * 3600 + 48 * 60)),
+    ('IOS-XE 17.3 ASR1002-X', IOS_XE_17_ASR1K,
+     dict(os_version='ASR1000 Software (X86_64_LINUX_IOSD-UNIVERSALK9-M), Version 17.3.4a, RELEASE SOFTWARE (fc3)',
+          serial_number='FOX1919GHXA', model='ASR1002-X',
+          uptime=2 * 52 * 604800 + 4 * 604800 + 3 * 86400 + 5 * 3600)),
+]
@@ -1,10 +1,104 @@
 from collections import namedtuple
 
-Root = namedtuple('Root', 'root_node root_parser')
+Root = namedtuple('Root', 'device_name device_class')
 Creds = namedtuple('Creds', 'username password')
 
-root_node = Root('rtr1', 'CiscoBaseParser')
+root_node = Root('rtr1', 'cisco_ios')
 credentials = Creds('user1', 'pass1')
 
 ignore_regex = r'(^NA\-|^SEP|^ACVD|^ACWD|^ACPDC|^AP|WAP|WLC|CMP)'
+# domain suffixes stripped from CDP/LLDP hostnames, so 'rtr1.example.com'
+# and 'RTR1' are the same device
+domain_names = ()
 django_app_name = 'net_system'
+
+# 'threadpool' crawls the network one BFS level at a time, 'asyncio' queues
+# every device's neighbors as soon as the device has been visited
+crawl_engine = 'asyncio'
+# max number of devices being visited at the same time
+crawl_concurrency = 16
+# visit the devices queued by the crawl longest first: core chassis, then
+# the devices whose visit took longest and that had the most neighbors in
+# the previous crawl (see inventory/frontier.py). Off by default: it only
+# shortened the makespan measurably with the threadpool engine and a
+# previous crawl to learn from - run benchmarks/bench_frontier.py on your
+# own topology before turning it on. False visits them in the order they
+# were found
+crawl_priority = False
+
+# devices that failed on a timeout or a connection error are retried once
+# the crawl is done, up to retry_attempts visits in all (see
+# inventory/retry.py). The first retry waits retry_backoff seconds, every
+# next one twice as long, at most retry_max_backoff. Set retry_attempts to
+# 1 to never retry
+retry_attempts = 3
+retry_backoff = 5
+retry_max_backoff = 60
+
+# SSH sessions are pooled per device - see parsers/sessions.py
+max_sessions = 64
+# seconds before an idle pooled session is closed
+session_idle_timeout = 300
+# limits that keep a wide crawl (crawl_concurrency in the hundreds) from
+# tripping AAA/TACACS throttling or running devices out of VTY lines:
+# at most max_sessions_per_group sessions at once per /session_group_prefix
+# subnet of the devices' CDP/LLDP addresses - or per site, the first group
+# of session_group_regex matched against the hostname (e.g. r'^(\w+?)-')
+# and at most login_rate new logins per second, login_burst at once.
+# None turns a limit off
+max_sessions_per_group = None
+session_group_prefix = 24
+session_group_regex = None
+login_rate = None
+login_burst = None
+
+default_ssh_port = 22
+device_domain = None
+
+# discovered devices are written to the database in batches of db_batch_size,
+# or every db_flush_interval seconds, whichever comes first
+db_batch_size = 500
+db_flush_interval = 30
+
+# incremental mode only re-crawls devices whose neighbor table could have
+# changed since the previous run (see inventory/incremental.py).
+# previous_adj_list defaults to the most recent {date}_adj_list.json
+incremental = False
+previous_adj_list = None
+
+# crawl_engine = 'multiprocess' - number of local worker processes, each
+# running crawl_concurrency / worker_processes threads, and the max number
+# of devices handed to a worker at once
+worker_processes = 4
+worker_batch_size = 8
+# seconds without a result from a worker before the devices it took are
+# handed out to the others again
+worker_result_timeout = 600
+# set to ('0.0.0.0', 50000) to also let workers on other hosts join with
+#   python -m inventory.distributed COORDINATOR:50000 --authkey KEY
+coordinator_address = None
+coordinator_authkey = b'change-me'
+
+# stream every visited/failed device to {date}_crawl.ndjson as the crawl
+# runs, fsync'ing at most every stream_fsync_interval seconds. The stream is
+# also the checkpoint that --resume continues an interrupted crawl from
+stream_output = True
+stream_fsync_interval = 5
+
+# command timeouts learned from the latencies of previous runs, per device
+# class and model (see parsers/latency.py). Once a command has
+# latency_min_samples samples, its timeout is the latency_percentile of
+# them times latency_headroom. Set latency_profile to None to always use
+# the parsers' fixed delays.
+latency_profile = 'latency_profile.json'
+latency_percentile = 99
+latency_headroom = 3
+latency_min_samples = 5
+
+# crawl metrics (see parsers/metrics.py) - connect/command/parse/DB-write
+# latency histograms and visited/failed/filtered counters. Set metrics_port
+# to serve them on http://127.0.0.1:{metrics_port}/metrics while the crawl
+# runs. metrics_textfile writes them at the end of the run, to
+# {date}_metrics.prom when True, or to the path given
+metrics_port = None
+metrics_textfile = True
@@ -32,9 +32,10 @@ class NetworkDevice(models.Model):
     os_version = models.CharField(max_length=100, blank=True, null=True)
     serial_number = models.CharField(max_length=50, blank=True, null=True)
     uptime_seconds = models.IntegerField(blank=True, null=True)
-    credentials = models.ForeignKey(Credentials, blank=True, null=True)
-    snmp_credentials = models.ForeignKey(SnmpCredentials, blank=True,
-                                                          null=True)
+    credentials = models.ForeignKey(Credentials, on_delete=models.CASCADE,
+                                    blank=True, null=True)
+    snmp_credentials = models.ForeignKey(SnmpCredentials, on_delete=models.CASCADE,
+                                         blank=True, null=True)
     snmp_port = models.IntegerField(blank=True, null=True)
     cfg_file = models.CharField(max_length=100, blank=True, null=True)
     domain = models.CharField(max_length=100, blank=True, null=True)
@@ -1,2 +0,0 @@
-from ios_gather_inventory import IosGatherInventory
-from nxos_gather_inventory import NexusGatherInventory
@@ -0,0 +1,361 @@
+''' Queries over the adjacency list of a crawl.
+
+    Graph turns an inventory.topology.Topology into an undirected graph
+    in compressed sparse rows (the neighbors of node i are
+    targets[offsets[i]:offsets[i + 1]]), with a link count per pair of
+    devices, and answers:
+
+        shortest_path(a, b)     BFS, fewest hops
+        components()            connected components, largest first
+        articulation_points()   devices whose loss splits the network
+        bridges()               single links whose loss splits the network
+
+    All of them are iterative and linear in the number of links. diff()
+    compares two adjacency lists - devices and links added and removed,
+    and devices reported with a different model, version or address.
+
+        $ python -m inventory.analytics 2019-05-02_adj_list.json spof
+        $ python -m inventory.analytics 2019-05-02_adj_list.json path CORE1 ACC17
+        $ python -m inventory.analytics 2019-05-02_adj_list.json diff 2019-05-01_adj_list.json
+'''
+from array import array
+from collections import Counter, deque, namedtuple
+import argparse
+from operator import itemgetter
+
+try:
+    # faster drop-in for json.loads, when installed
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from .topology import DeviceRecord, Topology
+
+TopologyDiff = namedtuple('TopologyDiff', 'added_devices removed_devices added_links '
+                                          'removed_links changed_devices')
+
+
+class Graph(object):
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.names = topology.names
+        n = topology.node_count
+
+        # a link shows up in the neighbor table of both ends. Two devices
+        # are joined by as many links as the busier side reports. Pairs
+        # are keyed as u * n + v
+        reported = Counter(src * n + dst for src, dst in zip(topology.src, topology.dst)
+                           if src != dst)
+        counts = {}
+        for key, count in reported.items():
+            u, v = divmod(key, n)
+            if u > v:
+                key = v * n + u
+            if count > counts.get(key, 0):
+                counts[key] = count
+        pairs = [divmod(key, n) for key in counts]
+
+        degree = [0] * (n + 1)
+        for u, v in pairs:
+            degree[u + 1] += 1
+            degree[v + 1] += 1
+        for i in range(n):
+            degree[i + 1] += degree[i]
+        self.offsets = array('i', degree)
+
+        targets = [0] * degree[n]
+        links = [0] * degree[n]
+        fill = degree[:n]
+        for (u, v), multiplicity in zip(pairs, counts.values()):
+            targets[fill[u]], links[fill[u]] = v, multiplicity
+            fill[u] += 1
+            targets[fill[v]], links[fill[v]] = u, multiplicity
+            fill[v] += 1
+        self.targets = array('i', targets)
+        # number of links between a node and targets[i]
+        self.links = array('i', links)
+
+    @classmethod
+    def load(cls, adj_list_path):
+        return cls(Topology.load(adj_list_path, links_only=True))
+
+    def _node(self, name):
+        node = self.topology.find(name)
+        if node is None:
+            raise KeyError('{} is not in the topology'.format(name))
+        return node
+
+    def neighbors(self, name):
+        node = self._node(name)
+        return [self.names[t] for t in self.targets[self.offsets[node]:self.offsets[node + 1]]]
+
+    def shortest_path(self, source, target):
+        ''' device names from source to target over the fewest links, None if unreachable '''
+        start, goal = self._node(source), self._node(target)
+        offsets, targets = self.offsets, self.targets
+        parent = [-1] * self.topology.node_count
+        parent[start] = start
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = [node]
+                while node != start:
+                    node = parent[node]
+                    path.append(node)
+                return [self.names[node] for node in reversed(path)]
+            for i in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[i]
+                if parent[neighbor] == -1:
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+        return None
+
+    def components(self):
+        ''' lists of device names that are connected to each other, largest first '''
+        offsets, targets = self.offsets, self.targets
+        seen = bytearray(self.topology.node_count)
+        components = []
+        for root in range(self.topology.node_count):
+            if seen[root]:
+                continue
+            seen[root] = 1
+            component, stack = [], [root]
+            while stack:
+                node = stack.pop()
+                component.append(self.names[node])
+                for i in range(offsets[node], offsets[node + 1]):
+                    if not seen[targets[i]]:
+                        seen[targets[i]] = 1
+                        stack.append(targets[i])
+            components.append(component)
+        components.sort(key=len, reverse=True)
+        return components
+
+    def articulation_points(self):
+        ''' names of the devices whose loss splits the network, sorted '''
+        return sorted(self.names[node] for node in self._single_points()[0])
+
+    def bridges(self):
+        ''' (device, device) of the links whose loss splits the network, sorted '''
+        return sorted(tuple(sorted((self.names[u], self.names[v])))
+                      for u, v in self._single_points()[1])
+
+    def _single_points(self):
+        '''
+        Tarjan's lowlink DFS, with an explicit stack so the depth of the
+        network is not limited by the recursion limit.
+        returns (set of articulation nodes, list of (u, v) bridges)
+        '''
+        offsets, targets, links = self.offsets, self.targets, self.links
+        n = self.topology.node_count
+        disc = [-1] * n
+        low = [0] * n
+        articulation, bridges = set(), []
+        clock = 0
+
+        for root in range(n):
+            if disc[root] != -1:
+                continue
+            disc[root] = low[root] = clock
+            clock += 1
+            root_children = 0
+            # (node, parent, next slot in targets, slot of the link from parent)
+            stack = [(root, -1, offsets[root], -1)]
+            while stack:
+                node, parent, i, via = stack[-1]
+                if i < offsets[node + 1]:
+                    stack[-1] = (node, parent, i + 1, via)
+                    neighbor = targets[i]
+                    if disc[neighbor] == -1:
+                        disc[neighbor] = low[neighbor] = clock
+                        clock += 1
+                        stack.append((neighbor, node, offsets[neighbor], i))
+                    elif neighbor != parent and disc[neighbor] < low[node]:
+                        low[node] = disc[neighbor]
+                    continue
+
+                stack.pop()
+                if parent == -1:
+                    continue
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+                if parent == root:
+                    root_children += 1
+                elif low[node] >= disc[parent]:
+                    articulation.add(parent)
+                # a pair joined by several links has a way around each of them
+                if low[node] > disc[parent] and links[via] == 1:
+                    bridges.append((parent, node))
+            if root_children > 1:
+                articulation.add(root)
+
+        return articulation, bridges
+
+
+def _link(device_name, intf, neighbor_name, remote_intf):
+    ''' a link as ((device, interface), (device, interface)), whichever end reported it '''
+    a, b = (device_name, intf), (neighbor_name, remote_intf)
+    return (a, b) if a <= b else (b, a)
+
+
+def link_key(topology, edge):
+    ''' _link() of an edge of a topology '''
+    remote_if = topology.remote_if[edge]
+    return _link(topology.names[topology.src[edge]], topology.interfaces[topology.local_if[edge]],
+                 topology.names[topology.dst[edge]],
+                 topology.interfaces[remote_if] if remote_if != -1 else None)
+
+
+def link_keys(topology):
+    ''' link_key() of every link of a topology '''
+    return set(link_key(topology, edge) for edge in range(topology.edge_count))
+
+
+_neighbor_name = itemgetter('device_name')
+
+
+def _first_records(adj_list):
+    '''
+    {device_name: neighbor record} of every device, as the first of its
+    neighbors reported it - walked backwards so the first one is written last
+    '''
+    records = {}
+    for neighbors in reversed(adj_list.values()):
+        if neighbors:
+            records.update(zip(map(_neighbor_name, reversed(neighbors.values())),
+                               reversed(neighbors.values())))
+    return records
+
+
+def _changed_tables(old, new):
+    ''' names of the devices whose neighbor table is not the same in old and new '''
+    changed = [device_name for device_name, neighbors in old.items()
+               if neighbors != new.get(device_name)]
+    changed.extend(new.keys() - old.keys())
+    return changed
+
+
+def _moved_records(adj_list, other, device_names):
+    '''
+    (device, interface, neighbor, remote interface) of the neighbor records
+    of the devices device_names in adj_list that other doesn't have
+    '''
+    moved = []
+    for device_name in device_names:
+        neighbors = adj_list.get(device_name)
+        if not neighbors:
+            continue
+        others = other.get(device_name) or {}
+        for intf, neighbor in neighbors.items():
+            found = others.get(intf)
+            if (found is None or found['device_name'] != neighbor['device_name'] or
+                    found.get('remote_interface') != neighbor.get('remote_interface')):
+                moved.append((device_name, intf, neighbor['device_name'],
+                              neighbor.get('remote_interface')))
+    return moved
+
+
+def _links_gone(adj_list, other, device_names):
+    '''
+    _link() of the links of the devices device_names in adj_list that other
+    has from neither end - a record other doesn't have may still be there
+    the other way round
+    '''
+    gone = set()
+    for device_name, intf, neighbor_name, remote_intf in _moved_records(adj_list, other,
+                                                                        device_names):
+        found = (other.get(neighbor_name) or {}).get(remote_intf)
+        if (found is None or found['device_name'] != device_name or
+                found.get('remote_interface') != intf):
+            gone.add(_link(device_name, intf, neighbor_name, remote_intf))
+    return gone
+
+
+def _record_dict(neighbor):
+    ''' a neighbor record without its device_name and remote_interface '''
+    return DeviceRecord(DeviceRecord.key_of(neighbor)).to_dict()
+
+
+def diff(old, new):
+    '''
+    TopologyDiff from the old to the new adjacency list (or Topology). Only
+    the devices whose neighbor table changed are looked at link by link
+    '''
+    if isinstance(old, Topology):
+        old = old.to_adj_list()
+    if isinstance(new, Topology):
+        new = new.to_adj_list()
+
+    old_records, new_records = _first_records(old), _first_records(new)
+    old_names, new_names = set(old), set(new)
+    old_names.update(old_records)
+    new_names.update(new_records)
+
+    tables = _changed_tables(old, new)
+    changed = {}
+    for name in old_names & new_names:
+        before, after = old_records.get(name), new_records.get(name)
+        if before is None or after is None or before == after:
+            continue
+        before, after = _record_dict(before), _record_dict(after)
+        if before != after:
+            changed[name] = (before, after)
+
+    return TopologyDiff(added_devices=sorted(new_names - old_names),
+                        removed_devices=sorted(old_names - new_names),
+                        added_links=sorted(_links_gone(new, old, tables), key=str),
+                        removed_links=sorted(_links_gone(old, new, tables), key=str),
+                        changed_devices=changed)
+
+
+def _load(adj_list_path):
+    with open(adj_list_path, 'rb') as fh:
+        return json_loads(fh.read())
+
+
+def diff_files(old_path, new_path):
+    return diff(_load(old_path), _load(new_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the adjacency list of a crawl')
+    parser.add_argument('adj_list', help='{date}_adj_list.json written by gather_inventory')
+    sub = parser.add_subparsers(dest='query')
+    path = sub.add_parser('path', help='shortest path between two devices')
+    path.add_argument('source')
+    path.add_argument('target')
+    sub.add_parser('components', help='connected components')
+    sub.add_parser('spof', help='articulation points and bridges')
+    changes = sub.add_parser('diff', help='changes since an older adjacency list')
+    changes.add_argument('old_adj_list')
+    args = parser.parse_args()
+
+    if args.query == 'diff':
+        result = diff_files(args.old_adj_list, args.adj_list)
+        for field in ('added_devices', 'removed_devices', 'added_links', 'removed_links'):
+            print('{}: {}'.format(field, len(getattr(result, field))))
+            for item in getattr(result, field):
+                print('  {}'.format(item))
+        print('changed_devices: {}'.format(len(result.changed_devices)))
+        for name, (before, after) in sorted(result.changed_devices.items()):
+            print('  {}: {} -> {}'.format(name, before, after))
+        return
+
+    graph = Graph.load(args.adj_list)
+    if args.query == 'path':
+        path = graph.shortest_path(args.source, args.target)
+        print(' -> '.join(path) if path else 'no path from {} to {}'.format(args.source, args.target))
+    elif args.query == 'components':
+        for component in graph.components():
+            print('{} devices: {}'.format(len(component), ', '.join(sorted(component))))
+    elif args.query == 'spof':
+        print('articulation points: {}'.format(', '.join(graph.articulation_points())))
+        print('bridges: {}'.format(', '.join('{} - {}'.format(*b) for b in graph.bridges())))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+''' Checkpoint and resume of an interrupted crawl.
+
+    The NDJSON crawl stream (inventory/ndjson.py) doubles as the crawl's
+    checkpoint journal. Every finished device is appended to it as soon as
+    it is known and the file is fsync'ed every stream_fsync_interval
+    seconds, so a checkpoint costs one appended line per device and never
+    a rewrite of the whole state.
+
+    The frontier is not stored: it is every neighbor of a visited device
+    that is neither visited nor failed, and so it is rebuilt from the
+    journal. Devices that were in flight when the crawl died are part of
+    it again.
+
+    load_checkpoint() replays a journal into a CrawlState and returns the
+    adjacency list found so far. The replay restores which devices were
+    visited or failed and why, but counts nothing again: the metrics are
+    those of the resumed run, and a device that failed before gets all its
+    retry attempts. Handing both to a crawl engine continues
+    the crawl without reconnecting to any device already finished.
+'''
+import glob
+import os
+
+from .ndjson import iter_records
+
+CHECKPOINT_GLOB = '*_crawl.ndjson'
+
+
+def latest_checkpoint(directory='.'):
+    ''' path of the most recent {date}_crawl.ndjson in directory, or None '''
+    paths = sorted(glob.glob(os.path.join(directory, CHECKPOINT_GLOB)))
+    return paths[-1] if paths else None
+
+
+def load_checkpoint(path, state):
+    '''
+    replay the journal at path into state (marking devices visited or
+    failed) and return (adjacency list, {device_name: facts})
+    '''
+    adj_list, facts = {}, {}
+
+    for record in iter_records(path):
+        node = record['node']
+        if record['type'] == 'node':
+            adj_list[node] = record['neighbors']
+            if record.get('facts'):
+                facts[node] = record['facts']
+            state.mark_visited(node, replay=True)
+        elif record['type'] == 'failure' and node not in adj_list:
+            state.mark_failed(node, record.get('reason'), replay=True)
+
+    return adj_list, facts
@@ -0,0 +1,157 @@
+''' Bookkeeping shared by the crawl engines.
+
+    CrawlState answers "should this neighbor be queued?" for every
+    neighbor of every device, so it is kept cheap:
+
+    - visited/failed/queued are sets, not lists
+    - the ignore_regex is compiled once and its result memoized per name.
+      It is matched as written against the name the neighbor was reported
+      under, not the canonical name.
+    - names are canonicalized (upper case, no domain suffix, no NX-OS
+      "(serial)" suffix - the same rules as cdp_functions.strip_fields),
+      and memoized too, so one device is never queued twice under two
+      spellings
+
+    The canonical name is only the key of the bookkeeping. A device keeps
+    the name it was first found under - the one it is connected to, stored
+    in the database under and keyed by in the adjacency list - and every
+    method takes either spelling.
+
+    Only the engine's own thread touches a CrawlState, so it does no
+    locking. Given a parsers.metrics.Metrics, it counts the visited and
+    filtered devices and the failed visits, and keeps the frontier and
+    failed gauges up to date.
+
+    Every failed device keeps the reason of its last failure and the number
+    of times it failed, for the retries (see inventory/retry.py) and the
+    failed list.
+'''
+from collections import Counter
+import re
+
+
+class CrawlState(object):
+
+    def __init__(self, ignore_regex=None, domains=(), metrics=None):
+        self.metrics = metrics
+        self.visited = set()
+        self.failed = set()
+        # every device ever queued - includes visited and failed ones
+        self.queued = set()
+        # {canonical name: name the device was first found under}
+        self.names = {}
+        # {canonical name: reason of its last failure} and failed visits per device
+        self.reasons = {}
+        self.attempts = Counter()
+
+        self._filter_re = re.compile(ignore_regex) if ignore_regex else None
+        self._ignored = {}
+
+        domains = '|'.join(re.escape(d.strip('.')) for d in domains)
+        domains = r'(?:\.(?:{}))*'.format(domains) if domains else ''
+        self._name_re = re.compile(r'^\s*(.+?){}(?:\(.*\))?\s*$'.format(domains), re.IGNORECASE)
+        self._canonical = {}
+
+    def canonical_name(self, device_name):
+        name = self._canonical.get(device_name)
+        if name is None:
+            match = self._name_re.match(device_name)
+            name = (match.group(1) if match else device_name).upper()
+            self._canonical[device_name] = name
+        return name
+
+    def _key(self, device_name):
+        ''' canonical name of device_name, remembering the name it was first seen under '''
+        key = self.canonical_name(device_name)
+        self.names.setdefault(key, device_name)
+        return key
+
+    def is_ignored(self, device_name):
+        ''' True if device_name matches the ignore_regex '''
+        if not self._filter_re:
+            return False
+        ignored = self._ignored.get(device_name)
+        if ignored is None:
+            ignored = self._ignored[device_name] = self._filter_re.search(device_name) is not None
+            if ignored and self.metrics:
+                self.metrics.inc('filtered')
+        return ignored
+
+    def claim(self, device):
+        '''
+        decide whether the neighbor `device` (a neighbor dict) has to be
+        visited. Returns True, and marks the device as queued, if it is
+        neither ignored nor already queued under any spelling.
+        '''
+        key = self.canonical_name(device['device_name'])
+        if key in self.queued or self.is_ignored(device['device_name']):
+            return False
+        self.queued.add(self._key(device['device_name']))
+        self._update_gauges()
+        return True
+
+    def add_root(self, device_name):
+        key = self._key(device_name)
+        self.queued.add(key)
+        self.visited.add(key)
+        return device_name
+
+    def mark_visited(self, device_name, replay=False):
+        '''
+        replay - the device was visited by an earlier run of the crawl (see
+        inventory/checkpoint.py), not counted in the metrics again
+        '''
+        device_name = self._key(device_name)
+        self.queued.add(device_name)
+        self.visited.add(device_name)
+        # visited on a retry
+        self.failed.discard(device_name)
+        self.reasons.pop(device_name, None)
+        if self.metrics and not replay:
+            self.metrics.inc('visited')
+        self._update_gauges()
+
+    def mark_failed(self, device_name, reason=None, replay=False):
+        '''
+        replay - the device failed in an earlier run of the crawl. Not
+        counted in the metrics or against its retry attempts
+        '''
+        device_name = self._key(device_name)
+        self.queued.add(device_name)
+        self.failed.add(device_name)
+        self.reasons[device_name] = reason
+        if not replay:
+            self.attempts[device_name] += 1
+            if self.metrics:
+                self.metrics.inc('failed_attempts')
+        self._update_gauges()
+
+    def _update_gauges(self):
+        if self.metrics:
+            self.metrics.set('frontier', len(self.queued) - len(self.visited) - len(self.failed))
+            self.metrics.set('failed', len(self.failed))
+
+    def frontier(self, adj_list):
+        '''
+        claim the neighbors of every device in adj_list - for a new crawl
+        that is the root's neighbors, for a resumed one it is every device
+        seen but not finished yet
+        '''
+        return [dev for neighbors in adj_list.values() if neighbors
+                for dev in neighbors.values() if self.claim(dev)]
+
+    def retry(self, device_name):
+        ''' forget that device_name failed, so the next claim() queues it again '''
+        device_name = self.canonical_name(device_name)
+        self.failed.discard(device_name)
+        self.queued.discard(device_name)
+        self._update_gauges()
+
+    def failed_list(self):
+        return sorted(self.names.get(key, key) for key in self.failed)
+
+    def failure_report(self):
+        ''' [{"device_name": ..., "reason": ..., "attempts": ...}] of the failed devices '''
+        return sorted((dict(device_name=self.names.get(key, key), reason=self.reasons.get(key),
+                            attempts=self.attempts[key])
+                       for key in self.failed), key=lambda failure: failure['device_name'])
@@ -0,0 +1,169 @@
+''' Crawl engines used by gather_inventory.main.
+
+    Every engine takes the root's name and neighbors, a `visit` callable and
+    an optional CrawlState, and returns the same (adjacency list, failed
+    list) pair. `visit` is handed the neighbor dict of a device (as found in
+    its parent's neighbor table) and must return a VisitResult. A result
+    with `neighbors` set to None means the device failed, and its `error`
+    says why (see parsers.base.error_reason). The CrawlState
+    decides which neighbors get queued - see inventory/crawl_state.py
+
+    If an `on_result` callable is given, every VisitResult is handed to it
+    as soon as the engine has it, from the engine's own thread.
+
+    `priority` orders the devices waiting for a visit, highest first - a
+    callable taking a neighbor dict, such as
+    inventory.frontier.DevicePriority. Without one they are visited in the
+    order they were found.
+
+    To resume a crawl, pass the adjacency list found so far as `adj_list`
+    together with the CrawlState it was replayed into (see
+    inventory/checkpoint.py). The crawl continues from every neighbor that
+    has not been visited yet.
+
+    threadpool_crawl - the original level-by-level BFS. A whole level is
+        handed to the thread pool and the next level is only queued once
+        every device of the current one has returned.
+
+    asyncio_crawl - no level barrier. Neighbors are put on the work queue
+        as soon as their parent returns, and a semaphore bounds how many
+        devices are being visited at once.
+
+    multiprocess_crawl - coordinator/worker crawl across several processes
+        or hosts, see inventory/distributed.py
+'''
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.dummy import Pool as ThreadPool
+
+from .crawl_state import CrawlState
+from .frontier import Frontier
+
+VisitResult = namedtuple('VisitResult', 'device_name neighbors facts elapsed error')
+VisitResult.__new__.__defaults__ = (None,)
+
+
+def _start(root_name, root_neighbors, state, adj_list):
+    ''' initial (state, adjacency list, frontier) of a new or resumed crawl '''
+    state = state or CrawlState()
+    adj_list = dict(adj_list or {})
+    adj_list[state.add_root(root_name)] = root_neighbors
+    return state, adj_list, state.frontier(adj_list)
+
+
+def threadpool_crawl(root_name, root_neighbors, visit, state=None, concurrency=16,
+                     on_result=None, adj_list=None, priority=None):
+    '''
+    crawl the network one BFS level at a time using a pool of threads. The
+    devices of a level are handed to the pool in order of priority.
+    '''
+    state, adj_list, queue = _start(root_name, root_neighbors, state, adj_list)
+
+    pool = ThreadPool(processes=concurrency)
+    try:
+        while queue:
+            nodes_to_process, queue = queue, []
+            if priority:
+                # stable, so devices of equal priority keep their order
+                nodes_to_process.sort(key=priority, reverse=True)
+
+            pool_results = [pool.apply_async(visit, args=(dev,)) for dev in nodes_to_process]
+
+            for result in pool_results:
+                result = result.get()
+                node, neighbors = result.device_name, result.neighbors
+                if on_result:
+                    on_result(result)
+
+                if neighbors is None:
+                    state.mark_failed(node, result.error)
+                    continue
+
+                state.mark_visited(node)
+                adj_list[node] = neighbors
+
+                queue.extend(dev for dev in neighbors.values() if state.claim(dev))
+    finally:
+        pool.close()
+        pool.join()
+
+    return adj_list, state.failed_list()
+
+
+def asyncio_crawl(root_name, root_neighbors, visit, state=None, concurrency=16,
+                  on_result=None, adj_list=None, priority=None):
+    '''
+    crawl the network with a work queue and a bounded number of devices
+    in flight. `visit` is blocking, so it runs on a thread executor.
+    '''
+    # imported here, it takes longer to import than the rest of the crawl
+    import asyncio
+
+    return asyncio.run(_asyncio_crawl(visit, concurrency, on_result, priority,
+                                      *_start(root_name, root_neighbors, state, adj_list)))
+
+
+async def _asyncio_crawl(visit, concurrency, on_result, priority, state, adj_list, frontier):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = Frontier(frontier, priority)
+
+    def enqueue(neighbors):
+        queue.extend(dev for dev in neighbors.values() if state.claim(dev))
+
+    async def visit_device(dev):
+        try:
+            result = await loop.run_in_executor(executor, visit, dev)
+        finally:
+            semaphore.release()
+
+        node, neighbors = result.device_name, result.neighbors
+        if on_result:
+            on_result(result)
+
+        if neighbors is None:
+            state.mark_failed(node, result.error)
+            return
+
+        state.mark_visited(node)
+        adj_list[node] = neighbors
+        enqueue(neighbors)
+
+    pending = set()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while queue or pending:
+            if not queue:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # surface unexpected errors from visit_device
+                    task.result()
+                continue
+
+            await semaphore.acquire()
+            pending.add(loop.create_task(visit_device(queue.popleft())))
+
+    return adj_list, state.failed_list()
+
+
+def multiprocess_crawl(*args, **kwargs):
+    ''' see inventory.distributed.multiprocess_crawl '''
+    # imported here, distributed.py needs VisitResult and _start from this
+    # module - and multiprocessing is only needed by this engine
+    from .distributed import multiprocess_crawl
+    return multiprocess_crawl(*args, **kwargs)
+
+
+ENGINES = {'threadpool': threadpool_crawl,
+           'asyncio': asyncio_crawl,
+           'multiprocess': multiprocess_crawl}
+
+
+def get_engine(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise RuntimeError('Unknown crawl engine {} - expected one of {}'.format(
+            name, ', '.join(sorted(ENGINES))))
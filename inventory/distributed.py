@@ -0,0 +1,302 @@
+''' Coordinator/worker crawl across several processes or hosts.
+
+    The coordinator owns the crawl state - the visited/failed sets and the
+    frontier - and hands out batches of devices on a task queue. Workers
+    pull a batch, visit every device in it (SSH, parsing, facts) and put
+    one VisitResult per device on the result queue. Each worker process
+    runs `threads` worker threads, so a process keeps several SSH sessions
+    busy while parsing uses its own core.
+
+    A worker thread says which devices it took with a Claim before it
+    visits them. If a local worker process dies, or a worker goes quiet for
+    result_timeout seconds, the devices it took and has not returned are
+    handed out again - once. A device lost a second time is failed with a
+    'timeout' reason, for the retries (see inventory/retry.py). A result
+    that comes back after its device was handed out again is dropped.
+
+    multiprocess_crawl() has the same interface as the engines in
+    inventory/crawler.py and returns the same (adjacency list, failed
+    list). With processes=N it forks N local worker processes, which is
+    how it is tested. With an address it also serves the queues over a
+    socket so workers on other hosts can join with:
+
+        python -m inventory.distributed HOST:PORT --authkey KEY \
+            --visit inventory.gather_inventory:get_neighbors
+'''
+import argparse
+from collections import Counter, namedtuple
+import importlib
+import multiprocessing
+from multiprocessing.managers import BaseManager
+import os
+import queue
+import socket
+import threading
+import time
+
+from .crawler import VisitResult, _start
+from .frontier import Frontier
+
+# put on the task queue to stop the workers. Every worker thread that gets
+# it puts it back for the next one.
+STOP = None
+
+# put on the result queue by a worker thread before it visits a batch.
+# worker is (host, pid, thread) of the thread
+Claim = namedtuple('Claim', 'worker device_names')
+
+# seconds the coordinator waits on the result queue before it checks for
+# lost workers
+POLL_INTERVAL = 1.0
+
+
+class QueueManager(BaseManager):
+    pass
+
+
+def serve_queues(address, authkey, task_queue, result_queue):
+    ''' serve the coordinator's queues to remote workers '''
+    QueueManager.register('get_task_queue', callable=lambda: task_queue)
+    QueueManager.register('get_result_queue', callable=lambda: result_queue)
+    manager = QueueManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    thread = threading.Thread(target=server.serve_forever, name='queue-server')
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def connect_queues(address, authkey):
+    ''' worker side of serve_queues - returns (task_queue, result_queue) '''
+    QueueManager.register('get_task_queue')
+    QueueManager.register('get_result_queue')
+    manager = QueueManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.get_task_queue(), manager.get_result_queue()
+
+
+def _visit_batches(task_queue, result_queue, visit):
+    worker = (socket.gethostname(), os.getpid(), threading.get_ident())
+    while True:
+        try:
+            batch = task_queue.get()
+        except (EOFError, OSError):
+            # remote worker and the coordinator has gone away - crawl is over
+            return
+        if batch is STOP:
+            task_queue.put(STOP)
+            return
+        result_queue.put(Claim(worker, [device['device_name'] for device in batch]))
+        for device in batch:
+            try:
+                result = visit(device)
+            except Exception as e:
+                print('****{}**** failed in worker. Error ****{}****'.format(device['device_name'], e))
+                result = VisitResult(device['device_name'], None, None, None)
+            result_queue.put(result)
+
+
+def worker_main(task_queue, result_queue, visit, threads=4, setup=None, teardown=None):
+    '''
+    run `threads` worker threads until the coordinator says stop. setup is
+    called first, teardown once they are done
+    '''
+    if setup:
+        setup()
+    workers = [threading.Thread(target=_visit_batches, args=(task_queue, result_queue, visit))
+               for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if teardown:
+        teardown()
+
+
+def multiprocess_crawl(root_name, root_neighbors, visit, state=None, concurrency=16,
+                       on_result=None, adj_list=None, processes=4, batch_size=8,
+                       setup=None, teardown=None, address=None, authkey=None, priority=None,
+                       result_timeout=600):
+    '''
+    crawl the network with the coordinator in this process and the visits
+    done by worker processes.
+
+    concurrency - total number of worker threads across the local processes
+    processes - number of local worker processes to start
+    batch_size - max number of devices handed to a worker at once
+    setup - called in every local worker process before its first visit
+    teardown - called in every worker process once it is done
+    address/authkey - also serve the queues to remote workers
+    priority - order of the devices in the frontier, see inventory/frontier.py
+    result_timeout - seconds without a word from a worker, or from any
+    worker at all, after which the devices it took are handed out again
+    '''
+    state, adj_list, frontier = _start(root_name, root_neighbors, state, adj_list)
+    frontier = Frontier(frontier, priority)
+
+    task_queue = multiprocessing.Queue()
+    result_queue = multiprocessing.Queue()
+    if address:
+        # left running until this process exits, so remote workers still
+        # waiting on the task queue get the STOP
+        serve_queues(address, authkey, task_queue, result_queue)
+
+    threads = max(1, -(-concurrency // max(processes, 1)))
+
+    def start_worker(i):
+        worker = multiprocessing.Process(target=worker_main, name='crawl-worker-{}'.format(i),
+                                         args=(task_queue, result_queue, visit, threads,
+                                               setup, teardown))
+        worker.start()
+        return worker
+
+    workers = [start_worker(i) for i in range(processes)]
+    host = socket.gethostname()
+
+    # devices handed out and not back yet, {device_name: neighbor dict}
+    pending = {}
+    # {device_name: worker} of the pending devices a worker took, and the
+    # time every worker was last heard from
+    taken = {}
+    heard_from = {}
+    lost = Counter()
+    last_result = next_check = time.time()
+
+    def enqueue(neighbors):
+        frontier.extend(dev for dev in neighbors.values() if state.claim(dev))
+
+    def dispatch():
+        ''' hand the frontier out in batches, small enough to keep every thread busy '''
+        size = max(1, min(batch_size, len(frontier) // max(concurrency, 1)))
+        while frontier:
+            batch = [frontier.popleft() for _ in range(min(size, len(frontier)))]
+            pending.update((dev['device_name'], dev) for dev in batch)
+            task_queue.put(batch)
+
+    def hand_out_again(device_names, why):
+        ''' put lost devices back on the task queue, fail the ones lost twice '''
+        batch = []
+        for device_name in device_names:
+            taken.pop(device_name, None)
+            lost[device_name] += 1
+            if lost[device_name] == 1:
+                batch.append(pending[device_name])
+                continue
+            del pending[device_name]
+            result = VisitResult(device_name, None, None, None, 'timeout')
+            if on_result:
+                on_result(result)
+            state.mark_failed(device_name, result.error)
+        print('{} devices lost ({}), {} handed out again'.format(len(device_names), why, len(batch)))
+        if batch:
+            task_queue.put(batch)
+
+    def check_workers():
+        ''' replace dead local workers, hand out what they or quiet workers took '''
+        nonlocal last_result
+        now = time.time()
+        dead = set()
+        for i, worker in enumerate(workers):
+            if not worker.is_alive():
+                print('{} died with exit code {}, starting another'.format(worker.name, worker.exitcode))
+                dead.add(worker.pid)
+                workers[i] = start_worker(i)
+        if now - last_result > result_timeout:
+            # nobody answers - the devices still on the task queue were
+            # maybe taken by a worker that died before it said so
+            hand_out_again(sorted(pending), 'no result in {}s'.format(result_timeout))
+            last_result = now
+            return
+        for worker in set(taken.values()):
+            if (worker[0] == host and worker[1] in dead) or now - heard_from[worker] > result_timeout:
+                hand_out_again(sorted(name for name, by in taken.items() if by == worker),
+                               'worker {}:{}'.format(*worker[:2]))
+
+    try:
+        dispatch()
+
+        while pending:
+            if time.time() >= next_check:
+                check_workers()
+                next_check = time.time() + POLL_INTERVAL
+            try:
+                result = result_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            last_result = time.time()
+            if isinstance(result, Claim):
+                heard_from[result.worker] = last_result
+                taken.update((device_name, result.worker) for device_name in result.device_names
+                             if device_name in pending)
+                continue
+
+            worker = taken.pop(result.device_name, None)
+            if worker:
+                heard_from[worker] = last_result
+            if pending.pop(result.device_name, None) is None:
+                # handed out again and already back, or failed
+                continue
+            node, neighbors = result.device_name, result.neighbors
+            if on_result:
+                on_result(result)
+
+            if neighbors is None:
+                state.mark_failed(node, result.error)
+                continue
+
+            state.mark_visited(node)
+            adj_list[node] = neighbors
+            enqueue(neighbors)
+            dispatch()
+    finally:
+        task_queue.put(STOP)
+        for worker in workers:
+            # a worker stuck on a lost device would never stop
+            worker.join(result_timeout)
+            if worker.is_alive():
+                print('{} did not stop, terminating it'.format(worker.name))
+                worker.terminate()
+
+    return adj_list, state.failed_list()
+
+
+def _import_callable(path):
+    ''' "package.module:function" -> function '''
+    module_name, _, attr = path.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run crawl workers for a remote coordinator')
+    parser.add_argument('address', help='HOST:PORT of the coordinator')
+    parser.add_argument('--authkey', required=True)
+    parser.add_argument('--visit', default='inventory.gather_inventory:get_neighbors')
+    parser.add_argument('--setup', default='inventory.gather_inventory:setup_worker')
+    parser.add_argument('--teardown', default='inventory.gather_inventory:shutdown')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    host, _, port = args.address.rpartition(':')
+    address, authkey = (host, int(port)), args.authkey.encode()
+
+    visit = _import_callable(args.visit)
+    setup = _import_callable(args.setup) if args.setup else None
+    teardown = _import_callable(args.teardown) if args.teardown else None
+
+    def run():
+        task_queue, result_queue = connect_queues(address, authkey)
+        worker_main(task_queue, result_queue, visit, args.threads, setup=setup, teardown=teardown)
+
+    workers = [multiprocessing.Process(target=run) for _ in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == '__main__':
+    # from the package, so a Claim is pickled as inventory.distributed.Claim
+    # rather than __main__.Claim, which the coordinator can't load
+    from inventory.distributed import main
+    main()
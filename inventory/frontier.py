@@ -0,0 +1,129 @@
+''' Order in which the crawl engines visit the devices they have queued.
+
+    With a plain FIFO a core chassis with hundreds of CDP neighbors is as
+    likely to be picked up last as first, and when it is last the whole
+    crawl waits on it. Frontier is a priority queue instead: the devices
+    with the highest DevicePriority go first, so the long visits start
+    early and overlap with the short ones. Devices of equal priority, and
+    all of them when there is no priority, come out in the order they
+    were queued.
+
+    DevicePriority scores a neighbor dict by, in this order:
+
+    - the class of its model - big chassis (N7K) before data center
+      switches (N9K/N5K) and routers, before access switches
+    - how long its visit took in the previous crawl (the elapsed time in
+      the {date}_crawl.ndjson stream), or else how long the commands of
+      its model take, from the latency profile
+    - its number of neighbors in the previous crawl
+'''
+import heapq
+import itertools
+import json
+import re
+
+from .ndjson import iter_records
+
+# (regex matched against device_model, class) - the first match wins,
+# anything else is class 0
+MODEL_CLASSES = ((r'^N7K|^N77|Nexus ?7', 3),
+                 (r'^N9K|^N5K|^N56|^N6K|Nexus ?[569]|^WS-C65|^C68', 2),
+                 (r'^ASR|^ISR|^CSR|^WS-C45|^C9[45]', 1))
+
+
+class DevicePriority(object):
+
+    def __init__(self, degrees=None, elapsed=None, latency_profile=None,
+                 model_classes=MODEL_CLASSES):
+        '''
+        degrees - {device_name: number of neighbors}, see degrees_of()
+        elapsed - {device_name: seconds its last visit took}
+        latency_profile - parsers.latency.LatencyProfile of previous runs
+        '''
+        self.degrees = degrees or {}
+        self.elapsed = elapsed or {}
+        self.latency_profile = latency_profile
+        self.model_classes = [(re.compile(regex, re.IGNORECASE), rank)
+                              for regex, rank in model_classes]
+        self._ranks = {}
+
+    @classmethod
+    def from_history(cls, crawl_path=None, adj_list_path=None, latency_profile=None, **kwargs):
+        '''
+        priority learned from a previous run - the degree and visit time of
+        every device in its {date}_crawl.ndjson at crawl_path, or only the
+        degrees of its {date}_adj_list.json at adj_list_path
+        '''
+        degrees, elapsed = {}, {}
+        if crawl_path:
+            for record in iter_records(crawl_path):
+                if record['type'] == 'node':
+                    degrees[record['node']] = len(record['neighbors'] or ())
+                if record.get('elapsed') is not None:
+                    elapsed[record['node']] = record['elapsed']
+        elif adj_list_path:
+            with open(adj_list_path) as fh:
+                degrees = degrees_of(json.load(fh))
+        return cls(degrees, elapsed, latency_profile, **kwargs)
+
+    def model_class(self, model):
+        if not model:
+            return 0
+        rank = self._ranks.get(model)
+        if rank is None:
+            rank = next((rank for regex, rank in self.model_classes if regex.search(model)), 0)
+            self._ranks[model] = rank
+        return rank
+
+    def expected_time(self, device):
+        ''' seconds the visit of device is expected to take, 0.0 if unknown '''
+        seconds = self.elapsed.get(device['device_name'])
+        if seconds is None and self.latency_profile:
+            seconds = self.latency_profile.expected_time(device.get('device_class'),
+                                                         device.get('device_model'))
+        return seconds or 0.0
+
+    def __call__(self, device):
+        return (self.model_class(device.get('device_model')), self.expected_time(device),
+                self.degrees.get(device['device_name'], 0))
+
+
+def degrees_of(adj_list):
+    ''' {device_name: number of neighbors} of an adjacency list '''
+    return dict((device_name, len(neighbors or ())) for device_name, neighbors in adj_list.items())
+
+
+class Frontier(object):
+    '''
+    devices queued for a visit, highest priority first. Has the deque
+    methods the engines use - append, extend, popleft and len().
+
+    priority - callable returning a number, or a tuple of numbers, for a
+    neighbor dict. None keeps the devices in FIFO order.
+    '''
+
+    def __init__(self, devices=(), priority=None):
+        self.priority = priority
+        self._heap = []
+        self._order = itertools.count()
+        self.extend(devices)
+
+    def append(self, device):
+        key = ()
+        if self.priority:
+            key = self.priority(device)
+            key = tuple(-k for k in key) if isinstance(key, tuple) else (-key,)
+        heapq.heappush(self._heap, (key, next(self._order), device))
+
+    def extend(self, devices):
+        for device in devices:
+            self.append(device)
+
+    def popleft(self):
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
@@ -19,54 +19,113 @@
 
 
 '''
-import netmiko
+import argparse
+import importlib
 import sys
-import django
-from collections import deque
-from multiprocessing.dummy import Pool as ThreadPool
-import pprint
+import json
 import os
+import time
 import traceback
-import sys
-from xml.parsers.expat import ExpatError
-from .parsers import cisco
+from config import config
+from .checkpoint import latest_checkpoint, load_checkpoint
+from .crawl_state import CrawlState
+from .crawler import VisitResult, get_engine
+from .frontier import DevicePriority
+from .incremental import PreviousRun, latest_adj_list
+from .ndjson import NdjsonSink
+from .retry import RetryPolicy, crawl_with_retries
+from .persistence import DeviceWriter
+from parsers.base import error_reason, facts_stats
+from parsers.latency import LatencyProfile
+from parsers.metrics import log_device, metrics
+from parsers.registry import registry as parser_registry
+from parsers.sessions import SessionPool, group_by
 import datetime
+import multiprocessing
+import threading
 
-# hack to dynamically get correct import path
-django_app = sys.path[config.django_app_name]
-from django_app.models import NetworkDevice, Credentials
-django.setup()
+# django models, set up by setup_django()
+NetworkDevice = Credentials = None
 
-### Used to fix Django setup issue ###
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
-from django.core.wsgi import get_wsgi_application
-application = get_wsgi_application()
-### Used to fix Django setup issue ###
+# shared by every visit of a process, created by setup() - importing this
+# module costs no django setup and no database access
+session_pool = None
+latency_profile = None
+device_writer = None
+_setup_lock = threading.Lock()
 
-def save_node_to_db(dev_facts):
-    try:
-        new_dev, new = NetworkDevice.objects.update_or_create(
-            device_name   = dev_facts['device_name'],
-            defaults      = dict(
-                ip_address       = dev_facts['ip_address'],
-                ipv6_address     = dev_facts['ipv6_address'],
-                device_class     = dev_facts['device_class'],
-                model            = dev_facts['device_model'],
-                serial_number    = dev_facts['serial_number'],
-                os_version       = dev_facts['os_verion'],
-                uptime_seconds   = dev_facts['uptime'],
-                credentials      = creds,
-                ssh_port         = config.default_ssh_port,
-                vendor           = dev_facts['device_vendor'],
-                domain           = config.device_domain,
-                )
-             )
+def setup_django():
+    ''' set up django and return the (NetworkDevice, Credentials) models '''
+    import django
 
-    except Exception as e:
-        print("Error creating device on DJANGO database! for device {}. Error was {}".format(dev_facts['device_name'], e))
-        return None
+    ### Used to fix Django setup issue ###
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    django.setup()
+    ### Used to fix Django setup issue ###
 
-    return new
+    models = importlib.import_module(config.django_app_name + '.models')
+    return models.NetworkDevice, models.Credentials
+
+def setup():
+    '''
+    django, the credentials in the database, the session pool, the latency
+    profile and the database writer - once per process, by main() or by
+    the first visit of a remote worker. Local workers of the multiprocess
+    engine set up their own, see setup_worker()
+    '''
+    global NetworkDevice, Credentials, session_pool, latency_profile, device_writer
+
+    with _setup_lock:
+        if session_pool is not None:
+            return
+
+        if not config.credentials:
+            raise RuntimeError('Must provide valid credentials to start!')
+
+        NetworkDevice, Credentials = setup_django()
+        save_creds_to_db(config.credentials)
+        creds = Credentials.objects.get(username=config.credentials.username)
+
+        # command latencies of previous runs, to time out commands from
+        latency_profile = LatencyProfile.load(config.latency_profile,
+                                              percentile=config.latency_percentile,
+                                              headroom=config.latency_headroom,
+                                              min_samples=config.latency_min_samples)
+
+        # devices are written to the database in batches by a background thread
+        device_writer = DeviceWriter(NetworkDevice,
+                                     batch_size=config.db_batch_size,
+                                     flush_interval=config.db_flush_interval,
+                                     defaults=dict(credentials=creds,
+                                                   ssh_port=config.default_ssh_port,
+                                                   domain=config.device_domain),
+                                     metrics=metrics)
+
+        # one SSH session per device, shared by everything that talks to it.
+        # Also caps the sessions per subnet/site and the rate of new logins.
+        # Set last - it marks the setup as done
+        session_pool = SessionPool(max_sessions=config.max_sessions,
+                                   idle_timeout=config.session_idle_timeout,
+                                   max_per_group=config.max_sessions_per_group,
+                                   group_of=group_by(config.session_group_prefix,
+                                                     config.session_group_regex),
+                                   login_rate=config.login_rate,
+                                   login_burst=config.login_burst)
+
+def setup_worker():
+    '''
+    start of a local worker process of the multiprocess engine. It is forked
+    from main() after setup(): the pooled sessions it inherits are the
+    coordinator's sockets, and the database writer's thread was not forked
+    with it. Drop them and set up the worker's own. Remote workers (see
+    inventory/distributed.py) start with it too
+    '''
+    global session_pool, latency_profile, device_writer, _setup_lock
+
+    session_pool = latency_profile = device_writer = None
+    # in case another thread held it when the process was forked
+    _setup_lock = threading.Lock()
+    setup()
 
 def save_creds_to_db(creds):
     new_creds, new = Credentials.objects.update_or_create(
@@ -74,162 +133,306 @@ def save_creds_to_db(creds):
         password=creds.password)
 
 def get_root_neighbors(device):
+    device_obj = None
     try:
-        parser = class_mapping.get(device.device_class)
+        parser = parser_registry.get(device.device_class)
         if not parser:
             raise RuntimeError('No parser found for {}'.format(device))
-        device_obj = parser(device.device_name, config.credentials)
+        device_obj = parser(device.device_name, config.credentials, session_pool,
+                            latency_profile)
         if device_obj.connect():
-            neighbors = device_obj.get_neighbors()
-            device_obj.disconnect()
-            return neighbors
+            return device_obj.discover_neighbors()
     except Exception as e:
-        print("****{}**** failed connecting to root. Error ****{}****".format(device.device_name, e))
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        print(repr(traceback.extract_tb(exc_traceback)))
+        log_device(device.device_name, 'failed', root=True, **error_fields(e))
 
     finally:
-        if device_obj.is_connected:
+        if device_obj:
             device_obj.disconnect()
 
+def error_fields(e):
+    ''' what went wrong, for the log line of a device '''
+    frame = traceback.extract_tb(sys.exc_info()[2])[-1]
+    return dict(error='{}: {}'.format(type(e).__name__, e),
+                error_at='{}:{} in {}'.format(os.path.basename(frame.filename), frame.lineno, frame.name))
+
+def can_reuse_neighbors(device_obj):
+    '''
+    incremental mode - probe the device and return True if the neighbors
+    found by the previous run can be reused as they are
+    '''
+    if not previous_run:
+        return False
+
+    probe = None
+    if device_obj.device_name in previous_run.adj_list:
+        probe = device_obj.probe()
+
+    reason = previous_run.refresh_reason(device_obj.device_name, probe)
+    previous_run.record(reason)
+    return reason is None
+
 def get_neighbors(device):
     '''
     establish an ssh session to a networking device and return the neighbors
     detected via CDP
 
-    returns the device visited, plus its neighbors
+    returns a VisitResult for the device visited, with its neighbors and
+    facts. neighbors is None if the device could not be visited, and the
+    VisitResult's error is why (see parsers.base.error_reason).
     '''
-    global failed
+    setup()
+    return visit_device(device, session_pool, latency_profile, config.credentials,
+                        device_writer)
 
-    neighbors, device_facts = None, None
+def visit_device(device, session_pool, latency_profile, credentials, writer=None, batch=True):
+    '''
+    get_neighbors with the session pool, latency profile and credentials
+    given rather than set up. The device is queued on writer for the
+    database, or not stored anywhere if writer is None. batch=False sends
+    the commands one at a time instead of in one batch
+    '''
+    neighbors, device_facts, device_obj = None, None, None
+    skipped = False
+    error, reason = {}, None
     device_name = device['device_name']
+    start = time.time()
 
     try:
-        parser = class_mapping.get(device['device_class'])
+        parser = parser_registry.get(device['device_class'])
         if not parser:
             raise RuntimeError('No parser found for {}'.format(device))
-        device_obj = parser(device_name, config.credentials)
-        if device_obj.connect():
-            neighbors = device_obj.get_neighbors()
-            device_facts = device_obj.get_facts()
-            device_obj.disconnect()
+        # discovery and facts share the one pooled session to the device
+        device_obj = parser(device_name, credentials, session_pool,
+                            latency_profile, device.get('device_model'),
+                            address=device.get('ip_address'))
+        if not device_obj.connect():
+            e = device_obj.connect_error
+            error, reason = dict(error='{}: {}'.format(type(e).__name__, e)), error_reason(e)
+        else:
+            if can_reuse_neighbors(device_obj):
+                # nothing changed since the last run - skip discovery and facts
+                neighbors, skipped = previous_run.adj_list[device_name], True
+            else:
+                # discovery and facts commands go out in one batch
+                if batch:
+                    device_obj.prefetch()
+                neighbors = device_obj.discover_neighbors()
+                device_facts = device_obj.gather_facts()
 
     except Exception as e:
-        print("****{}**** failed connecting to root. Error ****{}****".format(device_name, e))
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        print(repr(traceback.extract_tb(exc_traceback)))
-        failed.append(device_name)
+        error, reason = error_fields(e), error_reason(e)
+        neighbors = None
 
 
     finally:
 
-        if device_obj.is_connected:
+        if device_obj:
             device_obj.disconnect()
         if device_facts:
             device.update(device_facts)
-        saved = save_node_to_db(device)
-
-        print('Saved new device to database - {}'.format(device))
-        return device_name,  neighbors
+        if writer and not skipped:
+            writer.add(device)
+        elapsed = time.time() - start
+        if neighbors is None:
+            log_device(device_name, 'failed', elapsed, reason=reason, **error)
+        else:
+            log_device(device_name, 'skipped' if skipped else 'visited', elapsed,
+                       neighbors=len(neighbors),
+                       facts_path=device_facts.get('facts_path') if device_facts else None)
+        return VisitResult(device_name, neighbors, device_facts, elapsed, reason)
+
+# set by main() in incremental mode
+previous_run = None
+
+def output_path(type, ext='json'):
+    ''' {date}_{type}.{ext} - where the results of today's run go '''
+    date = str(datetime.datetime.today()).split()[0]
+    return '{date}_{type}.{ext}'.format(date=date, type=type, ext=ext)
 
+def load_previous_run():
+    ''' previous adjacency list plus the uptimes stored in the database '''
+    adj_list_path = config.previous_adj_list or latest_adj_list()
+    if not adj_list_path:
+        print('No previous adjacency list found - running a full crawl')
+        return None
 
-# define data structures to be used
-queue, failed, visited = set(), list(), list()
+    print('Incremental crawl against {}'.format(adj_list_path))
+    uptimes = dict(NetworkDevice.objects.values_list('device_name', 'uptime_seconds'))
+    return PreviousRun.load(adj_list_path, uptimes)
 
-# credentials for devices needs to be in global scope to allow multiprocessing to use it.
-if not config.credentials:
-    raise RuntimeError('Must provide valid credentials to start!')
+def crawl_priority():
+    '''
+    order of the frontier - big chassis first, then the devices whose visit
+    took longest and that had the most neighbors in the previous crawl.
+    Called before today's crawl stream is opened
+    '''
+    return DevicePriority.from_history(latest_checkpoint(),
+                                       config.previous_adj_list or latest_adj_list(),
+                                       latency_profile)
 
-save_creds_to_db(config.credentials)
-creds = Credentials.objects.get(username=config.credentials.username)
-class_mapping = {'cisco_ios': cisco.CiscoBaseParser,
-           'cisco_nxos': cisco.CiscoNxosParser}
+def shutdown():
+    '''
+    close the pooled sessions, write out the devices still queued for the
+    database and print what it all cost. Also run by every worker process
+    of the multiprocess engine.
+    '''
+    if session_pool is None:
+        # setup() never ran
+        return
+    session_pool.close_all()
+    device_writer.close()
+
+    summary = session_pool.summary()
+    print('{devices} devices, {handshakes} SSH handshakes in {handshake_time:.1f}s, '
+          '{reuses} session reuses'.format(**summary))
+    if summary['repeated_handshakes']:
+        print('Devices with more than one handshake: {}'.format(
+            ', '.join(summary['repeated_handshakes'])))
+
+    print('{devices} devices written to the database in {batches} batches '
+          '({created} created, {updated} updated) in {seconds:.1f}s, '
+          'slowest batch {slowest_batch:.2f}s'.format(**device_writer.summary()))
+
+    latency_profile.save()
+    print(latency_profile.summary())
+    print(parser_registry.summary())
+    print(facts_stats.summary())
+
+    if previous_run:
+        print(previous_run.summary())
+
+    print(metrics.summary())
+    if config.metrics_textfile:
+        path = output_path('metrics', 'prom') if config.metrics_textfile is True else config.metrics_textfile
+        if multiprocessing.parent_process() is not None:
+            # a worker of the multiprocess engine - one file per process
+            path = '{}.{}'.format(path, os.getpid())
+        metrics.write_textfile(path)
+
+def requeue_for_db(adj_list, facts):
+    '''
+    resumed crawl - queue the devices found in the checkpoint for the
+    database again. Devices visited after the last DB flush before the
+    crawl died would be missing otherwise.
+    '''
+    devices = dict((dev['device_name'], dev) for neighbors in adj_list.values() if neighbors
+                   for dev in neighbors.values())
+    for device_name, device_facts in facts.items():
+        device = dict(devices.get(device_name, {}), device_name=device_name)
+        device.update(device_facts)
+        device_writer.add(device)
+
+def main(resume=None):
+    '''
+    crawl the network and return (adjacency list, failed list). The failed
+    list is [{"device_name": ..., "reason": ..., "attempts": ...}]
 
-def main():
+    resume - path of a {date}_crawl.ndjson checkpoint, or True for the most
+    recent one, to continue an interrupted crawl from
+    '''
+    global previous_run
 
     root_node = config.root_node
     if not root_node:
         raise RuntimeError('Must provide a valid root node!')
 
-    filter_re = None
-    if config.ignore_regex:
-        filter_re = re.compile(config.ignore_regex)
-
-    def bool_logic(node):
-
-        node_name = node['device_name']
-
-        if filter_re:
-            names_bool = lambda x: filter_re.search(x) is None
-
-            return bool(node_name not in visited and names_bool(node_name)) and (node_name not in failed and names_bool(node_name))
-
-        return bool(node_name not in visited and node_name not in failed)
-
-    root_neighbors = get_root_neighbors(root_node)
-
-    # begin building adj list
-    neighbor_adj_list = dict()
-    neighbor_adj_list[root_node.device_name] = root_neighbors
-
-    # add the root's neighbors to the queue
-    queue.update(neigh for neigh in root_neighbors.values())
-
-    pool = ThreadPool(processes=16)
-
-    while queue:
-
-        nodes_to_process = set(filter(bool_logic, queue))
-        # pop all of the nodes from the queue and put them into a processing deque. Then filter what devices need to actually be processed.
-        # we do this so that we remove everything from the queue at this point and give all "workable" devices to the thread pool.
-        queue.clear()
-
+    setup()
+
+    if config.incremental:
+        previous_run = load_previous_run()
+
+    # visited/failed sets, ignore_regex filter and hostname canonicalization
+    state = CrawlState(config.ignore_regex, config.domain_names, metrics=metrics)
+    priority = crawl_priority() if config.crawl_priority else None
+
+    if config.metrics_port:
+        address = metrics.serve(config.metrics_port)
+        print('Serving metrics on http://{}:{}/metrics'.format(*address))
+    root_name = root_node.device_name
+    adj_list = {}
+
+    checkpoint = output_path('crawl', 'ndjson')
+    if resume:
+        checkpoint = latest_checkpoint() if resume is True else resume
+        if not checkpoint:
+            raise RuntimeError('No checkpoint found to resume from!')
+        adj_list, facts = load_checkpoint(checkpoint, state)
+        print('Resuming crawl from {} - {} devices visited, {} failed'.format(
+            checkpoint, len(state.visited), len(state.failed)))
+        requeue_for_db(adj_list, facts)
+
+    root_neighbors = adj_list.get(root_name)
+    if root_neighbors is None:
+        root_neighbors = get_root_neighbors(root_node)
+
+    # every visited/failed device is streamed to disk as soon as it is known.
+    # The stream is also the checkpoint journal used by --resume
+    sink = None
+    if config.stream_output:
+        sink = NdjsonSink(checkpoint, config.stream_fsync_interval, append=bool(resume))
+        if root_name not in adj_list:
+            sink.write_node(root_name, root_neighbors)
+
+    # 'threadpool' crawls one BFS level at a time, 'asyncio' queues each
+    # device's neighbors as soon as the device returns, 'multiprocess'
+    # hands devices out to worker processes
+    crawl = get_engine(config.crawl_engine)
+    engine_options = dict(concurrency=config.crawl_concurrency,
+                          on_result=sink.write_result if sink else None,
+                          priority=priority)
+
+    if config.crawl_engine == 'multiprocess':
+        engine_options.update(processes=config.worker_processes,
+                              batch_size=config.worker_batch_size,
+                              setup=setup_worker,
+                              teardown=shutdown,
+                              result_timeout=config.worker_result_timeout)
+        if config.coordinator_address:
+            engine_options.update(address=config.coordinator_address,
+                                  authkey=config.coordinator_authkey)
+        # forked workers must not share this process' DB connection
+        from django.db import connections
+        connections.close_all()
+
+    # devices that failed on a timeout or a dropped session get another
+    # chance once the crawl is done (see inventory/retry.py)
+    retry_policy = RetryPolicy(attempts=config.retry_attempts,
+                               backoff=config.retry_backoff,
+                               max_backoff=config.retry_max_backoff)
+    try:
+        neighbor_adj_list, failed = crawl_with_retries(crawl, root_name, root_neighbors,
+                                                       get_neighbors, state=state,
+                                                       policy=retry_policy,
+                                                       adj_list=adj_list, **engine_options)
+    finally:
+        shutdown()
+        if sink:
+            sink.close()
 
-        print('#' * 80)
-        print()
-        print()
-        print(len(nodes_to_process))
-        print()
-        print()
-        print('#' * 80)
-        print()
-        print()
-        print(nodes_to_process)
-        print()
-        print()
-        print('#' * 80)
+    # every failed device, with the reason of its last failure and the
+    # number of times it was tried
+    return neighbor_adj_list, state.failure_report()
 
-        pool_results = [pool.apply_async(get_neighbors, args=(dev,)) for dev in nodes_to_process]
 
-        for result in pool_results:
-            pool_data = result.get()
-            # if ssh session failed, function returns back None
-            if not pool_data:
-                continue
+def run(argv=None):
+    '''
+    command line entry point - crawl the network and write the adjacency
+    list and failed list of the run
+    '''
+    parser = argparse.ArgumentParser(description='Crawl the network and build the inventory')
+    parser.add_argument('--resume', nargs='?', const=True, metavar='CHECKPOINT',
+                        help='continue an interrupted crawl from its {date}_crawl.ndjson '
+                             '(default: the most recent one)')
+    args = parser.parse_args(argv)
 
-            node, neighbors = pool_data
+    adj_list, failed = main(resume=args.resume)
 
-            visited.append(node)
-            # add node and all of its discovered neighbors to the adj_list
-            neighbor_adj_list[node] = neighbors
-            # prune off devices that we don't want to visit before adding discovered neighbors into the queue
-            for dev in neighbors.values():
-                node = dev['device_name']
-                if bool_logic(node):
-                    queue.add(node)
+    with open(output_path('adj_list'), 'w') as fh:
+        fh.write(json.dumps(adj_list))
 
-    return neighbor_adj_list, failed
+    with open(output_path('failed_list'), 'w') as fh:
+        fh.write(json.dumps(failed))
 
 
 if __name__ == '__main__':
-
-    date = str(datetime.datetime.today()).split()[0]
-
-    adj_list, failed = main()
-    file_name_fmt = '{date}_{type}.json'
-
-    with open(file_name_fmt.format(date=date, type='adj_list'), 'w') as fh:
-        fh.write(json.dumps(adj_list))
-
-    with open(file_name_fmt.format(date=date, type='failed_list'), 'w') as fh:
-        fh.write(json.dumps(failed))
+    run()
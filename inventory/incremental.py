@@ -0,0 +1,84 @@
+''' Incremental re-crawl driven by the previous run's results.
+
+    Most of the network does not change from one night to the next. In
+    incremental mode every device is still logged into, but only to run a
+    cheap probe (uptime and number of CDP neighbors - see
+    BaseParser.probe). The full discovery and facts commands are only run
+    when the probe says the neighbor table could have changed:
+
+    - the device was not in the previous adjacency list
+    - its uptime went backwards, meaning it was reloaded
+    - it has a different number of CDP neighbors than last time
+    - the probe failed, or there is no uptime to compare with
+
+    Everything else reuses its neighbors from the previous adjacency list
+    and is not written to the database again.
+'''
+from collections import Counter
+import glob
+import json
+import os
+import threading
+
+ADJ_LIST_GLOB = '*_adj_list.json'
+
+
+def latest_adj_list(directory='.'):
+    ''' path of the most recent {date}_adj_list.json in directory, or None '''
+    paths = sorted(glob.glob(os.path.join(directory, ADJ_LIST_GLOB)))
+    return paths[-1] if paths else None
+
+
+class PreviousRun(object):
+
+    def __init__(self, adj_list, uptimes):
+        '''
+        adj_list - adjacency list written by the previous run
+        uptimes - {device_name: uptime_seconds} as stored by the previous run
+        '''
+        self.adj_list = adj_list
+        self.uptimes = uptimes
+        self.report = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, adj_list_path, uptimes):
+        with open(adj_list_path) as fh:
+            return cls(json.load(fh), uptimes)
+
+    def refresh_reason(self, device_name, probe):
+        '''
+        return why device_name has to be fully re-crawled, or None if its
+        neighbors from the previous run can be reused
+        '''
+        neighbors = self.adj_list.get(device_name)
+        if neighbors is None:
+            return 'new'
+        if probe is None:
+            return 'probe_failed'
+        uptime, neighbor_count = probe
+        previous_uptime = self.uptimes.get(device_name)
+        if uptime is None or previous_uptime is None:
+            return 'no_uptime'
+        if uptime < previous_uptime:
+            return 'reloaded'
+        if neighbor_count != len(neighbors):
+            return 'neighbors_changed'
+        return None
+
+    def record(self, reason):
+        with self._lock:
+            self.report['refreshed' if reason else 'skipped'] += 1
+            if reason:
+                self.report[reason] += 1
+
+    def summary(self):
+        with self._lock:
+            report = dict(self.report)
+        return ('incremental crawl: {} devices skipped, {} refreshed '
+                '({} new, {} reloaded, {} neighbor count changed, {} probe failed, '
+                '{} without uptime)'.format(
+                    report.get('skipped', 0), report.get('refreshed', 0),
+                    report.get('new', 0), report.get('reloaded', 0),
+                    report.get('neighbors_changed', 0), report.get('probe_failed', 0),
+                    report.get('no_uptime', 0)))
@@ -0,0 +1,122 @@
+''' Streaming NDJSON output of the crawl.
+
+    NdjsonSink writes one JSON record per line as the crawl goes, so a
+    crash hours into a crawl still leaves everything found so far on disk:
+
+        {"type": "node", "node": ..., "neighbors": {...}, "facts": {...}, "elapsed": 1.2}
+        {"type": "failure", "node": ..., "reason": ..., "elapsed": 30.0}
+
+    The file is flushed after every record and fsync'ed at most every
+    `fsync_interval` seconds. A new crawl starts the file over, a resumed
+    one (append=True) adds to it - after cutting off a last line left half
+    written by the crash, which would otherwise end up mid-file.
+
+    The reader side works on the stream lazily: iter_records() and
+    iter_adjacency() are generators, and a last line cut short by a crash
+    is skipped. load_adjacency() rebuilds the adjacency dict and failed
+    list that gather_inventory writes at the end of a run.
+'''
+import json
+import os
+import threading
+import time
+
+
+class NdjsonSink(object):
+
+    def __init__(self, path, fsync_interval=5.0, append=False):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        if append:
+            _truncate_partial_line(path)
+        self._fh = open(path, 'a' if append else 'w')
+        self._lock = threading.Lock()
+        self._last_fsync = time.time()
+
+    def write_node(self, node, neighbors, facts=None, elapsed=None):
+        self._write(dict(type='node', node=node, neighbors=neighbors,
+                         facts=facts, elapsed=elapsed))
+
+    def write_failure(self, node, reason=None, elapsed=None):
+        self._write(dict(type='failure', node=node, reason=reason, elapsed=elapsed))
+
+    def write_result(self, result):
+        ''' write a crawler.VisitResult, as handed to an engine's on_result '''
+        if result.neighbors is None:
+            self.write_failure(result.device_name, result.error, result.elapsed)
+        else:
+            self.write_node(result.device_name, result.neighbors,
+                            result.facts, result.elapsed)
+
+    def close(self):
+        with self._lock:
+            if self._fh.closed:
+                return
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            now = time.time()
+            if now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._fh.fileno())
+                self._last_fsync = now
+
+
+def _truncate_partial_line(path, chunk_size=65536):
+    ''' cut the file at path after its last newline, if it exists '''
+    try:
+        fh = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with fh:
+        end = fh.seek(0, os.SEEK_END)
+        size = end
+        while end > 0:
+            start = max(0, end - chunk_size)
+            fh.seek(start)
+            newline = fh.read(end - start).rfind(b'\n')
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            fh.truncate(end)
+
+
+def iter_records(path):
+    ''' yield the records of an NDJSON crawl file one at a time '''
+    with open(path) as fh:
+        for line in fh:
+            if not line.endswith('\n'):
+                # last record cut short by a crash
+                return
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_adjacency(path):
+    ''' yield (node, neighbors) for every node record '''
+    for record in iter_records(path):
+        if record['type'] == 'node':
+            yield record['node'], record['neighbors']
+
+
+def load_adjacency(path):
+    '''
+    rebuild (adjacency list, failed list) from a crawl file. A device that
+    failed and was later visited successfully only counts as visited.
+    '''
+    adj_list, failed = {}, {}
+    for record in iter_records(path):
+        if record['type'] == 'node':
+            adj_list[record['node']] = record['neighbors']
+            failed.pop(record['node'], None)
+        elif record['type'] == 'failure' and record['node'] not in adj_list:
+            failed[record['node']] = True
+    return adj_list, sorted(failed)
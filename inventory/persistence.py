@@ -0,0 +1,166 @@
+''' Write-behind persistence of discovered devices.
+
+    Worker threads hand device facts to a DeviceWriter, which queues them
+    and writes them from a single background thread in batches of
+    `batch_size`. Each batch is one transaction: one SELECT to find which
+    devices already exist, then a bulk_create for the new ones and a
+    bulk_update for the rest. A batch is also flushed after
+    `flush_interval` seconds so a slow crawl still makes progress on disk.
+
+    A batch that fails on a database error is written again one device at
+    a time. bulk_update needs django 2.2 or later (see requirements.txt).
+
+    close() flushes whatever is left and stops the writer thread. Timing
+    of every batch is kept in `batches`. django is imported by the writer
+    thread, not with this module.
+'''
+from collections import namedtuple
+import queue
+import threading
+import time
+
+BatchStats = namedtuple('BatchStats', 'size created updated seconds')
+
+# NetworkDevice fields written for every device, other than device_name
+DEVICE_FIELDS = ('ip_address', 'ipv6_address', 'device_class', 'model',
+                 'serial_number', 'os_version', 'uptime_seconds', 'credentials',
+                 'ssh_port', 'vendor', 'domain')
+
+_STOP = object()
+
+
+def device_fields(dev_facts, defaults):
+    ''' map the facts gathered about a device onto NetworkDevice fields '''
+    fields = dict(
+        ip_address       = dev_facts.get('ip_address'),
+        ipv6_address     = dev_facts.get('ipv6_address'),
+        device_class     = dev_facts.get('device_class'),
+        model            = dev_facts.get('device_model'),
+        serial_number    = dev_facts.get('serial_number'),
+        os_version       = dev_facts.get('os_version'),
+        uptime_seconds   = dev_facts.get('uptime'),
+        vendor           = dev_facts.get('device_vendor'),
+        )
+    fields.update(defaults)
+    return fields
+
+
+class DeviceWriter(object):
+
+    def __init__(self, model, batch_size=500, flush_interval=30, defaults=None, metrics=None):
+        '''
+        model - the NetworkDevice model class
+        defaults - fields set on every device, such as credentials/ssh_port
+        metrics - optional parsers.metrics.Metrics to observe the batch times in
+        '''
+        self.model = model
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.defaults = defaults or {}
+        self.batches = []
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, dev_facts):
+        ''' queue a device to be written to the database '''
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='device-writer')
+                self._thread.daemon = True
+                self._thread.start()
+        self._queue.put((dev_facts['device_name'], device_fields(dev_facts, self.defaults)))
+
+    def close(self):
+        ''' write out everything still queued and stop the writer thread '''
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def summary(self):
+        seconds = sum(b.seconds for b in self.batches)
+        return dict(batches=len(self.batches),
+                    devices=sum(b.size for b in self.batches),
+                    created=sum(b.created for b in self.batches),
+                    updated=sum(b.updated for b in self.batches),
+                    seconds=seconds,
+                    slowest_batch=max([b.seconds for b in self.batches] or [0]))
+
+    def _run(self):
+        # device_name -> fields; a device queued twice is only written once
+        pending = {}
+        deadline = time.time() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item:
+                device_name, fields = item
+                pending[device_name] = fields
+
+            if len(pending) >= self.batch_size or time.time() >= deadline:
+                if pending:
+                    self._flush(pending)
+                    pending = {}
+                deadline = time.time() + self.flush_interval
+
+        if pending:
+            self._flush(pending)
+        # the writer thread has its own DB connection
+        from django.db import connection
+        connection.close()
+
+    def _flush(self, pending):
+        from django.db import DatabaseError, transaction
+
+        start = time.time()
+        try:
+            with transaction.atomic():
+                created, updated = self._write_batch(pending)
+        except DatabaseError as e:
+            print("Error writing batch of {} devices to DJANGO database! Error was {}. "
+                  "Retrying one device at a time".format(len(pending), e))
+            created, updated = self._write_one_by_one(pending)
+
+        self.batches.append(BatchStats(len(pending), created, updated, time.time() - start))
+        if self.metrics:
+            self.metrics.observe('db_write', time.time() - start)
+
+    def _write_batch(self, pending):
+        existing = set(self.model.objects.filter(device_name__in=list(pending))
+                                         .values_list('device_name', flat=True))
+
+        new_devs, old_devs = [], []
+        for device_name, fields in pending.items():
+            dev = self.model(device_name=device_name, **fields)
+            (old_devs if device_name in existing else new_devs).append(dev)
+
+        if new_devs:
+            self.model.objects.bulk_create(new_devs, batch_size=self.batch_size)
+        if old_devs:
+            self.model.objects.bulk_update(old_devs, DEVICE_FIELDS, batch_size=self.batch_size)
+
+        return len(new_devs), len(old_devs)
+
+    def _write_one_by_one(self, pending):
+        created, updated = 0, 0
+        for device_name, fields in pending.items():
+            try:
+                _, new = self.model.objects.update_or_create(device_name=device_name,
+                                                             defaults=fields)
+            except Exception as e:
+                print("Error creating device on DJANGO database! for device {}. Error was {}".format(device_name, e))
+                continue
+            if new:
+                created += 1
+            else:
+                updated += 1
+        return created, updated
@@ -0,0 +1,80 @@
+''' Second chances for the devices a crawl could not visit.
+
+    Every failed visit has a reason (see parsers.base.error_reason). Only
+    timeouts and connection errors are worth another try: a refused login
+    is not retried before the next run, so as not to lock the account, and
+    a parse error fails the same way every time.
+
+    crawl_with_retries() runs a crawl engine, then puts the failed devices
+    with a retryable reason back on the frontier and runs the engine again,
+    so the part of the network behind a device that comes back is crawled
+    too. It does so in rounds, at most RetryPolicy.attempts visits per
+    device. Round n waits backoff * 2 ** (n - 1) seconds first (at most
+    max_backoff, plus some jitter). The wait is between rounds, with no
+    device being visited, so a device waiting for its retry never holds a
+    worker that a device of the first pass could use.
+'''
+import random
+import time
+
+from .crawl_state import CrawlState
+
+RETRYABLE = ('timeout', 'connection')
+
+
+class RetryPolicy(object):
+
+    def __init__(self, attempts=3, backoff=5.0, max_backoff=60.0, reasons=RETRYABLE,
+                 jitter=0.1, sleep=time.sleep):
+        '''
+        attempts - max number of visits of a device, the first one included
+        reasons - the failure reasons that are retried
+        jitter - fraction of the backoff added at random
+        '''
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reasons = reasons
+        self.jitter = jitter
+        self.sleep = sleep
+
+    def delay(self, retry_round):
+        delay = min(self.backoff * 2 ** (retry_round - 1), self.max_backoff)
+        return delay * (1 + self.jitter * random.random())
+
+    def due(self, state):
+        ''' names of the failed devices to retry, sorted '''
+        return sorted(device_name for device_name in state.failed
+                      if state.reasons.get(device_name) in self.reasons
+                      and state.attempts[device_name] < self.attempts)
+
+
+def crawl_with_retries(crawl, root_name, root_neighbors, visit, state=None, policy=None,
+                       adj_list=None, **engine_options):
+    '''
+    crawl the network with the engine `crawl`, then retry its failures as
+    the policy says. Takes and returns what the engines do.
+    '''
+    state = state or CrawlState()
+    policy = policy or RetryPolicy()
+    adj_list, failed = crawl(root_name, root_neighbors, visit, state=state,
+                             adj_list=adj_list, **engine_options)
+
+    retry_round = 0
+    while True:
+        due = policy.due(state)
+        if not due:
+            break
+        retry_round += 1
+        delay = policy.delay(retry_round)
+        print('Retrying {} failed devices in {:.1f}s (round {})'.format(len(due), delay, retry_round))
+        policy.sleep(delay)
+        for device_name in due:
+            state.retry(device_name)
+        # the engine starts over from every neighbor not visited yet - the
+        # devices being retried
+        root_neighbors = adj_list[root_name]
+        adj_list, failed = crawl(root_name, root_neighbors, visit, state=state,
+                                 adj_list=adj_list, **engine_options)
+
+    return adj_list, failed
@@ -0,0 +1,271 @@
+''' Compact in-memory store of the crawl's adjacency list.
+
+    The adjacency list is
+
+        {device_name: {local_interface: {"device_name": ..., "remote_interface": ...,
+                                         "ip_address": ..., "device_model": ..., ...}}}
+
+    so the model, version and addresses of a device are repeated, as their
+    own dict and strings, in the neighbor table of every device it is
+    connected to. Topology keeps instead:
+
+    - device and interface names interned to integer ids
+    - one edge per neighbor record, in array columns: src, dst, local_if,
+      remote_if, and the id of the DeviceRecord describing dst
+    - DeviceRecords (__slots__ objects with the rest of a neighbor record),
+      shared by every edge that saw the same device the same way
+
+    to_adj_list() gives back exactly the adjacency list the store was built
+    from, and memory_report() compares the size of the two.
+
+    A links_only topology, as inventory.analytics loads, keeps only the
+    first DeviceRecord of every device - what device() returns - instead
+    of one per neighbor record, so building it costs one record per device
+    rather than one per link. It cannot give back the adjacency list.
+'''
+from array import array
+import json
+import sys
+
+# a field that was not in the neighbor record, as opposed to one set to None
+MISSING = object()
+
+# neighbor record fields kept in the edge columns
+EDGE_FIELDS = ('device_name', 'remote_interface')
+
+
+class DeviceRecord(object):
+    ''' a neighbor record without its device_name and interfaces '''
+
+    __slots__ = ('ip_address', 'ipv6_address', 'device_model', 'os_version',
+                 'device_class', 'device_vendor', 'extra')
+
+    FIELDS = ('ip_address', 'ipv6_address', 'device_model', 'os_version',
+              'device_class', 'device_vendor')
+
+    def __init__(self, key):
+        ''' key - as returned by key_of() '''
+        (self.ip_address, self.ipv6_address, self.device_model, self.os_version,
+         self.device_class, self.device_vendor, self.extra) = key
+
+    @classmethod
+    def key_of(cls, neighbor):
+        '''
+        the values of a neighbor record's fields, MISSING where it doesn't
+        have one, and then any other fields in the order they came
+        '''
+        get = neighbor.get
+        values = (get('ip_address', MISSING), get('ipv6_address', MISSING),
+                  get('device_model', MISSING), get('os_version', MISSING),
+                  get('device_class', MISSING), get('device_vendor', MISSING))
+        known = (len(values) - values.count(MISSING) +
+                 ('device_name' in neighbor) + ('remote_interface' in neighbor))
+        extra = None
+        if len(neighbor) > known:
+            extra = tuple((key, value) for key, value in neighbor.items()
+                          if key not in cls.FIELDS and key not in EDGE_FIELDS)
+        return values + (extra,)
+
+    def to_dict(self, neighbor=None):
+        ''' the fields of the record added to neighbor '''
+        neighbor = {} if neighbor is None else neighbor
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not MISSING:
+                neighbor[field] = value
+        if self.extra:
+            neighbor.update(self.extra)
+        return neighbor
+
+    def __repr__(self):
+        return 'DeviceRecord({})'.format(self.to_dict())
+
+
+class Topology(object):
+
+    def __init__(self, links_only=False):
+        self.links_only = links_only
+        self.names = []
+        self._name_ids = {}
+        self.interfaces = []
+        self._interface_ids = {}
+        self.records = []
+        self._record_ids = {}
+
+        # edge columns, one entry per neighbor record
+        self.src = array('i')
+        self.dst = array('i')
+        self.local_if = array('i')
+        # -1 when the record has no remote_interface
+        self.remote_if = array('i')
+        self.record = array('i')
+        # devices that have a neighbor table, in the order they were added
+        self.devices = array('i')
+        # devices whose neighbor table is None rather than a dict
+        self.null_tables = set()
+        # first record seen of every device, -1 if it was never a neighbor
+        self.device_record = array('i')
+
+    @classmethod
+    def from_adj_list(cls, adj_list, links_only=False):
+        return cls.from_items(adj_list.items(), links_only)
+
+    @classmethod
+    def from_items(cls, items, links_only=False):
+        ''' from (device_name, neighbors) pairs, such as ndjson.iter_adjacency() '''
+        topology = cls(links_only)
+        for device_name, neighbors in items:
+            topology.add_device(device_name, neighbors)
+        return topology
+
+    @classmethod
+    def load(cls, adj_list_path, links_only=False):
+        ''' from an {date}_adj_list.json written by gather_inventory '''
+        with open(adj_list_path) as fh:
+            return cls.from_adj_list(json.load(fh), links_only)
+
+    def node_id(self, name):
+        ''' integer id of a device name, added if it is new '''
+        node = self._name_ids.get(name)
+        if node is None:
+            node = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+            self.device_record.append(-1)
+        return node
+
+    def find(self, name):
+        ''' integer id of a device name, or None if it is not in the topology '''
+        return self._name_ids.get(name)
+
+    def _interface_id(self, intf):
+        intf_id = self._interface_ids.get(intf)
+        if intf_id is None:
+            intf_id = self._interface_ids[intf] = len(self.interfaces)
+            self.interfaces.append(intf)
+        return intf_id
+
+    def _record_id(self, neighbor):
+        key = DeviceRecord.key_of(neighbor)
+        try:
+            record_id = self._record_ids.get(key)
+            hashable = True
+        except TypeError:
+            # a field that can't be hashed - the record is not shared
+            record_id, hashable = None, False
+        if record_id is None:
+            record_id = len(self.records)
+            self.records.append(DeviceRecord(key))
+            if hashable:
+                self._record_ids[key] = record_id
+        return record_id
+
+    def add_device(self, device_name, neighbors):
+        ''' add a device and its neighbor table, as found in the adjacency list '''
+        src = self.node_id(device_name)
+        self.devices.append(src)
+        if neighbors is None:
+            self.null_tables.add(src)
+            return
+
+        # once per neighbor record of the whole network - the look-ups are
+        # hoisted out of the loop, and the ids of known names taken
+        # straight from the dicts
+        name_ids, interface_ids = self._name_ids, self._interface_ids
+        node_id, interface_id, record_id = self.node_id, self._interface_id, self._record_id
+        device_record, links_only = self.device_record, self.links_only
+        add_dst, add_local, add_remote = self.dst.append, self.local_if.append, self.remote_if.append
+        add_record = self.record.append
+
+        for local_intf, neighbor in neighbors.items():
+            name = neighbor['device_name']
+            dst = name_ids.get(name)
+            if dst is None:
+                dst = node_id(name)
+            if links_only:
+                if device_record[dst] == -1:
+                    device_record[dst] = record_id(neighbor)
+            else:
+                record = record_id(neighbor)
+                if device_record[dst] == -1:
+                    device_record[dst] = record
+                add_record(record)
+            add_dst(dst)
+            local = interface_ids.get(local_intf)
+            add_local(interface_id(local_intf) if local is None else local)
+            remote_intf = neighbor.get('remote_interface', MISSING)
+            if remote_intf is MISSING:
+                add_remote(-1)
+            else:
+                remote = interface_ids.get(remote_intf)
+                add_remote(interface_id(remote_intf) if remote is None else remote)
+        self.src.extend(array('i', [src]) * len(neighbors))
+
+    @property
+    def node_count(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    def device(self, name):
+        ''' DeviceRecord of a device as its neighbors first reported it, or None '''
+        node = self.find(name)
+        if node is None or self.device_record[node] == -1:
+            return None
+        return self.records[self.device_record[node]]
+
+    def neighbor_dict(self, edge):
+        ''' the neighbor record of an edge, as in the adjacency list '''
+        if self.links_only:
+            raise ValueError('a links_only topology has no neighbor records')
+        neighbor = {'device_name': self.names[self.dst[edge]]}
+        if self.remote_if[edge] != -1:
+            neighbor['remote_interface'] = self.interfaces[self.remote_if[edge]]
+        return self.records[self.record[edge]].to_dict(neighbor)
+
+    def to_adj_list(self):
+        ''' the adjacency list the topology was built from '''
+        adj_list = {}
+        for node in self.devices:
+            adj_list[self.names[node]] = None if node in self.null_tables else {}
+        for edge in range(len(self.src)):
+            adj_list[self.names[self.src[edge]]][self.interfaces[self.local_if[edge]]] = \
+                self.neighbor_dict(edge)
+        return adj_list
+
+    def memory_usage(self):
+        ''' bytes used by the topology, counting every object once '''
+        return deep_sizeof(self)
+
+    def memory_report(self, adj_list=None):
+        ''' size of the topology next to the adjacency list it stands for '''
+        adj_list = self.to_adj_list() if adj_list is None else adj_list
+        dict_size, own_size = deep_sizeof(adj_list), self.memory_usage()
+        return ('{} devices, {} neighbor records: adjacency dict {:.1f} MB, topology {:.1f} MB '
+                '({:.1f}x)'.format(self.node_count, self.edge_count,
+                                           dict_size / 1e6, own_size / 1e6,
+                                           dict_size / float(own_size)))
+
+
+def deep_sizeof(obj):
+    ''' bytes of obj and everything it references, each object counted once '''
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is MISSING:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__slots__'):
+            stack.extend(getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot))
+        elif hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+    return total
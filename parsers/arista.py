@@ -0,0 +1,148 @@
+''' Arista EOS parser.
+
+    EOS speaks LLDP rather than CDP, and returns any show command as JSON
+    with '| json', so neighbors and facts are read from JSON instead of
+    being scraped from text with regexes. The text of 'show version' is
+    only read if its JSON can't be.
+'''
+import re
+import time
+
+from .base import BaseParser, Cmd, json_loads
+from .uptime import parse_uptime
+
+# 'Arista Networks EOS version 4.20.1F running on an Arista Networks DCS-7050SX-64'
+MODEL_RE = re.compile(r'running on an? (?:Arista Networks )?(\S+)')
+
+# text 'show version' - the fields of its JSON they stand for
+VERSION_TEXT_FIELDS = (('modelName', re.compile(r'^Arista (\S+)', re.MULTILINE)),
+                       ('serialNumber', re.compile(r'^Serial number: *(\S+)', re.MULTILINE)),
+                       ('version', re.compile(r'^Software image version: *(\S+)', re.MULTILINE)),
+                       ('uptime', re.compile(r'^Uptime: *(.+)', re.MULTILINE)))
+
+
+class AristaEosParser(BaseParser):
+
+    @property
+    def device_class(self):
+        return 'arista_eos'
+
+    @property
+    def discovery_command(self):
+        return Cmd('show lldp neighbors detail | json', 2)
+
+    @property
+    def neighbor_fields(self):
+        ''' not used - the neighbors are read from JSON, see parse_neighbors '''
+        return ()
+
+    @property
+    def extra_facts_cmds(self):
+        return {'version': Cmd('show version', 1)}
+
+    @property
+    def structured_facts_cmds(self):
+        return {'version_json': Cmd('show version | json', 1)}
+
+    @property
+    def probe_commands(self):
+        return (Cmd('show version | json', 1),
+                Cmd('show lldp neighbors | json', 1))
+
+    def parse_neighbors(self, neighbor_output):
+        '''
+        {"lldpNeighbors": {"Ethernet1": {"lldpNeighborInfo": [
+            {"systemName": "sw2", "systemDescription": "Arista Networks EOS ...",
+             "neighborInterfaceInfo": {"interfaceId_v2": "Ethernet1", ...},
+             "managementAddresses": [{"addressType": "ipv4", "address": "10.0.0.2"}]}]}}}
+        '''
+        all_neighbors = []
+        interfaces = json_loads(neighbor_output).get('lldpNeighbors', {})
+
+        for local_intf, info in interfaces.items():
+            for lldp in info.get('lldpNeighborInfo', []):
+                addresses = dict((addr.get('addressType'), addr.get('address'))
+                                 for addr in lldp.get('managementAddresses', []))
+                port = lldp.get('neighborInterfaceInfo', {})
+                description = lldp.get('systemDescription') or None
+                model = MODEL_RE.search(description) if description else None
+
+                all_neighbors.append(dict(
+                    device_name=lldp.get('systemName') or lldp.get('chassisId'),
+                    ip_address=addresses.get('ipv4'),
+                    ipv6_address=addresses.get('ipv6'),
+                    device_model=model.group(1) if model else None,
+                    local_interface=local_intf,
+                    remote_interface=(port.get('interfaceId_v2') or
+                                      (port.get('interfaceId') or '').strip('"') or None),
+                    os_version=description))
+
+        return [neighbor for neighbor in all_neighbors if neighbor['device_name']]
+
+    def parse_probe(self, uptime_output, neighbor_output):
+        uptime = self.uptime_seconds_of(json_loads(uptime_output))
+        neighbor_count = len(json_loads(neighbor_output).get('lldpNeighbors', []))
+        return uptime, neighbor_count
+
+    def normalize_intf_str(self, remote_intf):
+        ''' EOS interface names are short already - Ethernet1, Management1 '''
+        return remote_intf
+
+    @staticmethod
+    def uptime_seconds_of(version):
+        ''' EOS 4.20+ reports uptime, older ones only the boot time '''
+        if version.get('uptime') is not None:
+            return int(version['uptime'])
+        if version.get('bootupTimestamp') is not None:
+            return int(time.time() - version['bootupTimestamp'])
+        return None
+
+    def parse_structured_facts(self):
+        '''
+        collect additional info about device from 'show version | json':
+        {"modelName": "DCS-7050SX-64", "version": "4.20.1F",
+         "serialNumber": "JPE12345678", "uptime": 1234567.8, ...}
+        '''
+        self.version_data = json_loads(self.version_json)
+        return self.facts()
+
+    def parse_text_facts(self):
+        '''
+        the same from the text of 'show version':
+        Uptime:                 12 weeks, 3 days, 4 hours and 5 minutes
+        '''
+        self.version_data = {}
+        for field, regex in VERSION_TEXT_FIELDS:
+            match = regex.search(self.version)
+            if match:
+                self.version_data[field] = match.group(1).strip()
+        if self.version_data.get('uptime'):
+            self.version_data['uptime'] = parse_uptime(self.version_data['uptime'])
+        return self.facts()
+
+    def facts(self):
+        os_version = self.find_os_version()
+        serial_number = self.find_serial_number()
+        uptime = self.find_uptime()
+        model = self.find_model()
+
+        return dict(os_version=os_version,
+                    serial_number=serial_number,
+                    uptime=uptime,
+                    model=model)
+
+    def find_os_version(self):
+        self.os_version = self.version_data.get('version')
+        return self.os_version
+
+    def find_serial_number(self):
+        self.serial_number = self.version_data.get('serialNumber')
+        return self.serial_number
+
+    def find_uptime(self):
+        self.uptime_seconds = self.uptime_seconds_of(self.version_data)
+        return self.uptime_seconds
+
+    def find_model(self):
+        self.model = self.version_data.get('modelName')
+        return self.model
@@ -1,11 +1,138 @@
-import netmiko
+from collections import namedtuple
 import re
+import socket
+import threading
+import time
+from xml.parsers.expat import ExpatError
+
+from .classification import classify
+from .metrics import metrics
+
+try:
+    # faster drop-in for json.loads, when installed
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# a command sent to a device, and its netmiko delay_factor
+Cmd = namedtuple('Cmd', 'cmd delay')
+
+# compiled neighbor field regexes, per parser class
+_NEIGHBOR_FIELDS_CACHE = {}
+
+# returns the SSH connection class for a netmiko device_type - None for
+# netmiko.ssh_dispatcher. netmiko (and paramiko) take a few hundred ms to
+# import, so they are only imported when the first session is opened. The
+# simulated backend in parsers/simulated.py swaps it out to crawl without
+# live gear.
+ssh_dispatcher = None
+
+# why a device could not be visited, see error_reason()
+AUTH, TIMEOUT, CONNECTION, PARSE, OTHER = 'auth', 'timeout', 'connection', 'parse', 'other'
+
+# (device_class, device_model) whose structured output could not be used -
+# their facts are read from text output from then on
+_NO_STRUCTURED_OUTPUT = set()
+
+
+class FactsStats(object):
+    ''' how many devices got their facts from which path, and the parse time '''
+
+    def __init__(self):
+        self.devices = {}
+        self.parse_time = {}
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def record(self, path, seconds, fallback=False):
+        with self._lock:
+            self.devices[path] = self.devices.get(path, 0) + 1
+            self.parse_time[path] = self.parse_time.get(path, 0.0) + seconds
+            self.fallbacks += fallback
+
+    def summary(self):
+        with self._lock:
+            paths = ', '.join('{} via {} ({:.2f}ms parse per device)'.format(
+                count, path, 1000 * self.parse_time[path] / count)
+                for path, count in sorted(self.devices.items()))
+            return 'facts: {} - {} structured outputs fell back to text'.format(
+                paths or 'none', self.fallbacks)
+
+
+facts_stats = FactsStats()
+
+
+def _netmiko():
+    import netmiko
+    return netmiko
+
+
+def read_timeout():
+    ''' the exception netmiko (4 or later) raises when the prompt does not come back in time '''
+    return _netmiko().ReadTimeout
+
+
+def __getattr__(name):
+    # base.ReadTimeout, imported with netmiko on first use
+    if name == 'ReadTimeout':
+        return read_timeout()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def error_reason(e):
+    '''
+    the class of an exception raised visiting a device:
+    auth - the login was refused (bad credentials, AAA throttling)
+    timeout - the device, or one of its commands, did not answer in time
+    connection - the SSH session could not be set up, or dropped
+    parse - the outputs of the device could not be parsed
+    other - anything else, such as no parser for the device class
+    '''
+    netmiko = _netmiko()
+    from paramiko.ssh_exception import SSHException
+
+    if isinstance(e, netmiko.NetMikoAuthenticationException):
+        return AUTH
+    if isinstance(e, (netmiko.NetMikoTimeoutException, read_timeout(), socket.timeout, TimeoutError)):
+        return TIMEOUT
+    if isinstance(e, (SSHException, EOFError, OSError)):
+        return CONNECTION
+    if isinstance(e, (ValueError, KeyError, IndexError, AttributeError, TypeError, ExpatError)):
+        return PARSE
+    return OTHER
+
 
 class BaseParser(object):
 
-    def __init__(self, device_name, credentials):
+    # line that separates the per-neighbor records of the discovery_command
+    # output. Each record is parsed on its own. Starting the regex with a
+    # literal newline instead of '^' lets re skip ahead to the next line.
+    neighbor_record_separator = re.compile(r'\n-{10,}[ \t]*(?=\r?\n|$)')
+
+    def __init__(self, device_name, credentials, session_pool=None,
+                 latency_profile=None, device_model=None, address=None):
         self.device_name = device_name
         self.credentials = credentials
+        # optional parsers.sessions.SessionPool - when set, connect/disconnect
+        # check a session out of the pool and hand it back instead of doing
+        # a new SSH handshake every time
+        self.session_pool = session_pool
+        # optional parsers.latency.LatencyProfile - when set, every command
+        # is timed, and its timeout comes from the history of the
+        # device_class and device_model (as reported by CDP)
+        self.latency_profile = latency_profile
+        self.device_model = device_model
+        # IP address as reported by CDP/LLDP - the session pool limits the
+        # sessions per subnet by it
+        self.address = address
+        self.conn = None
+        self.is_connected = False
+        # why the last connect() failed, if it did
+        self.connect_error = None
+        # command -> output, filled by prefetch() and consumed by send()
+        self.outputs = {}
+        # whether the last prefetch() went out as one batch
+        self.batched = False
 
     @property
     def device_class(self):
@@ -16,62 +143,185 @@ class BaseParser(object):
         raise NotImplementedError
 
     @property
-    def neighbor_discover_regex(self):
+    def neighbor_fields(self):
+        '''
+        tuple of (field, regex) pairs used to parse a single neighbor record
+        of the discovery_command output. Each regex is searched for in the
+        record on its own, and its first group is the value of the field.
+        '''
         raise NotImplementedError
 
     @property
     def extra_facts_cmds(self):
         raise NotImplementedError
 
+    @property
+    def visit_commands(self):
+        '''
+        every command discover_neighbors and gather_facts will send - what
+        prefetch() sends in one go
+        '''
+        return [self.discovery_command] + list(self.facts_cmds.values())
+
+    @property
+    def structured_facts_cmds(self):
+        '''
+        {attribute: Cmd} of commands that return the facts in a machine
+        readable (JSON) form, parsed by parse_structured_facts - or None if
+        the platform has none and the facts come from the text of
+        extra_facts_cmds
+        '''
+        return None
+
+    @property
+    def probe_commands(self):
+        '''
+        (uptime command, neighbors command) - cheap commands used by an
+        incremental crawl to decide whether the device has to be
+        re-crawled. See inventory/incremental.py
+        '''
+        raise NotImplementedError
+
+    def open_session(self):
+        ''' establish a new SSH session to the device '''
+        SSHClass = (ssh_dispatcher or _netmiko().ssh_dispatcher)(self.device_class)
+        username = self.credentials.username
+        password = self.credentials.password
+
+        start = time.time()
+        conn = SSHClass(ip=self.device_name, username=username, password=password)
+        metrics.observe('connect', time.time() - start)
+        return conn
+
     def connect(self):
-        self.is_connected = False
+        if self.is_connected:
+            return True
         try:
-            SSHClass = netmiko.ssh_dispatcher(self.device_class)
-            username = self.credentials.username
-            password = self.credentials.password
-
-            ssh = SSHClass(ip=self.device_name, username=username, password=password)
-            self.conn = ssh
-            is_connected = True
+            if self.session_pool:
+                self.conn = self.session_pool.acquire(self.device_name, self.open_session,
+                                                      self.address)
+            else:
+                self.conn = self.open_session()
+            self.is_connected = True
         except Exception as e:
+            self.connect_error = e
+            metrics.inc('connect_failures')
             print("failed to connect to device {}, error was {}. Appending it to failed".format(self.device_name, e))
         return self.is_connected
 
     def disconnect(self):
+        '''
+        done with the device - pooled sessions are handed back to the pool
+        and stay open for any later commands
+        '''
+        if not self.is_connected:
+            return
+        self.is_connected = False
+
+        if self.session_pool:
+            self.session_pool.release(self.device_name)
+            return
 
         try:
             self.conn.disconnect()
-            self.is_connected = False
         except Exception as e:
             print('Failed to disconnect from {} - {}'.format(self.device_name, e))
 
+    def prefetch(self, cmds=None):
+        '''
+        send cmds (default visit_commands) in a single write to the session
+        and read all the replies back, instead of waiting out one
+        send_command round trip and delay_factor per command. Each reply
+        ends at the device prompt, so that is what is waited for.
+
+        The outputs are kept for send(). If the batch fails, nothing is
+        kept and send() falls back to one send_command per command - unless
+        a command timed out, in which case the device is given up on.
+        '''
+        cmds = self.visit_commands if cmds is None else cmds
+        self.batched = False
+        try:
+            self.outputs.update(self.send_batch([cmd.cmd for cmd in cmds]))
+            self.batched = True
+        except read_timeout():
+            raise
+        except Exception as e:
+            print('Batched commands failed on {}, sending them one by one - {}'.format(self.device_name, e))
+        return self.batched
+
+    def send_batch(self, commands, read_timeout=60):
+        '''
+        write all commands to the channel at once and split what comes back
+        on the prompt. Returns {command: output}.
+
+        read_timeout is the time to wait for each reply when the latency
+        profile has no timeout for the command.
+        '''
+        conn = self.conn
+        prompt = conn.find_prompt()
+        pattern = re.escape(prompt)
+        conn.write_channel(''.join(command + '\n' for command in commands))
+        start = time.time()
+
+        outputs = {}
+        for command in commands:
+            timeout = self.command_timeout(command) or read_timeout
+            reply = conn.read_until_pattern(pattern=pattern, read_timeout=timeout)
+            # the replies come back one after the other - each one took
+            # the time since the one before
+            start = self.record_latency(command, start)
+            reply = reply.replace('\r\n', '\n')
+            # drop the trailing prompt and the echo of the command
+            reply = reply[:reply.rfind(prompt)].rstrip('\n')
+            first_line, _, rest = reply.partition('\n')
+            outputs[command] = rest if command in first_line else reply
+        return outputs
+
+    def send(self, cmd):
+        ''' output of a Cmd - prefetched if it was, sent to the device otherwise '''
+        output = self.outputs.pop(cmd.cmd, None)
+        if output is None:
+            timeout = self.command_timeout(cmd.cmd)
+            start = time.time()
+            if timeout:
+                output = self.conn.send_command(cmd.cmd, read_timeout=timeout)
+            else:
+                output = self.conn.send_command(cmd.cmd, delay_factor=cmd.delay)
+            self.record_latency(cmd.cmd, start)
+        return output
+
+    def command_timeout(self, command):
+        ''' learned timeout of command on this kind of device, or None '''
+        if not self.latency_profile:
+            return None
+        return self.latency_profile.timeout(self.device_class, self.device_model, command)
+
+    def record_latency(self, command, start):
+        ''' add the time since start to the latency profile, returns now '''
+        now = time.time()
+        metrics.observe('command', now - start)
+        if self.latency_profile:
+            self.latency_profile.record(self.device_class, self.device_model, command, now - start)
+        return now
+
     def discover_neighbors(self):
         '''
         send discovery_command to a device, and find connected
         neighbors
         '''
         neighbors = {}
-        cmd, delay = self.discovery_command
-        neighbor_output = self.conn.send_command(cmd, delay_factor=delay)
-        neighbor_re = re.compile(self.neighbor_discover_regex)
-        all_neighbors = neighbor_re.finditer(self.neighbor_output)
-        all_neighbors = [n.groupdict() for n in all_neighbors if n]
+        neighbor_output = self.send(self.discovery_command)
+        start = time.time()
+        all_neighbors = self.parse_neighbors(neighbor_output)
         all_neighbors = self.normalize_neighbors(all_neighbors)
+        metrics.observe('parse', time.time() - start)
 
         for neighbor in all_neighbors:
 
-            if not neighbor:
-                continue
-
-            for version, details in VERSION_MAPPING.items():
-                if version in neighbor['remote_version']:
-                    neighbor['remote_class'] = details['device_class']
-                    neighbor['remote_vendor'] = details['device_vendor']
-                    break
-            else:
-                # default to cisco_ios if no match found
-                neighbor['remote_class'] = 'cisco_ios'
-                neighbor['remote_vendor'] = 'Cisco'
+            # defaults to cisco_ios if no rule matches
+            classification = classify(neighbor['os_version'], neighbor['device_model'])
+            neighbor['device_class'] = classification.device_class
+            neighbor['device_vendor'] = classification.device_vendor
 
             local_intf = neighbor['local_interface']
 
@@ -82,30 +332,133 @@ class BaseParser(object):
 
         return neighbors
 
+    def compiled_neighbor_fields(self):
+        ''' neighbor_fields, compiled once per parser class '''
+        fields = _NEIGHBOR_FIELDS_CACHE.get(type(self))
+        if fields is None:
+            fields = tuple((field, re.compile(regex, re.MULTILINE))
+                           for field, regex in self.neighbor_fields)
+            _NEIGHBOR_FIELDS_CACHE[type(self)] = fields
+        return fields
+
+    def parse_neighbors(self, neighbor_output):
+        '''
+        split the output of discovery_command into one record per neighbor
+        and parse each record on its own. Records without a device name
+        (such as the header before the first separator) are skipped.
+
+        returns a list of dicts, one per neighbor, keyed by field name
+        '''
+        fields = self.compiled_neighbor_fields()
+        all_neighbors = []
+
+        for record in self.neighbor_record_separator.split(neighbor_output):
+            neighbor = {}
+            for field, regex in fields:
+                match = regex.search(record)
+                neighbor[field] = match.group(1).strip() if match else None
+            if neighbor.get('device_name'):
+                all_neighbors.append(neighbor)
+
+        return all_neighbors
+
+    def probe(self):
+        '''
+        run probe_commands and return (uptime_seconds, neighbor_count), or
+        None if the device could not be probed
+        '''
+        try:
+            uptime_cmd, neighbors_cmd = self.probe_commands
+            uptime_output = self.send(uptime_cmd)
+            neighbor_output = self.send(neighbors_cmd)
+            return self.parse_probe(uptime_output, neighbor_output)
+        except Exception as e:
+            print('Failed to probe {} - {}'.format(self.device_name, e))
+            return None
+
+    def parse_probe(self, uptime_output, neighbor_output):
+
+        raise NotImplementedError
+
     def normalize_neighbors(self, neighbors):
         '''
         normalize local/remote interfaces from CDP/LLDP
         '''
         for neighbor in neighbors:
-            for key in ['device_interface', 'local_interface']:
-                neighbor[key] = self.normalize_intf_str(neighbor[key])
+            for key in ['remote_interface', 'local_interface']:
+                if neighbor[key]:
+                    neighbor[key] = self.normalize_intf_str(neighbor[key])
+        return neighbors
 
     def normalize_intf_str(self, remote_intf):
 
         raise NotImplementedError
 
-    def _gather_facts(self):
+    def _gather_facts(self, cmds=None):
+        ''' send cmds (default extra_facts_cmds), setting attribute key to the output of each '''
 
         if not self.conn or not self.is_connected:
             if not self.connect():
                 raise RuntimeError('Could not connect!')
 
-        for key, cmd in self.extra_facts_cmds.items():
-            command = cmd.command
-            delay = cmd.delay
-            self.key = self.conn.send_command(command, delay_factor=delay)
+        for key, cmd in (self.extra_facts_cmds if cmds is None else cmds).items():
+            setattr(self, key, self.send(cmd))
+
+    def use_structured_output(self):
+        return (bool(self.structured_facts_cmds) and
+                (self.device_class, self.device_model) not in _NO_STRUCTURED_OUTPUT)
+
+    @property
+    def facts_cmds(self):
+        ''' the commands gather_facts is going to send '''
+        if self.use_structured_output():
+            return self.structured_facts_cmds
+        return self.extra_facts_cmds
 
     def gather_facts(self):
+        '''
+        collect additional info about the device - from structured output
+        where the platform has it, from text otherwise. When the structured
+        output can't be used (older releases answer '| json' with an
+        error), the text commands are sent instead, and other devices of
+        the same model go straight to text.
+
+        facts['facts_path'] is 'json' or 'text', and facts_stats adds up
+        the parse time of each path.
+        '''
+        if self.use_structured_output():
+            self._gather_facts(self.structured_facts_cmds)
+            start = time.time()
+            try:
+                facts = self.parse_structured_facts()
+                facts_stats.record('json', time.time() - start)
+                metrics.observe('parse', time.time() - start)
+                facts['facts_path'] = 'json'
+                return facts
+            except (ValueError, KeyError, TypeError) as e:
+                if not self.extra_facts_cmds:
+                    raise
+                print('Structured output of {} not usable, reading text - {}'.format(self.device_name, e))
+                _NO_STRUCTURED_OUTPUT.add((self.device_class, self.device_model))
+                fallback = True
+        else:
+            fallback = False
+
+        self._gather_facts()
+        start = time.time()
+        facts = self.parse_text_facts()
+        facts_stats.record('text', time.time() - start, fallback)
+        metrics.observe('parse', time.time() - start)
+        facts['facts_path'] = 'text'
+        return facts
+
+    def parse_structured_facts(self):
+        ''' facts dict from the outputs of structured_facts_cmds '''
+
+        raise NotImplementedError
+
+    def parse_text_facts(self):
+        ''' facts dict from the outputs of extra_facts_cmds '''
 
         raise NotImplementedError
 
@@ -1,13 +1,38 @@
-from collections import namedtuple
 import re
+from xml.etree.ElementTree import ParseError
+
+from .base import BaseParser, Cmd, json_loads
+from .uptime import parse_uptime, uptime_seconds
+from .xml_facts import extract_fields
+
+INTF_SHORT = re.compile(r'((.*)?Ethernet)')
+
+# the facts of an IOS / IOS-XE 'show version', all found in one pass over
+# the output. Every alternative is anchored at the start of a line, so each
+# line is tried once against all of them.
+VERSION_FACTS = re.compile(
+    r'^(?:Cisco IOS Software(?: \[[^\]]*\])?, (?P<os_version>.+)'
+    r'|\S+ uptime is (?P<uptime>.+)'
+    r'|Processor board ID (?P<serial_number>[^\s,]+)'
+    r'|\S+ (?P<model>\S+) .*bytes of (?:physical )?memory)', re.MULTILINE)
+
+
+def version_facts(version):
+    '''
+    {os_version, serial_number, uptime, model} of a 'show version' as
+    strings - the first match of each, None where there is none
+    '''
+    facts = dict.fromkeys(VERSION_FACTS.groupindex)
+    missing = len(facts)
+    for match in VERSION_FACTS.finditer(version):
+        field = match.lastgroup
+        if facts[field] is None:
+            facts[field] = match.group(field).strip()
+            missing -= 1
+            if not missing:
+                break
+    return facts
 
-import xmltodict
-
-from base import BaseParser
-from general_functions import parse_uptime
-from version_mapping import VERSION_MAPPING
-
-Cmd = namedtuple('Cmd', 'cmd delay')
 
 class CiscoBaseParser(BaseParser):
 
@@ -20,59 +45,74 @@ class CiscoBaseParser(BaseParser):
         return Cmd('show cdp neigh detail', 5)
 
     @property
-    def neighbor_discover_regex(self):
+    def neighbor_fields(self):
         '''
-        regex to parse output of discovery_command
-        looking for:
-            device_device
-            device_ip
-            device_ipv6
+        regexes to parse a single neighbor record of the discovery_command
+        output. Works for both the IOS and the NX-OS flavour of
+        'show cdp neigh detail'. Looking for:
+            device_name
+            ip_address
+            ipv6_address
             device_model
             local_interface
-            device_interface
-            device_version
+            remote_interface
+            os_version
         '''
-        return "Device ID: (?P<device_device>[\w\d\_\-\.]+)[\W\w]+?\n"\
-           "\s+IP [Aa]ddress: (?P<device_ip>[0-9\.]+)\n" \
-           "(?:\s+IPv6 address: (?P<device_ipv6>[a-z0-9\:]+)(?:\s+\(global unicast\)\n)?)?" \
-           "[\n\W\w]*?" \
-           "Platform:\s*[Cc]isco\s(?P<device_model>[\w\d\-\_\.]+)[\W\w\s]+?\n" \
-           "Interface: (?P<local_interface>[A-Za-z0-9/\-]+)" \
-           ".*: (?P<device_interface>[A-Za-z0-9/\-]+)\n" \
-           "[\n\W\w\S\s]*?" \
-           "Version.*\n" \
-           "(?P<device_version>[\w\W]+?)\n"
+        return (('device_name', r'Device ID: ?([\w\-\.]+)'),
+                ('ip_address', r'IP(?:v4)? [Aa]ddress: ([0-9\.]+)'),
+                ('ipv6_address', r'IPv6 [Aa]ddress: (?![Ff][Ee]80)([0-9A-Fa-f\:]+)'),
+                ('device_model', r'Platform: ?(?:[Cc]isco )?([\w\-\.]+)'),
+                ('local_interface', r'Interface: ([\w/\.\-]+),'),
+                ('remote_interface', r'Port ID \(outgoing port\): ?([\w/\.\-]+)'),
+                ('os_version', r'\nVersion ?:[ \t]*\r?\n(.+)'))
 
     @property
     def extra_facts_cmds(self):
         return {'version' : Cmd('show version', '2')}
 
+    @property
+    def probe_commands(self):
+        return (Cmd('show version | include uptime', 1),
+                Cmd('show cdp neigh detail | include Device ID', 2))
+
+    def parse_probe(self, uptime_output, neighbor_output):
+        '''
+        IOS:   rtr1 uptime is 8 weeks, 2 days, 23 hours, 22 minutes
+        NX-OS: Kernel uptime is 12 day(s), 3 hour(s), 44 minute(s), 22 second(s)
+        '''
+        uptime = None
+        match = re.search(r'uptime is (.*)', uptime_output)
+        if match:
+            uptime = parse_uptime(match.group(1))
+
+        neighbor_count = neighbor_output.count('Device ID')
+        return uptime, neighbor_count
+
     def normalize_intf_str(self, remote_intf):
 
         ''' takes the str representation of the
         remote interface for a given CDP device and
         formats it to short notation.
 
-        Example: GigbitEthernet = Gig
-        Example: TenGigabitEthernet = Ten
+        Example: GigbitEthernet1/1 = Gig1/1
+        Example: TenGigabitEthernet1/1 = Ten1/1
         '''
-        INTF_SHORT = re.compile(r'((.*)?Ethernet)')
-
         interface_mapper = dict(Ethernet='Eth', TenGigabitEthernet='Ten',
             GigabitEthernet='Gig', FastEthernet='Fa')
 
         short_name = INTF_SHORT.match(remote_intf)
-        if short_name:
-            return interface_mapper[short_name.group()]
+        if short_name and short_name.group() in interface_mapper:
+            return remote_intf.replace(short_name.group(),
+                                       interface_mapper[short_name.group()], 1)
 
         return remote_intf
 
-    def gather_facts(self):
+    def parse_text_facts(self):
         '''
-        collect additional info about device by sending
-        and processing extra_facts_cmds
+        collect additional info about device by processing the
+        outputs of extra_facts_cmds
         '''
-        self._gather_facts()
+        self.version_data = version_facts(self.version)
 
         os_version = self.find_os_version()
         serial_number = self.find_serial_number()
@@ -88,41 +128,26 @@ class CiscoBaseParser(BaseParser):
         '''
         String in show version will be similar to the following:
         Cisco IOS Software, IOS-XE Software (PPC_LINUX_IOSD-ADVENTERPRISEK9-M), Version 15.2(4)S4, RELEASE SOFTWARE (fc1)
+        Cisco IOS Software [Fuji], Catalyst L3 Switch Software (CAT9K_IOSXE), Version 16.9.3, RELEASE SOFTWARE (fc2)
         '''
-        match = re.search(r'Cisco IOS Software, (.*)', self.version)
-        if match:
-            # self.net_device.os_version = match.group(1)
-            # print self.net_device.os_version
-            # self.net_device.save()
-            self.os_version = match.group(1)
-            return self.os_version
+        self.os_version = self.version_data['os_version']
+        return self.os_version
 
     def find_serial_number(self):
         '''
         String in show version will be similar to the following:
         Processor board ID FTX10000001
         '''
-
-        match = re.search(r'Processor board ID (.*)', self.version)
-        if match:
-            # self.net_device.serial_number = match.group(1)
-            # print self.net_device.serial_number
-            # self.net_device.save()
-            self.serial_number = match.group(1)
-            return self.serial_number
+        self.serial_number = self.version_data['serial_number']
+        return self.serial_number
 
     def find_uptime(self):
         '''
         String in show version will be similar to the following:
         hostname uptime is 8 weeks, 2 days, 23 hours, 22 minutes
         '''
-
-        match = re.search(r'uptime is (.*)', self.version)
-        if match:
-            time_str = match.group(1)
-            # self.net_device.uptime_seconds = parse_uptime(time_str)
-            # print self.net_device.uptime_seconds
-            # self.net_device.save()
+        time_str = self.version_data['uptime']
+        if time_str:
             self.uptime_seconds = parse_uptime(time_str)
             return self.uptime_seconds
 
@@ -134,60 +159,62 @@ class CiscoBaseParser(BaseParser):
         cisco WS-C3850-48T (MIPS) processor with 4194304K bytes of physical
         memory
         '''
-
-        match = re.search(r'.*bytes of (physical )?memory', self.version)
-        if match:
-            return match.group().split()[1]
+        self.model = self.version_data['model']
+        return self.model
 
 class CiscoIosParser(CiscoBaseParser):
     pass
 
 class CiscoNxosParser(CiscoBaseParser):
 
+    @property
+    def device_class(self):
+        return 'cisco_nxos'
+
     @property
     def extra_facts_cmds(self):
-        return dict('version' :
-                        Cmd('show version | xml | exclude "]]>]]>"', 2),
-                    'inventory':
-                        Cmd('show inventory | xml | exclude "]]>]]>"', 2))
+        return {'version' :
+                    Cmd('show version | xml | exclude "]]>]]>"', 2),
+                'inventory':
+                    Cmd('show inventory | xml | exclude "]]>]]>"', 2)}
+
+    # the elements of the XML outputs the facts come from. The first
+    # productid of 'show inv' is the one of the chassis. Some releases
+    # leave out kern_uptm_secs, so the parser does not wait for it.
+    version_fields = ('kickstart_ver_str', 'proc_board_id',
+                      'kern_uptm_days', 'kern_uptm_hrs', 'kern_uptm_mins')
+    version_optional_fields = ('kern_uptm_secs',)
+    inventory_fields = ('productid',)
 
     @property
-    def neighbor_discover_regex(self):
+    def structured_facts_cmds(self):
+        ''' NX-OS 6.x and later '''
+        return {'version_json': Cmd('show version | json', 2),
+                'inventory_json': Cmd('show inventory | json', 2)}
+
+    def parse_structured_facts(self):
         '''
-        regex to parse output of discovery_command
-        looking for:
-            device_device
-            device_ip
-            device_ipv6
-            device_model
-            local_interface
-            device_interface
-            device_version
+        facts from the JSON outputs - the same fields as the XML ones:
+        {"kickstart_ver_str": "7.0(3)I7(5)", "proc_board_id": "FOC1234", "kern_uptm_days": 12, ...}
+        {"TABLE_inv": {"ROW_inv": [{"name": "Chassis", "productid": "N9K-C93180YC-EX", ...}, ...]}}
+        NX-OS 9 names the version nxos_ver_str.
         '''
-        return "Device ID:(?P<device_name>[\w\d\_\-\.]+)[\W\w]+?\n"\
-               "\s+IPv4 [Aa]ddress: (?P<device_ip>[0-9\.]+)\n" \
-               "(?:\s+IPv6 [Aa]ddress: (?!fe80)(?P<device_ipv6>[a-z0-9\:]+)\n)?" \
-               "[\n\W\w]*?" \
-               "Platform:\s*(?P<device_model>[\w\d\-\_\.]+)[\W\w\s]+?\n" \
-               "Interface: (?P<local_interface>[A-Za-z0-9/]+)" \
-               ".*: (?P<device_interface>[A-Za-z0-9/\-]+)\n" \
-               "[\n\W\w\S\s]*?" \
-               "Version.*\n" \
-               "(?P<device_version>[\w\W]+?)\n"
-
-    @staticmethod
-    def find_key(obj, key):
-        '''recursive function to find key containing desired key in the XML dict'''
-        if key in obj:
-            return obj[key]
-        for val in obj.itervalues():
-            if isinstance(val, dict):
-                result = CiscoNxosParser.find_key(val, key)
-                if result:
-                    return result
-
-    def gather_facts(self):
-        self._gather_facts()
+        version = json_loads(self.version_json)
+        rows = json_loads(self.inventory_json)['TABLE_inv']['ROW_inv']
+        # a single row is not wrapped in a list
+        chassis = rows[0] if isinstance(rows, list) else rows
+
+        os_version = version.get('kickstart_ver_str') or version['nxos_ver_str']
+        uptime = uptime_seconds(days=version['kern_uptm_days'], hours=version['kern_uptm_hrs'],
+                                minutes=version['kern_uptm_mins'],
+                                seconds=version.get('kern_uptm_secs', 0))
+
+        return dict(os_version=str(os_version),
+                    serial_number=str(version['proc_board_id']),
+                    uptime=uptime,
+                    model=chassis['productid'])
+
+    def parse_text_facts(self):
         self.prepare_xml_ver_output()
         self.prepare_xml_inv_output()
 
@@ -202,33 +229,37 @@ class CiscoNxosParser(CiscoBaseParser):
                     model=model)
 
     def prepare_xml_ver_output(self):
-        ''' get the dict with interesting data that is returned from the XML interface of nexus and contains all of the show ver data. To avoid future code breakage where the keys of the  nested dict change, such as the case with 'show inv' between 7k and 5k, using this recursive finder is a better approach for now'''
+        '''
+        get the fields of 'show ver | xml' the facts are made of. Only the
+        fields needed are picked out of the XML, and parsing stops once they
+        are found - see parsers/xml_facts.py. Matching on the element names
+        alone avoids breakage when the nesting changes between platforms.
+        '''
 
-        xml = xmltodict.parse(self.version)
         try:
-            self.xml_version_data = self.find_key(xml, '__readonly__')
-        except ExpatError as e:
-            print "XML Data Parsing Error", e
-            raise ExpatError("Error processing XML document -- {}".format(self.inv_output))
+            self.xml_version_data = extract_fields(self.version, self.version_fields,
+                                                   self.version_optional_fields)
+        except ParseError as e:
+            print("XML Data Parsing Error", e)
+            raise
 
     def prepare_xml_inv_output(self):
-        ''' get the list returned from XML output 'show inv | xml'. Nexus 7K returns diff headers than 5K/56K, however they all contained the data stored as a list under the 'ROW_inv' key. The recursive function goes through the set of nested dicts and gets the key we are looking for containing the data.'''
+        '''
+        get the chassis entry of 'show inv | xml'. Nexus 7K returns diff
+        headers than 5K/56K, however the chassis is always the first
+        'ROW_inv', so the first productid is the chassis model.
+        '''
 
-        xml = xmltodict.parse(self.inventory)
         try:
-            # 1st elem of list returned holds the chasis-id info
-            self.xml_inv_data = self.find_key(xml, 'ROW_inv')[0]
-        except ExpatError as e:
-            print "XML Data Parsing Error", e
-            raise ExpatError("Error processing XML document -- {}".format(self.inv_output))
+            self.xml_inv_data = extract_fields(self.inventory, self.inventory_fields)
+        except ParseError as e:
+            print("XML Data Parsing Error", e)
+            raise
 
     def find_os_version(self):
         '''
         Parses the XML dict for the OS Version
         '''
-        # self.net_device.os_version = str(self.xml_version_data[u'kickstart_ver_str'])
-        # print self.net_device.os_version
-        # self.net_device.save()
         self.os_version = str(self.xml_version_data[u'kickstart_ver_str'])
         return self.os_version
 
@@ -237,27 +268,19 @@ class CiscoNxosParser(CiscoBaseParser):
         String in show version will be similar to the following:
         Processor board ID FTX10000001
         '''
-        # self.net_device.serial_number = str(self.xml_version_data[u'proc_board_id'])
-        # print self.net_device.serial_number
-        # self.net_device.save()
         self.serial_number = str(self.xml_version_data[u'proc_board_id'])
         return self.serial_number
 
     def find_uptime(self):
         '''
-        Nexus uptime string only uses days, hours, and minutes. The IOS equivalent
-        uses years, and weeks.
+        Nexus uptime is given as separate days, hours, minutes and seconds
+        fields - no need to go through a string
         '''
-        days = str(self.xml_version_data[u'kern_uptm_days'])
-        hours = str(self.xml_version_data[u'kern_uptm_hrs'])
-        minutes = str(self.xml_version_data[u'kern_uptm_mins'])
-
-        self.uptime_list = [days, hours, minutes]
-        self.uptime_str = "{} days, {} hours, {} minutes".format(*self.uptime_list)
-        # self.net_device.uptime_seconds = parse_uptime(self.uptime_str)
-        # print self.net_device.uptime_seconds
-        # self.net_device.save()
-        self.uptime_seconds = parse_uptime(self.uptime_str)
+        data = self.xml_version_data
+        self.uptime_seconds = uptime_seconds(days=data[u'kern_uptm_days'],
+                                             hours=data[u'kern_uptm_hrs'],
+                                             minutes=data[u'kern_uptm_mins'],
+                                             seconds=data.get(u'kern_uptm_secs') or 0)
         return self.uptime_seconds
 
     def find_model(self):
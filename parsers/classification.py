@@ -0,0 +1,51 @@
+''' Classify CDP/LLDP neighbors into a device_class and vendor.
+
+    The rules in parsers/version_mapping.py are compiled once, at import,
+    into one regex per neighbor field. Every rule is an alternative of the
+    form '.*?(rule)()', tried in rule order, so a single search both finds
+    whether any rule of the field matches and which one comes first in the
+    list - the empty group closing the alternative names the rule.
+
+    The same few dozen version strings come up thousands of times in a
+    crawl, so classify() is memoized on its arguments.
+'''
+from functools import lru_cache
+import re
+
+from .version_mapping import CLASSIFICATION_RULES, DEFAULT_CLASSIFICATION
+
+
+class Classifier(object):
+
+    def __init__(self, rules, default, fields=('os_version', 'device_model'), cache_size=1024):
+        '''
+        fields - the neighbor fields classify() takes, in order
+        '''
+        self.rules = list(rules)
+        self.default = default
+        self.fields = fields
+
+        alternatives = {}
+        for i, (field, regex, _) in enumerate(self.rules):
+            alternatives.setdefault(field, []).append(r'.*?(?:{})(?P<r{}>)'.format(regex, i))
+        self._regexes = tuple(re.compile('|'.join(alternatives[field]), re.DOTALL)
+                              if field in alternatives else None for field in fields)
+
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, *values):
+        ''' classification of the first rule matching one of values (given in fields order) '''
+        best = None
+        for regex, value in zip(self._regexes, values):
+            if not value or regex is None:
+                continue
+            match = regex.match(value)
+            if match:
+                rule = int(match.lastgroup[1:])
+                if best is None or rule < best:
+                    best = rule
+        return self.rules[best][2] if best is not None else self.default
+
+
+# classify(os_version, device_model) -> Classification(device_class, device_vendor)
+classify = Classifier(CLASSIFICATION_RULES, DEFAULT_CLASSIFICATION).classify
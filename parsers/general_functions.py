@@ -1,32 +1,12 @@
 from itertools import groupby
 from operator import itemgetter
 
-# create  a dictionary to store the time value denominations and their respective seconds
-# some entries might be 'weeks' and 'week' because of the way data is input, the uptime string may say '2 weeks' or '1 week'
-# so instead of storing 'week' and 'weeks', we can just store the character 'w'.
-
-def parse_uptime(uptime_str):
-
-    denoms = {}; 
-    denoms['w'] = 604800;
-    denoms['d'] = 86400;
-    denoms['h'] = 60 * 60;
-    denoms['m'] = 60;
-    denoms['y'] = 52 * denoms['w'];
-
-    # uptime4 = 'rtr1 uptime is 5 years, 18 weeks, 8 hours, 23 minutes'
-    uptime_dict = {}  # dictionary to store the uptime of each router in seconds
-    uptime_fields = uptime_str.split(' ')
-             
-	#However, incrementing by 2 allows us to skip the pairs such as weeks 4,   days 2, etc.
-      
-    uptime_seconds = sum(int(uptime_fields[i]) * denoms[uptime_fields[i+1][0]] for i in range(0, len(uptime_fields)-1,2))
-
-    return uptime_seconds
+# kept here for the code that imports it from general_functions
+from .uptime import parse_uptime
 
 
 def chunker(seq, size):
-    return (seq[pos:pos + size] for pos in xrange(0, len(seq), size))
+    return (seq[pos:pos + size] for pos in range(0, len(seq), size))
 
 def get_intf_range(int_list, chunk_size = 5):
     '''
@@ -38,8 +18,8 @@ def get_intf_range(int_list, chunk_size = 5):
     '''
 
     ranges = list()
-    for key, item in groupby(enumerate(int_list), key=lambda (indx, val) : indx - int(val.split("/")[-1])):
-        ranges.append(map(itemgetter(1), item))
+    for key, item in groupby(enumerate(int_list), key=lambda pair: pair[0] - int(pair[1].split("/")[-1])):
+        ranges.append(list(map(itemgetter(1), item)))
 
     # ranges will be a list of lists with contiguous interfaces grouped
     # [['interface Gig0/1', 'interface Gig0/2', 'interface Gig0/3'], ['interface Gig0/5', 'interface Gig0/6'], 'interface Gig0/8']
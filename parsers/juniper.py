@@ -0,0 +1,200 @@
+''' Juniper Junos parser.
+
+    Junos returns show commands as JSON with '| display json'. Every value
+    in it is wrapped as [{"data": value}], and the nesting differs between
+    releases and platforms, so values are looked up by key wherever they
+    are with find_value().
+
+    'show lldp neighbors' only has the name and port of each neighbor.
+    The system description (used to classify the neighbor) and management
+    address come from 'show lldp neighbors interface X', which is sent for
+    all the interfaces in one batch.
+'''
+import re
+
+from .base import BaseParser, Cmd, json_loads
+
+# 'Juniper Networks, Inc. ex4300-48t Ethernet Switch, kernel JUNOS 15.1R7.9, ...'
+MODEL_RE = re.compile(r'Juniper Networks, Inc\. (\S+)')
+
+
+def find_value(obj, key):
+    '''
+    first value of key anywhere in a Junos JSON document, unwrapped from
+    its [{"data": ...}], or None
+    '''
+    if isinstance(obj, dict):
+        if key in obj:
+            value = obj[key]
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                value = value[0]
+            if isinstance(value, dict) and 'data' in value:
+                return value['data']
+            return value
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        for item in obj:
+            value = find_value(item, key)
+            if value is not None:
+                return value
+    return None
+
+
+def find_all(obj, key):
+    ''' every value of key in a Junos JSON document, as they come '''
+    if isinstance(obj, dict):
+        for k, value in obj.items():
+            if k == key:
+                for item in (value if isinstance(value, list) else [value]):
+                    yield item
+            else:
+                for item in find_all(value, key):
+                    yield item
+    elif isinstance(obj, list):
+        for item in obj:
+            for found in find_all(item, key):
+                yield found
+
+
+class JunosParser(BaseParser):
+
+    @property
+    def device_class(self):
+        return 'juniper_junos'
+
+    @property
+    def discovery_command(self):
+        return Cmd('show lldp neighbors | display json', 2)
+
+    @property
+    def neighbor_fields(self):
+        ''' not used - the neighbors are read from JSON, see parse_neighbors '''
+        return ()
+
+    @property
+    def extra_facts_cmds(self):
+        ''' no text fallback - the facts only come from JSON '''
+        return {}
+
+    @property
+    def structured_facts_cmds(self):
+        return {'version': Cmd('show version | display json', 1),
+                'hardware': Cmd('show chassis hardware | display json', 2),
+                'system_uptime': Cmd('show system uptime | display json', 1)}
+
+    @property
+    def probe_commands(self):
+        return (Cmd('show system uptime | display json', 1),
+                Cmd('show lldp neighbors | display json', 1))
+
+    @staticmethod
+    def interface_command(local_intf):
+        return Cmd('show lldp neighbors interface {} | display json'.format(local_intf), 1)
+
+    def parse_neighbors(self, neighbor_output):
+        all_neighbors = []
+        for lldp in find_all(json_loads(neighbor_output), 'lldp-neighbor-information'):
+            local_intf = (find_value(lldp, 'lldp-local-port-id') or
+                          find_value(lldp, 'lldp-local-interface'))
+            all_neighbors.append(dict(
+                device_name=find_value(lldp, 'lldp-remote-system-name'),
+                ip_address=None,
+                ipv6_address=None,
+                device_model=None,
+                local_interface=local_intf,
+                # the port description is free text ("uplink to core"),
+                # only used when the port id is missing
+                remote_interface=(find_value(lldp, 'lldp-remote-port-id') or
+                                  find_value(lldp, 'lldp-remote-port-description')),
+                os_version=None))
+
+        all_neighbors = [neighbor for neighbor in all_neighbors if neighbor['device_name']]
+        self.add_neighbor_details(all_neighbors)
+        return all_neighbors
+
+    def add_neighbor_details(self, all_neighbors):
+        ''' fill in description, model and address from the per-interface LLDP details '''
+        cmds = [self.interface_command(n['local_interface'])
+                for n in all_neighbors if n['local_interface']]
+        if not cmds:
+            return
+        self.prefetch(cmds)
+
+        for neighbor in all_neighbors:
+            if not neighbor['local_interface']:
+                continue
+            try:
+                detail = json_loads(self.send(self.interface_command(neighbor['local_interface'])))
+            except ValueError as e:
+                print('Failed to read LLDP details of {} on {} - {}'.format(
+                    neighbor['device_name'], self.device_name, e))
+                continue
+
+            description = find_value(detail, 'lldp-remote-system-description')
+            model = MODEL_RE.search(description) if description else None
+            neighbor['os_version'] = description
+            neighbor['device_model'] = model.group(1) if model else None
+            address = find_value(detail, 'lldp-remote-management-address')
+            if address and ':' in address:
+                neighbor['ipv6_address'] = address
+            elif address:
+                neighbor['ip_address'] = address
+
+    def parse_probe(self, uptime_output, neighbor_output):
+        uptime = self.uptime_seconds_of(json_loads(uptime_output))
+        neighbor_count = sum(1 for _ in find_all(json_loads(neighbor_output),
+                                                 'lldp-neighbor-information'))
+        return uptime, neighbor_count
+
+    def normalize_intf_str(self, remote_intf):
+        ''' Junos interface names are short already - ge-0/0/0, xe-1/0/1 '''
+        return remote_intf
+
+    @staticmethod
+    def uptime_seconds_of(system_uptime):
+        '''
+        "system-booted-time": [{"time-length": [{"data": "42w1d 02:10",
+                                "attributes": {"junos:seconds": "25409400"}}]}]
+        '''
+        for booted in find_all(system_uptime, 'system-booted-time'):
+            for length in find_all(booted, 'time-length'):
+                seconds = length.get('attributes', {}).get('junos:seconds')
+                if seconds is not None:
+                    return int(seconds)
+        return None
+
+    def parse_structured_facts(self):
+        '''
+        collect additional info about device from 'show version',
+        'show chassis hardware' and 'show system uptime'
+        '''
+        self.version_data = json_loads(self.version)
+        self.hardware_data = json_loads(self.hardware)
+        self.uptime_data = json_loads(self.system_uptime)
+
+        os_version = self.find_os_version()
+        serial_number = self.find_serial_number()
+        uptime = self.find_uptime()
+        model = self.find_model()
+
+        return dict(os_version=os_version,
+                    serial_number=serial_number,
+                    uptime=uptime,
+                    model=model)
+
+    def find_os_version(self):
+        self.os_version = find_value(self.version_data, 'junos-version')
+        return self.os_version
+
+    def find_serial_number(self):
+        ''' serial-number of the chassis, the first entry of 'show chassis hardware' '''
+        self.serial_number = find_value(find_value(self.hardware_data, 'chassis'), 'serial-number')
+        return self.serial_number
+
+    def find_uptime(self):
+        self.uptime_seconds = self.uptime_seconds_of(self.uptime_data)
+        return self.uptime_seconds
+
+    def find_model(self):
+        self.model = find_value(self.version_data, 'product-model')
+        return self.model
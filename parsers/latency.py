@@ -0,0 +1,187 @@
+''' Command latency history, used to size command timeouts.
+
+    The Cmd delays in the parsers are hard-coded for the slowest platform,
+    so a fast switch is given as long as a loaded chassis. LatencyProfile
+    records how long every command took, per device class and model, and
+    once a command has min_samples samples its timeout is
+
+        percentile(samples) * headroom, within [min_timeout, max_timeout]
+
+    A command that goes over its timeout raises instead of holding the
+    worker, and the device ends up in the failed list.
+
+    The samples are kept per model and per device class (model '*'), so a
+    model seen for the first time still gets the class' timeout. The
+    profile is a JSON file of {device_class: {model: {command: [seconds]}}}
+    holding the last max_samples samples of each command. save() merges
+    the samples taken since load() into what is on disk, holding an
+    exclusive lock on {path}.lock from the read to the rename, so the
+    worker processes of a multiprocess crawl, which all save when they are
+    done, don't overwrite each other's.
+
+    expected_time() sums the median of every command of a model, which the
+    crawl frontier uses to start the slow devices first.
+'''
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import math
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # no flock() on Windows - processes saving at the same time there may
+    # lose each other's samples
+    fcntl = None
+
+ANY_MODEL = '*'
+
+
+def percentile(samples, pct):
+    ''' nearest-rank percentile of a list of numbers '''
+    samples = sorted(samples)
+    rank = int(math.ceil(pct / 100.0 * len(samples))) - 1
+    return samples[min(max(rank, 0), len(samples) - 1)]
+
+
+@contextmanager
+def locked(path):
+    ''' hold an exclusive lock on path + '.lock', across processes '''
+    with open(path + '.lock', 'a') as fh:
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+class LatencyProfile(object):
+
+    def __init__(self, path=None, percentile=99, headroom=3.0, min_samples=5,
+                 max_samples=200, min_timeout=5.0, max_timeout=120.0):
+        self.path = path
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        # (device_class, model, command) -> [seconds]
+        self._samples = defaultdict(list)
+        # samples taken in this run, merged into the file by save()
+        self._new = defaultdict(list)
+        self._timeouts = {}
+        self._expected = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        ''' profile stored at path - empty if there is no such file yet '''
+        profile = cls(path, **kwargs)
+        for key, samples in cls._read(path).items():
+            profile._samples[key] = samples[-profile.max_samples:]
+        return profile
+
+    @staticmethod
+    def _read(path):
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except ValueError as e:
+            print('Ignoring unreadable latency profile {} - {}'.format(path, e))
+            return {}
+        return dict(((device_class, model, command), samples)
+                    for device_class, models in data.items()
+                    for model, commands in models.items()
+                    for command, samples in commands.items())
+
+    def record(self, device_class, model, command, seconds):
+        seconds = round(seconds, 3)
+        with self._lock:
+            for key in ((device_class, model or ANY_MODEL, command),
+                        (device_class, ANY_MODEL, command)):
+                samples = self._samples[key]
+                samples.append(seconds)
+                if len(samples) > self.max_samples:
+                    del samples[0]
+                self._new[key].append(seconds)
+                self._timeouts.pop(key, None)
+                self._expected.pop(key[:2], None)
+                if model is None:
+                    break
+
+    def timeout(self, device_class, model, command):
+        '''
+        timeout in seconds for command on this kind of device, or None if
+        there is not enough history yet
+        '''
+        with self._lock:
+            for key in ((device_class, model or ANY_MODEL, command),
+                        (device_class, ANY_MODEL, command)):
+                if key in self._timeouts:
+                    return self._timeouts[key]
+                samples = self._samples.get(key)
+                if samples and len(samples) >= self.min_samples:
+                    timeout = percentile(samples, self.percentile) * self.headroom
+                    timeout = min(max(timeout, self.min_timeout), self.max_timeout)
+                    self._timeouts[key] = timeout
+                    return timeout
+        return None
+
+    def expected_time(self, device_class, model):
+        '''
+        seconds the commands run on this kind of device usually take - the
+        sum of their medians - or 0.0 if there is no history
+        '''
+        with self._lock:
+            for key in ((device_class, model or ANY_MODEL), (device_class, ANY_MODEL)):
+                seconds = self._expected.get(key)
+                if seconds is None:
+                    seconds = self._expected[key] = sum(
+                        percentile(samples, 50) for (c, m, _), samples in self._samples.items()
+                        if (c, m) == key and samples)
+                if seconds:
+                    return seconds
+        return 0.0
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            new, self._new = self._new, defaultdict(list)
+
+        with locked(path):
+            merged = self._read(path)
+            for key, samples in new.items():
+                merged[key] = (merged.get(key, []) + samples)[-self.max_samples:]
+
+            data = {}
+            for (device_class, model, command), samples in merged.items():
+                data.setdefault(device_class, {}).setdefault(model, {})[command] = samples
+
+            tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'w') as fh:
+                json.dump(data, fh, indent=1, sort_keys=True)
+            os.rename(tmp_path, path)
+
+    def summary(self):
+        ''' one line per device class/model and command '''
+        with self._lock:
+            keys = sorted(self._samples)
+        lines = ['command latency profile ({}th percentile x {} headroom):'.format(
+            self.percentile, self.headroom)]
+        for device_class, model, command in keys:
+            samples = self._samples[(device_class, model, command)]
+            timeout = self.timeout(device_class, model, command)
+            lines.append('  {:<12} {:<20} {:<45} {:5d} samples  p50 {:6.2f}s  p{} {:6.2f}s  timeout {}'.format(
+                device_class, model, command, len(samples), percentile(samples, 50),
+                self.percentile, percentile(samples, self.percentile),
+                '{:.1f}s'.format(timeout) if timeout else 'default'))
+        return '\n'.join(lines)
@@ -0,0 +1,173 @@
+''' Where the time of a crawl goes.
+
+    One shared `metrics` object collects, from every thread:
+
+    - histograms of connect (SSH handshake), command, parse and DB-write
+      latency, in seconds
+    - counters of visited and filtered devices, and of failed visits -
+      retries included
+    - gauges of the devices queued but not visited yet, and of the devices
+      in the failed list - the ones that came back on a retry are not
+
+    render() returns them in the Prometheus text format. They can be
+    scraped while the crawl runs from serve(port), and/or written with
+    write_textfile() at the end of the run for the node_exporter textfile
+    collector.
+
+    log_device() prints the one line of JSON logged per device visited.
+'''
+import json
+import os
+import threading
+
+PREFIX = 'network_discovery'
+
+# seconds - from a fast command to a command that hit its timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HISTOGRAMS = {'connect': 'SSH handshake time',
+              'command': 'time for a command to return its output',
+              'parse': 'time to parse the neighbors or facts of a device',
+              'db_write': 'time to write a batch of devices to the database',
+              'session_wait': 'time a new login waited for a session slot or a login token'}
+
+COUNTERS = {'visited': 'devices visited',
+            'failed_attempts': 'visits that failed, retries included',
+            'filtered': 'neighbors not visited because they match ignore_regex',
+            'connect_failures': 'SSH sessions that could not be established'}
+
+GAUGES = {'frontier': 'devices queued but not visited yet',
+          'failed': 'devices in the failed list'}
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class Metrics(object):
+
+    def __init__(self, prefix=PREFIX, buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.histograms = dict((name, Histogram(buckets)) for name in HISTOGRAMS)
+        self.counters = dict((name, 0) for name in COUNTERS)
+        self.gauges = dict((name, 0) for name in GAUGES)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.histograms[name].observe(seconds)
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def set(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def render(self):
+        ''' all the metrics in the Prometheus text exposition format '''
+        lines = []
+        with self._lock:
+            for name, help_text in sorted(HISTOGRAMS.items()):
+                metric = '{}_{}_seconds'.format(self.prefix, name)
+                histogram = self.histograms[name]
+                lines.append('# HELP {} {}'.format(metric, help_text))
+                lines.append('# TYPE {} histogram'.format(metric))
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append('{}_bucket{{le="{}"}} {}'.format(metric, bound, cumulative))
+                lines.append('{}_bucket{{le="+Inf"}} {}'.format(metric, histogram.count))
+                lines.append('{}_sum {}'.format(metric, histogram.sum))
+                lines.append('{}_count {}'.format(metric, histogram.count))
+            for name, help_text in sorted(COUNTERS.items()):
+                metric = '{}_{}_total'.format(self.prefix, name)
+                lines.append('# HELP {} {}'.format(metric, help_text))
+                lines.append('# TYPE {} counter'.format(metric))
+                lines.append('{} {}'.format(metric, self.counters[name]))
+            for name, help_text in sorted(GAUGES.items()):
+                metric = '{}_{}'.format(self.prefix, name)
+                lines.append('# HELP {} {}'.format(metric, help_text))
+                lines.append('# TYPE {} gauge'.format(metric))
+                lines.append('{} {}'.format(metric, self.gauges[name]))
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        ''' write render() to path - written to a temporary file first, then renamed '''
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as fh:
+            fh.write(self.render())
+        os.rename(tmp_path, path)
+
+    def serve(self, port, address='127.0.0.1'):
+        ''' serve render() on http://address:port/metrics from a background thread '''
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((address, port), Handler)
+        thread = threading.Thread(target=self._server.serve_forever, name='metrics-http')
+        thread.daemon = True
+        thread.start()
+        return self._server.server_address
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def summary(self):
+        with self._lock:
+            timings = ', '.join('{} {} in {:.1f}s'.format(h.count, name, h.sum)
+                                for name, h in sorted(self.histograms.items()) if h.count)
+            counters = ', '.join('{} {}'.format(count, name)
+                                 for name, count in sorted(self.counters.items()))
+            counters += ', {} failed'.format(self.gauges['failed'])
+        return 'metrics: {} - {}'.format(counters, timings or 'nothing timed')
+
+
+def log_device(device_name, status, elapsed=None, **fields):
+    '''
+    the one log line of a device:
+    {"event": "device", "device": "ACC1", "status": "visited", "elapsed": 1.234, ...}
+    '''
+    record = dict(event='device', device=device_name, status=status,
+                  elapsed=round(elapsed, 3) if elapsed is not None else None)
+    record.update(fields)
+    print(json.dumps(record, default=str))
+
+
+# shared by everything that records a metric
+metrics = Metrics()
@@ -0,0 +1,119 @@
+''' Parser classes by device_class, imported the first time they are needed.
+
+    The built-in parsers are listed below as 'module:Class' within this
+    package. Parsers from other packages are found through the
+    'network_discovery.parsers' entry point group, named by the
+    device_class they handle:
+
+        [options.entry_points]
+        network_discovery.parsers =
+            hp_procurve = my_parsers.procurve:ProcurveParser
+
+    Entry points are only looked at when a device_class has no built-in
+    parser, and a parser module is only imported when the first device of
+    its class is visited - a crawl of an all-Cisco network never imports
+    the Arista or Junos parsers. summary() reports which classes were
+    loaded and how long each import took.
+'''
+import importlib
+import threading
+import time
+
+ENTRY_POINT_GROUP = 'network_discovery.parsers'
+
+BUILTIN_PARSERS = {
+    'cisco_ios': '.cisco:CiscoIosParser',
+    'cisco_nxos': '.cisco:CiscoNxosParser',
+    'arista_eos': '.arista:AristaEosParser',
+    'juniper_junos': '.juniper:JunosParser',
+}
+
+
+def _entry_points(group):
+    ''' {name: entry point} of an entry point group '''
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return {}
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group)
+    else:
+        eps = eps.get(group, [])
+    return dict((ep.name, ep) for ep in eps)
+
+
+class ParserRegistry(object):
+
+    def __init__(self, parsers=None, group=ENTRY_POINT_GROUP):
+        '''
+        parsers - {device_class: 'module:Class' or class}, BUILTIN_PARSERS by default
+        group - entry point group to look in for the other device classes
+        '''
+        self._specs = dict(BUILTIN_PARSERS if parsers is None else parsers)
+        self.group = group
+        self._entry_points = None
+        self._classes = {}
+        # device_class -> seconds its import took
+        self.import_times = {}
+        self._lock = threading.Lock()
+
+    def register(self, device_class, parser):
+        ''' parser - a parser class, or 'module:Class' to import when needed '''
+        with self._lock:
+            self._specs[device_class] = parser
+            self._classes.pop(device_class, None)
+
+    def get(self, device_class):
+        ''' parser class for device_class, or None if there is none '''
+        parser = self._classes.get(device_class)
+        if parser is not None:
+            return parser
+        with self._lock:
+            if device_class not in self._classes:
+                self._classes[device_class] = self._load(device_class)
+            return self._classes[device_class]
+
+    def _load(self, device_class):
+        spec = self._specs.get(device_class)
+        if spec is None:
+            if self._entry_points is None:
+                self._entry_points = _entry_points(self.group) if self.group else {}
+            spec = self._entry_points.get(device_class)
+            if spec is None:
+                return None
+        if isinstance(spec, type):
+            return spec
+
+        start = time.time()
+        try:
+            if isinstance(spec, str):
+                module_name, _, attr = spec.partition(':')
+                module = importlib.import_module(module_name, package=__package__)
+                parser = getattr(module, attr)
+            else:
+                parser = spec.load()
+        except Exception as e:
+            print('Failed to load the parser for {} ({}) - {}'.format(device_class, spec, e))
+            return None
+        self.import_times[device_class] = time.time() - start
+        return parser
+
+    def loaded(self):
+        ''' {device_class: parser class} of every class loaded so far '''
+        with self._lock:
+            return dict((device_class, parser) for device_class, parser in self._classes.items()
+                        if parser is not None)
+
+    def summary(self):
+        loaded = self.loaded()
+        if not loaded:
+            return 'no parsers loaded'
+        return 'parsers loaded: ' + ', '.join(
+            '{} ({}.{}, {:.1f}ms)'.format(device_class, parser.__module__, parser.__name__,
+                                         1000 * self.import_times.get(device_class, 0))
+            for device_class, parser in sorted(loaded.items()))
+
+
+# shared by everything that needs a parser
+registry = ParserRegistry()
@@ -0,0 +1,308 @@
+''' Per-device SSH session pool.
+
+    Setting up an SSH session (key exchange, auth, prompt detection) is the
+    most expensive part of visiting a device. The pool keeps one session
+    per device open so that discovery, facts and any later commands reuse
+    the same authenticated channel.
+
+    - a session is checked out by one parser at a time
+    - sessions idle for longer than `idle_timeout` are closed
+    - pooled sessions are health checked before being handed out again
+    - at most `max_sessions` sessions are open at once. When the limit is
+      reached the least recently used idle session is closed, otherwise
+      acquire() blocks until a session is released.
+
+    Every new session counts as a handshake. stats() reports handshake
+    count and time per device, so it is easy to check that each device was
+    only logged into once per crawl.
+
+    Running hundreds of sessions at once trips AAA/TACACS throttling and
+    exhausts VTY lines when they all land on the same block of devices.
+    Two more limits keep a wide crawl polite:
+
+    - at most `max_per_group` sessions open at once per group of devices,
+      idle pooled ones included, as they hold a VTY line all the same. The
+      least recently used idle session of the group is closed to make
+      room. group_of(device_name, address) names the group - by default
+      the /24 of the device's address (see group_by)
+    - new logins (not reused sessions) take a token from a bucket refilled
+      at `login_rate` per second, holding at most `login_burst`
+'''
+from collections import Counter
+import ipaddress
+import re
+import threading
+import time
+
+from .metrics import metrics
+
+
+class SessionStats(object):
+
+    def __init__(self):
+        self.handshakes = 0
+        self.handshake_time = 0.0
+        self.reuses = 0
+
+
+class TokenBucket(object):
+    ''' rate tokens per second, at most burst of them saved up '''
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or 1)
+        self.tokens = self.burst
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def take(self):
+        ''' wait for a token and take it - returns the seconds waited '''
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def group_by(prefix=24, site_regex=None):
+    '''
+    group_of function for SessionPool: the site of the device if
+    site_regex matches its name (group 1, or the whole match), otherwise the
+    /prefix subnet of its IPv4/IPv6 address. None - no group - when
+    neither is known.
+    '''
+    site_re = re.compile(site_regex, re.IGNORECASE) if site_regex else None
+
+    def group_of(device_name, address=None):
+        if site_re:
+            match = site_re.search(device_name)
+            if match:
+                return 'site:' + (match.group(1) if site_re.groups else match.group(0)).upper()
+        if address:
+            try:
+                ip = ipaddress.ip_address(address)
+            except ValueError:
+                return None
+            bits = prefix if ip.version == 4 else min(128, prefix + 96)
+            return str(ipaddress.ip_network('{}/{}'.format(ip, bits), strict=False))
+        return None
+
+    return group_of
+
+
+class _Session(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.in_use = False
+        self.last_used = time.time()
+
+
+class SessionPool(object):
+
+    def __init__(self, max_sessions=64, idle_timeout=300, health_check=True,
+                 max_per_group=None, group_of=None, login_rate=None, login_burst=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.max_per_group = max_per_group
+        self.group_of = group_of or group_by()
+        self.login_bucket = TokenBucket(login_rate, login_burst) if login_rate else None
+        self._sessions = {}
+        self._stats = {}
+        # devices currently being connected to count against max_sessions
+        self._opening = 0
+        # sessions open or being opened per group, and the group of every
+        # device that has one
+        self._group_open = Counter()
+        self._device_group = {}
+        self._cond = threading.Condition()
+
+    def acquire(self, device_name, factory, address=None):
+        '''
+        return an open session to device_name, reusing the pooled one if
+        there is one. factory() must return a new, connected session.
+        address - IP address of the device, to find its group by
+        '''
+        start = time.time()
+        group = self.group_of(device_name, address) if self.max_per_group else None
+        # sessions to close once the lock is released
+        stale = []
+        with self._cond:
+            stale.extend(self._reap_idle())
+
+            while True:
+                session = self._sessions.get(device_name)
+                if session and not session.in_use:
+                    session.in_use = True
+                    break
+                if session:
+                    # checked out by someone else - wait for it
+                    self._cond.wait()
+                    continue
+                if group is not None and self._group_open[group] >= self.max_per_group:
+                    stale.extend(self._evict_one(group))
+                    if self._group_open[group] >= self.max_per_group:
+                        self._cond.wait()
+                        continue
+                if self._open_count() >= self.max_sessions:
+                    stale.extend(self._evict_one())
+                if self._open_count() < self.max_sessions:
+                    self._opening += 1
+                    if group is not None:
+                        self._group_open[group] += 1
+                        self._device_group[device_name] = group
+                    session = None
+                    break
+                self._cond.wait()
+
+        for name, conn in stale:
+            self._close_conn(name, conn)
+
+        if session:
+            if not self.health_check or self._is_alive(session.conn):
+                with self._cond:
+                    self._device_stats(device_name).reuses += 1
+                return session.conn
+            # dead session - drop it and open a new one in its place
+            self._close_conn(device_name, session.conn)
+            with self._cond:
+                del self._sessions[device_name]
+                self._opening += 1
+
+        try:
+            if self.login_bucket:
+                self.login_bucket.take()
+            metrics.observe('session_wait', time.time() - start)
+            start = time.time()
+            conn = factory()
+            elapsed = time.time() - start
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._release_group(device_name)
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._opening -= 1
+            stats = self._device_stats(device_name)
+            stats.handshakes += 1
+            stats.handshake_time += elapsed
+            session = _Session(conn)
+            session.in_use = True
+            self._sessions[device_name] = session
+
+        return conn
+
+    def release(self, device_name):
+        ''' hand a session back to the pool, leaving it open '''
+        with self._cond:
+            session = self._sessions.get(device_name)
+            if session:
+                session.in_use = False
+                session.last_used = time.time()
+            self._cond.notify_all()
+
+    def close(self, device_name):
+        ''' close the session to device_name, if any '''
+        with self._cond:
+            session = self._sessions.pop(device_name, None)
+            if session:
+                self._release_group(device_name)
+            self._cond.notify_all()
+        if session:
+            self._close_conn(device_name, session.conn)
+
+    def close_all(self):
+        with self._cond:
+            sessions = list(self._sessions.items())
+            self._sessions.clear()
+            for device_name, _ in sessions:
+                self._release_group(device_name)
+            self._cond.notify_all()
+        for device_name, session in sessions:
+            self._close_conn(device_name, session.conn)
+
+    def stats(self):
+        ''' return {device_name: SessionStats} '''
+        with self._cond:
+            return dict(self._stats)
+
+    def summary(self):
+        stats = self.stats()
+        handshakes = sum(s.handshakes for s in stats.values())
+        handshake_time = sum(s.handshake_time for s in stats.values())
+        reuses = sum(s.reuses for s in stats.values())
+        repeated = sorted(name for name, s in stats.items() if s.handshakes > 1)
+        return dict(devices=len(stats),
+                    handshakes=handshakes,
+                    handshake_time=handshake_time,
+                    reuses=reuses,
+                    repeated_handshakes=repeated)
+
+    def _device_stats(self, device_name):
+        stats = self._stats.get(device_name)
+        if stats is None:
+            stats = self._stats[device_name] = SessionStats()
+        return stats
+
+    def _release_group(self, device_name):
+        ''' called with the lock held '''
+        group = self._device_group.pop(device_name, None)
+        if group is not None:
+            self._group_open[group] -= 1
+            if not self._group_open[group]:
+                del self._group_open[group]
+
+    def _open_count(self):
+        return len(self._sessions) + self._opening
+
+    def _evict_one(self, group=None):
+        '''
+        drop the least recently used idle session (of group, if given) from
+        the pool. Called with the lock held - returns [(device_name, conn)]
+        for the caller to close.
+        '''
+        idle = [(s.last_used, name) for name, s in self._sessions.items()
+                if not s.in_use and (group is None or self._device_group.get(name) == group)]
+        if not idle:
+            return []
+        _, device_name = min(idle)
+        self._release_group(device_name)
+        return [(device_name, self._sessions.pop(device_name).conn)]
+
+    def _reap_idle(self):
+        '''
+        drop sessions idle for longer than idle_timeout. Called with the lock
+        held - returns [(device_name, conn)] for the caller to close.
+        '''
+        if not self.idle_timeout:
+            return []
+        cutoff = time.time() - self.idle_timeout
+        idle = [device_name for device_name, session in self._sessions.items()
+                if not session.in_use and session.last_used < cutoff]
+        for device_name in idle:
+            self._release_group(device_name)
+        return [(device_name, self._sessions.pop(device_name).conn) for device_name in idle]
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            return conn.is_alive()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_conn(device_name, conn):
+        try:
+            conn.disconnect()
+        except Exception as e:
+            print('Failed to disconnect from {} - {}'.format(device_name, e))
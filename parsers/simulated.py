@@ -0,0 +1,606 @@
+''' Simulated SSH backend, to run the crawl without live gear.
+
+    BaseParser.open_session() gets its SSH connection class from
+    parsers.base.ssh_dispatcher, which is netmiko.ssh_dispatcher unless a
+    simulated network is installed:
+
+        network = SimulatedNetwork(links, device_classes)
+        with network.installed():
+            ... crawl as usual - every "SSH session" is a SimulatedConnection
+
+    SimulatedNetwork generates the outputs the Cisco parsers send commands
+    for ('show cdp neigh detail', 'show version', the NX-OS '| xml'
+    outputs and the incremental probes) from an adjacency map of
+    {device name: {local interface: (remote name, remote interface)}}.
+    RecordedNetwork serves outputs captured from real devices instead.
+
+    Latency and failures are injected per command:
+
+    - command_latency - {command: seconds} the device takes to run a
+      command, default_latency for the rest, scaled per device so a
+      slow_fraction of the devices are slow_factor times slower
+    - round_trip_latency - added to every exchange with the device: a
+      send_command(), find_prompt(), or a batch of commands written at once
+    - delay_padding - seconds send_command() waits on top per unit of
+      delay_factor, the way netmiko keeps polling the channel
+    - unreachable_fraction - devices that always fail to connect
+    - connect_failure_rate / command_failure_rate - chance that a single
+      login or command fails. The rolls are derived from the seed, the
+      device, the command and the attempt number, so a run fails the same
+      way every time, whatever the thread scheduling.
+    - aaa_rate - logins per second the AAA server takes. Attempts over it
+      (in any one second) fail with an authentication error
+    - block_sessions - sessions a /24 block of devices holds at once. Logins
+      over it fail as if the devices were out of VTY lines
+'''
+from collections import deque
+from contextlib import contextmanager
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zlib
+
+import netmiko
+
+from . import base
+
+IOS_VERSION = ('Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), '
+               'Version 15.0(2)SE4, RELEASE SOFTWARE (fc1)')
+NXOS_VERSION = 'Cisco Nexus Operating System (NX-OS) Software, Version 7.0(3)I7(5)'
+
+IOS_CDP_RECORD = '''-------------------------
+Device ID: {name}.example.com
+Entry address(es):
+  IP address: {ip}
+Platform: cisco {model},  Capabilities: Switch IGMP
+Interface: {local_long},  Port ID (outgoing port): {remote_long}
+Holdtime : 150 sec
+
+Version :
+{version}
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2013 by Cisco Systems, Inc.
+
+advertisement version: 2
+Native VLAN: 1
+Duplex: full
+Management address(es):
+  IP address: {ip}
+
+'''
+
+NXOS_CDP_RECORD = '''----------------------------------------
+Device ID:{name}({serial})
+System Name: {name}
+
+Interface address(es):
+    IPv4 Address: {ip}
+Platform: {model}, Capabilities: Router Switch IGMP Filtering Supports-STP-Dispute
+Interface: {local_long}, Port ID (outgoing port): {remote_long}
+Holdtime: 170 sec
+
+Version:
+{version}
+
+Advertisement Version: 2
+
+Native VLAN: 1
+Duplex: full
+
+MTU: 9216
+Mgmt address(es):
+    IPv4 Address: {ip}
+
+'''
+
+IOS_SHOW_VERSION = '''{version}
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2013 by Cisco Systems, Inc.
+Compiled Wed 26-Jun-13 02:49 by prod_rel_team
+
+ROM: Bootstrap program is C3750E boot loader
+BOOTLDR: C3750E Boot Loader (C3750X-HBOOT-M) Version 12.2(58r)SE, RELEASE SOFTWARE (fc1)
+
+{name} uptime is {weeks} weeks, {days} days, {hours} hours, {minutes} minutes
+System returned to ROM by power-on
+System image file is "flash:c3750e-universalk9-mz.150-2.SE4.bin"
+
+cisco {model} (PowerPC405) processor (revision W0) with 262144K bytes of memory.
+Processor board ID {serial}
+Last reset from power-on
+1 Virtual Ethernet interface
+52 Gigabit Ethernet interfaces
+4 Ten Gigabit Ethernet interfaces
+
+512K bytes of flash-simulated non-volatile configuration memory.
+Base ethernet MAC Address       : 00:1E:BD:00:00:01
+Model number                    : {model}
+System serial number            : {serial}
+
+Configuration register is 0xF
+'''
+
+NXOS_XML_HEADER = ('<?xml version="1.0" encoding="ISO-8859-1"?>\n'
+                   '<nf:rpc-reply xmlns:nf="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                   'xmlns="http://www.cisco.com/nxos:1.0:{ns}">\n'
+                   ' <nf:data>\n')
+NXOS_XML_FOOTER = ' </nf:data>\n</nf:rpc-reply>\n]]>]]>\n'
+
+NXOS_SHOW_VERSION_XML = '''  <show>
+   <version>
+    <__XML__OPT_Cmd_sysmgr_show_version___readonly__>
+     <__readonly__>
+      <header_str>Cisco Nexus Operating System (NX-OS) Software</header_str>
+      <bios_ver_str>07.59</bios_ver_str>
+      <kickstart_ver_str>7.0(3)I7(5)</kickstart_ver_str>
+      <bios_cmpl_time>08/26/2016</bios_cmpl_time>
+      <kick_file_name>bootflash:///nxos.7.0.3.I7.5.bin</kick_file_name>
+      <chassis_id>Nexus9000 {model} chassis</chassis_id>
+      <cpu_name>Intel(R) Xeon(R) CPU  @ 1.80GHz</cpu_name>
+      <memory>16400084</memory>
+      <mem_type>kB</mem_type>
+      <proc_board_id>{serial}</proc_board_id>
+      <host_name>{name}</host_name>
+      <kern_uptm_days>{total_days}</kern_uptm_days>
+      <kern_uptm_hrs>{hours}</kern_uptm_hrs>
+      <kern_uptm_mins>{minutes}</kern_uptm_mins>
+      <kern_uptm_secs>{seconds}</kern_uptm_secs>
+     </__readonly__>
+    </__XML__OPT_Cmd_sysmgr_show_version___readonly__>
+   </version>
+  </show>
+'''
+
+NXOS_INVENTORY_ROW = '''        <ROW_inv>
+         <name>"{slot}"</name>
+         <desc>"{desc}"</desc>
+         <productid>{productid}</productid>
+         <vendorid>V02</vendorid>
+         <serialnum>{serial}</serialnum>
+        </ROW_inv>
+'''
+
+NXOS_INVENTORY_XML = '''  <show>
+   <inventory>
+    <__XML__OPT_Cmd_show_inv___readonly__>
+     <__readonly__>
+      <TABLE_inv>
+{rows}      </TABLE_inv>
+     </__readonly__>
+    </__XML__OPT_Cmd_show_inv___readonly__>
+   </inventory>
+  </show>
+'''
+
+NXOS_SHOW_VERSION = '''{version}
+Software
+  BIOS: version 07.59
+  NXOS: version 7.0(3)I7(5)
+
+Hardware
+  cisco Nexus9000 {model} chassis
+  Processor Board ID {serial}
+
+  Device name: {name}
+
+Kernel uptime is {total_days} day(s), {hours} hour(s), {minutes} minute(s), {seconds} second(s)
+'''
+
+MODELS = {'cisco_ios': 'WS-C3750X-48P', 'cisco_nxos': 'N9K-C93180YC-EX'}
+INTERFACE_NAMES = {'Gig': 'GigabitEthernet', 'Ten': 'TenGigabitEthernet',
+                   'Eth': 'Ethernet', 'Fa': 'FastEthernet'}
+
+# the part of a command before the first pipe, and the pipes
+PIPE = re.compile(r'\s*\|\s*')
+
+
+def long_interface_name(intf):
+    ''' Eth1/1 -> Ethernet1/1, the way CDP spells it '''
+    match = re.match(r'([A-Za-z]+)(.*)', intf)
+    if match and match.group(1) in INTERFACE_NAMES:
+        return INTERFACE_NAMES[match.group(1)] + match.group(2)
+    return intf
+
+
+def apply_filters(output, filters):
+    ''' the '| include X' / '| exclude X' part of a command '''
+    for filter_ in filters:
+        action, _, pattern = filter_.partition(' ')
+        pattern = pattern.strip().strip('"')
+        if action in ('include', 'inc', 'i'):
+            output = '\n'.join(l for l in output.splitlines() if re.search(pattern, l))
+        elif action in ('exclude', 'exc', 'e'):
+            output = '\n'.join(l for l in output.splitlines() if not re.search(pattern, l))
+    return output
+
+
+def record_file_name(command):
+    ''' file a recorded command output is stored in - 'show version' -> show_version.txt '''
+    return re.sub(r'[^\w\-]+', '_', command).strip('_') + '.txt'
+
+
+class SimulatedConnection(object):
+    '''
+    stands in for a netmiko connection. Logging in (the constructor) and
+    every command sleep for the network's latency and may fail.
+
+    Besides send_command() it has the channel level calls used to send a
+    batch of commands at once (see BaseParser.send_batch): write_channel()
+    queues the replies, and read_until_pattern() hands them back one at a
+    time once the device would have sent them.
+    '''
+
+    def __init__(self, network, device_type, ip=None, username=None, password=None, **kwargs):
+        self.network = network
+        self.device_type = device_type
+        ip = network.resolve(ip)
+        self.host = ip
+        self.prompt = '{}#'.format(ip)
+        self.alive = False
+        # (time the reply is complete, reply or None if the command fails)
+        self._replies = deque()
+        network.login(ip)
+        self.alive = True
+
+    def _check_alive(self):
+        if not self.alive:
+            raise IOError('Socket is closed')
+
+    def send_command(self, command_string, delay_factor=None, read_timeout=None, **kwargs):
+        self._check_alive()
+        network = self.network
+        seconds, output = network.execute(self.host, command_string)
+        seconds += network.round_trip_latency
+        if read_timeout is None:
+            seconds += network.delay_padding * float(delay_factor or 1)
+        elif seconds > read_timeout:
+            time.sleep(read_timeout)
+            raise base.ReadTimeout('Pattern not detected in output: {}'.format(command_string))
+        time.sleep(seconds)
+        if output is None:
+            raise IOError('Search pattern never detected in send_command: {}'.format(command_string))
+        return output
+
+    def find_prompt(self):
+        self._check_alive()
+        time.sleep(self.network.round_trip_latency)
+        return self.prompt
+
+    def write_channel(self, data):
+        self._check_alive()
+        ready = time.time() + self.network.round_trip_latency
+        for command in data.splitlines():
+            if not command.strip():
+                continue
+            seconds, output = self.network.execute(self.host, command)
+            ready += seconds
+            reply = None if output is None else '{}\n{}\n{}'.format(command, output, self.prompt)
+            self._replies.append((ready, reply))
+
+    def read_until_pattern(self, pattern='', read_timeout=10.0, **kwargs):
+        self._check_alive()
+        ready, reply = self._replies.popleft() if self._replies else (None, None)
+        # a hung command - the prompt never comes back - or one that takes
+        # longer than read_timeout
+        if reply is None or ready - time.time() > read_timeout:
+            time.sleep(read_timeout)
+            raise base.ReadTimeout('Pattern not detected: {!r} in output.'.format(pattern))
+        time.sleep(max(0.0, ready - time.time()))
+        return reply
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        if self.alive:
+            self.network.logout(self.host)
+        self.alive = False
+
+
+class BaseNetwork(object):
+    ''' latency and failure injection shared by the simulated networks '''
+
+    def __init__(self, seed=1, handshake_latency=0.0, command_latency=None,
+                 default_latency=0.0, round_trip_latency=0.0, delay_padding=0.0,
+                 slow_fraction=0.0, slow_factor=10.0,
+                 unreachable_fraction=0.0, connect_failure_rate=0.0,
+                 command_failure_rate=0.0, aaa_rate=None, block_sessions=None):
+        self.seed = seed
+        self.handshake_latency = handshake_latency
+        self.command_latency = command_latency or {}
+        self.default_latency = default_latency
+        self.round_trip_latency = round_trip_latency
+        self.delay_padding = delay_padding
+        self.slow_fraction = slow_fraction
+        self.slow_factor = slow_factor
+        self.unreachable_fraction = unreachable_fraction
+        self.connect_failure_rate = connect_failure_rate
+        self.command_failure_rate = command_failure_rate
+        self.aaa_rate = aaa_rate
+        self.block_sessions = block_sessions
+
+        self.logins = 0
+        # logins refused by aaa_rate or block_sessions
+        self.throttled = 0
+        self._login_times = deque()
+        self._block_sessions = {}
+        self.commands = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    # outputs
+
+    def has_device(self, device_name):
+        raise NotImplementedError
+
+    def resolve(self, host):
+        ''' the device host stands for, as DNS would - its name or FQDN '''
+        if not self.has_device(host):
+            name = host.split('.', 1)[0]
+            if self.has_device(name):
+                return name
+        return host
+
+    def output(self, device_name, command):
+        ''' output of command on device_name, filters (pipes) included '''
+        raise NotImplementedError
+
+    # injection
+
+    def _roll(self, *key):
+        ''' repeatable number in [0, 1) for key '''
+        return zlib.crc32('{}:{}'.format(self.seed, key).encode()) / 2.0 ** 32
+
+    def _attempt(self, device_name, what):
+        ''' how many times `what` was tried on device_name before '''
+        with self._lock:
+            attempt = self._attempts.get((device_name, what), 0)
+            self._attempts[(device_name, what)] = attempt + 1
+        if multiprocessing.parent_process() is not None:
+            # a worker process starts from its parent's counts, as do the
+            # workers started for a retry - tell their attempts apart
+            return (os.getpid(), attempt)
+        return attempt
+
+    def speed(self, device_name):
+        ''' latency multiplier of a device '''
+        return self.slow_factor if self._roll(device_name, 'slow') < self.slow_fraction else 1.0
+
+    def block(self, device_name):
+        ''' the /24 the device is in, None if it has no address '''
+        return None
+
+    def is_unreachable(self, device_name):
+        return self._roll(device_name, 'unreachable') < self.unreachable_fraction
+
+    def latency(self, device_name, command):
+        base_command = PIPE.split(command)[0]
+        latency = self.command_latency.get(command, self.command_latency.get(
+            base_command, self.default_latency))
+        return latency * self.speed(device_name)
+
+    def login(self, device_name):
+        attempt = self._attempt(device_name, 'login')
+        with self._lock:
+            self.logins += 1
+        time.sleep(self.handshake_latency * self.speed(device_name))
+
+        if not self.has_device(device_name) or self.is_unreachable(device_name):
+            raise netmiko.NetMikoTimeoutException(
+                'Connection to device timed-out: {}:22'.format(device_name))
+        if self._roll(device_name, 'login', attempt) < self.connect_failure_rate:
+            raise netmiko.NetMikoTimeoutException(
+                'Connection to device timed-out: {}:22'.format(device_name))
+        self._admit(device_name)
+
+    def _admit(self, device_name):
+        ''' apply aaa_rate and block_sessions to a login '''
+        block = self.block(device_name)
+        with self._lock:
+            if self.aaa_rate:
+                now = time.time()
+                while self._login_times and self._login_times[0] < now - 1:
+                    self._login_times.popleft()
+                self._login_times.append(now)
+                if len(self._login_times) > self.aaa_rate:
+                    self.throttled += 1
+                    raise netmiko.NetMikoAuthenticationException(
+                        'Authentication to device failed: {} - AAA server busy'.format(device_name))
+            if self.block_sessions and block is not None:
+                if self._block_sessions.get(block, 0) >= self.block_sessions:
+                    self.throttled += 1
+                    raise netmiko.NetMikoTimeoutException(
+                        'Connection to device timed-out: {}:22 - no VTY line free'.format(device_name))
+                self._block_sessions[block] = self._block_sessions.get(block, 0) + 1
+
+    def logout(self, device_name):
+        block = self.block(device_name)
+        if self.block_sessions and block is not None:
+            with self._lock:
+                self._block_sessions[block] -= 1
+
+    def execute(self, device_name, command):
+        '''
+        run command on device_name - returns (seconds the device takes,
+        output), output being None if this attempt fails
+        '''
+        attempt = self._attempt(device_name, command)
+        with self._lock:
+            self.commands += 1
+        seconds = self.latency(device_name, command)
+        if self._roll(device_name, command, attempt) < self.command_failure_rate:
+            return seconds, None
+        return seconds, self.output(device_name, command)
+
+    # installing the backend
+
+    def dispatcher(self, device_type):
+        ''' drop-in for netmiko.ssh_dispatcher '''
+        network = self
+
+        def connection_class(**kwargs):
+            return SimulatedConnection(network, device_type, **kwargs)
+        return connection_class
+
+    @contextmanager
+    def installed(self):
+        ''' send every SSH session opened by the parsers to this network '''
+        previous = base.ssh_dispatcher
+        base.ssh_dispatcher = self.dispatcher
+        try:
+            yield self
+        finally:
+            base.ssh_dispatcher = previous
+
+
+class SimulatedNetwork(BaseNetwork):
+    '''
+    generated outputs for a topology
+
+    links - {device name: {local interface: (remote name, remote interface)}}
+    device_classes - {device name: 'cisco_ios' or 'cisco_nxos'}, default cisco_ios
+    json_output - whether NX-OS answers '| json', as 6.x and later do
+    '''
+
+    def __init__(self, links, device_classes=None, json_output=True, **kwargs):
+        super(SimulatedNetwork, self).__init__(**kwargs)
+        self.links = links
+        self.device_classes = device_classes or {}
+        self.json_output = json_output
+        self.index = dict((name, i) for i, name in enumerate(sorted(links)))
+
+    def has_device(self, device_name):
+        return device_name in self.links
+
+    def device_class(self, device_name):
+        return self.device_classes.get(device_name, 'cisco_ios')
+
+    def block(self, device_name):
+        i = self.index.get(device_name)
+        return None if i is None else '10.{}.{}.0/24'.format(i // 65536, i // 256 % 256)
+
+    def details(self, device_name):
+        ''' the made up facts of a device '''
+        i = self.index[device_name]
+        device_class = self.device_class(device_name)
+        uptime = int(self._roll(device_name, 'uptime') * 400 * 86400) + 600
+        return dict(name=device_name,
+                    ip='10.{}.{}.{}'.format(i // 65536, i // 256 % 256, i % 256),
+                    serial='FOX{:08d}'.format(i),
+                    model=MODELS.get(device_class, MODELS['cisco_ios']),
+                    version=NXOS_VERSION if device_class == 'cisco_nxos' else IOS_VERSION,
+                    uptime=uptime,
+                    total_days=uptime // 86400,
+                    weeks=uptime // 604800,
+                    days=uptime // 86400 % 7,
+                    hours=uptime // 3600 % 24,
+                    minutes=uptime // 60 % 60,
+                    seconds=uptime % 60)
+
+    def cdp_record(self, device_name, local_intf, remote_name, remote_intf):
+        ''' how device_name sees remote_name in its 'show cdp neigh detail' '''
+        details = self.details(remote_name)
+        if self.device_class(remote_name) == 'cisco_nxos':
+            record = NXOS_CDP_RECORD
+        else:
+            record = IOS_CDP_RECORD
+        if self.device_class(device_name) == 'cisco_nxos':
+            # NX-OS prints the separator of its own flavour
+            record = '-' * 40 + record[record.index('\n'):]
+        return record.format(local_long=long_interface_name(local_intf),
+                             remote_long=long_interface_name(remote_intf), **details)
+
+    def inventory_rows(self, device_name):
+        ''' 'show inventory' of an NX-OS device - the chassis and two power supplies '''
+        details = self.details(device_name)
+        rows = [dict(slot='Chassis', desc='Nexus9000 Chassis',
+                     productid=details['model'], serial=details['serial'])]
+        rows += [dict(slot='Power Supply {}'.format(n), desc='Nexus9000 PSU',
+                      productid='NXA-PAC-650W',
+                      serial='LIT{:08d}'.format(self.index[device_name] * 2 + n))
+                 for n in (1, 2)]
+        return rows
+
+    def output(self, device_name, command):
+        parts = PIPE.split(command.strip())
+        base_command, filters = parts[0], parts[1:]
+        xml, json_ = 'xml' in filters, 'json' in filters
+        filters = [f for f in filters if f not in ('xml', 'json')]
+
+        details = self.details(device_name)
+        nxos = self.device_class(device_name) == 'cisco_nxos'
+        if json_ and not (nxos and self.json_output):
+            return "% Invalid command at '^' marker."
+
+        if base_command.startswith('show cdp neigh'):
+            output = ''.join(self.cdp_record(device_name, local_intf, remote, remote_intf)
+                             for local_intf, (remote, remote_intf)
+                             in sorted(self.links[device_name].items()))
+        elif base_command == 'show version' and json_:
+            output = json.dumps(dict(
+                header_str='Cisco Nexus Operating System (NX-OS) Software',
+                kickstart_ver_str='7.0(3)I7(5)', proc_board_id=details['serial'],
+                host_name=device_name, chassis_id='Nexus9000 {} chassis'.format(details['model']),
+                kern_uptm_days=details['total_days'], kern_uptm_hrs=details['hours'],
+                kern_uptm_mins=details['minutes'], kern_uptm_secs=details['seconds']))
+        elif base_command == 'show inventory' and json_:
+            rows = [dict(name=row['slot'], desc=row['desc'], productid=row['productid'],
+                         vendorid='V02', serialnum=row['serial'])
+                    for row in self.inventory_rows(device_name)]
+            output = json.dumps(dict(TABLE_inv=dict(ROW_inv=rows)))
+        elif base_command == 'show version' and xml and nxos:
+            output = (NXOS_XML_HEADER.format(ns='sysmgrcli') +
+                      NXOS_SHOW_VERSION_XML.format(**details) + NXOS_XML_FOOTER)
+        elif base_command == 'show version':
+            output = (NXOS_SHOW_VERSION if nxos else IOS_SHOW_VERSION).format(**details)
+        elif base_command == 'show inventory' and xml and nxos:
+            rows = [NXOS_INVENTORY_ROW.format(**row) for row in self.inventory_rows(device_name)]
+            output = (NXOS_XML_HEADER.format(ns='sysmgrcli') +
+                      NXOS_INVENTORY_XML.format(rows=''.join(rows)) + NXOS_XML_FOOTER)
+        else:
+            return "% Invalid input detected at '^' marker."
+
+        return apply_filters(output, filters)
+
+
+class RecordedNetwork(BaseNetwork):
+    '''
+    outputs captured from real devices, one directory per device and one
+    file per command (see record_file_name):
+
+        directory/RTR1/show_cdp_neigh_detail.txt
+        directory/RTR1/show_version.txt
+
+    The file of the full command, pipes included, is used if there is
+    one, otherwise the pipes are applied to the file of the base command.
+    '''
+
+    def __init__(self, directory, **kwargs):
+        super(RecordedNetwork, self).__init__(**kwargs)
+        self.directory = directory
+        self.devices = set(name for name in os.listdir(directory)
+                           if os.path.isdir(os.path.join(directory, name)))
+
+    def has_device(self, device_name):
+        return device_name in self.devices
+
+    def _read(self, device_name, command):
+        path = os.path.join(self.directory, device_name, record_file_name(command))
+        if not os.path.exists(path):
+            return None
+        with open(path) as fh:
+            return fh.read()
+
+    def output(self, device_name, command):
+        output = self._read(device_name, command)
+        if output is not None:
+            return output
+        parts = PIPE.split(command.strip())
+        output = self._read(device_name, parts[0])
+        if output is None:
+            return "% Invalid input detected at '^' marker."
+        return apply_filters(output, [f for f in parts[1:] if f != 'xml'])
+
@@ -0,0 +1,51 @@
+''' Device uptime as seconds.
+
+    Every form the supported platforms print their uptime in:
+
+        IOS:   8 weeks, 2 days, 23 hours, 22 minutes
+               3 years, 1 week, 1 day, 1 hour, 1 minute
+        NX-OS: 12 day(s), 3 hour(s), 44 minute(s), 22 second(s)
+        EOS:   12 weeks, 3 days, 4 hours and 5 minutes
+        Junos: 42w1d 02:10
+
+    A number followed by a unit is counted by the first letter of the unit,
+    whatever separates it from the next one, and an h:mm[:ss] clock as
+    hours, minutes and seconds.
+'''
+from array import array
+import re
+
+UNIT_SECONDS = {'y': 52 * 604800, 'w': 604800, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+UPTIME_TOKEN = re.compile(r'(\d+):(\d\d)(?::(\d\d))?|(\d+)\s*([ywdhms])', re.IGNORECASE)
+
+
+def parse_uptime(uptime_str):
+    ''' seconds of an uptime string, None if there is no uptime in it '''
+    seconds = None
+    for hours, minutes, secs, count, unit in UPTIME_TOKEN.findall(uptime_str):
+        if unit:
+            seconds = (seconds or 0) + int(count) * UNIT_SECONDS[unit.lower()]
+        else:
+            seconds = (seconds or 0) + int(hours) * 3600 + int(minutes) * 60 + int(secs or 0)
+    return seconds
+
+
+def uptime_seconds(days=0, hours=0, minutes=0, seconds=0, weeks=0, years=0):
+    '''
+    seconds of uptime given as numbers, such as the kern_uptm_* fields of
+    NX-OS - they may come as strings out of XML
+    '''
+    return (int(years) * UNIT_SECONDS['y'] + int(weeks) * UNIT_SECONDS['w'] +
+            int(days) * UNIT_SECONDS['d'] + int(hours) * UNIT_SECONDS['h'] +
+            int(minutes) * UNIT_SECONDS['m'] + int(seconds))
+
+
+def parse_uptimes(uptime_strs, missing=-1):
+    '''
+    seconds of many uptime strings as an array of 64 bit ints, for
+    analytics over a whole inventory. Strings without an uptime (and None)
+    count as missing.
+    '''
+    seconds = (parse_uptime(uptime_str) if uptime_str else None for uptime_str in uptime_strs)
+    return array('q', (missing if value is None else value for value in seconds))
@@ -1,10 +1,18 @@
-VERSION_MAPPING = dict(
-'Cisco IOS' :
-    dict(device_class='cisco_ios', device_vendor='Cisco'),
-'Cisco Nexus' :
-    dict(device_class='cisco_nxos', device_vendor='Cisco',
-'Arista Networks':
-    dict(device_class='arista_eos', device_vendor='Arista'))
-'Juniper Networks':
-    dict(device_class='juniper_junos', device_vendor='Juniper')
-)
+from collections import namedtuple
+
+Classification = namedtuple('Classification', 'device_class device_vendor')
+
+# what a neighbor is classified as when no rule matches
+DEFAULT_CLASSIFICATION = Classification('cisco_ios', 'Cisco')
+
+# (neighbor field, regex, classification) - the regex is searched for in
+# the neighbor's field, and the first rule in the list that matches wins,
+# so put the more specific rules first. See parsers/classification.py
+CLASSIFICATION_RULES = [
+    ('os_version', r'Cisco Nexus', Classification('cisco_nxos', 'Cisco')),
+    ('os_version', r'Cisco IOS', Classification('cisco_ios', 'Cisco')),
+    ('os_version', r'Arista Networks', Classification('arista_eos', 'Arista')),
+    ('os_version', r'Juniper Networks', Classification('juniper_junos', 'Juniper')),
+    # neighbors that don't send a version string
+    ('device_model', r'^N\d+K-', Classification('cisco_nxos', 'Cisco')),
+]
@@ -0,0 +1,51 @@
+''' Pick a few fields out of NX-OS '| xml' outputs.
+
+    The facts of a Nexus are a handful of leaf elements (kickstart_ver_str,
+    proc_board_id, ...) in outputs that run to hundreds of KB on a loaded
+    7K chassis. extract_fields() feeds the output to a pull parser a chunk
+    at a time, keeps the text of the first element of each wanted tag and
+    stops parsing as soon as it has all of them. Elements are cleared as
+    soon as they are done with, so no tree of the document is built.
+
+    Optional tags, such as the kern_uptm_secs that not every release
+    prints, are kept when they come before or right after the last wanted
+    one, but never waited for - the first other element after the wanted
+    ones stops the parser.
+
+    Tags are matched without their XML namespace.
+'''
+from xml.etree.ElementTree import XMLPullParser
+
+CHUNK_SIZE = 8192
+
+
+def extract_fields(xml_output, fields, optional=(), chunk_size=CHUNK_SIZE):
+    '''
+    return {tag: text} with the first element of each tag in fields, and
+    of the tags in optional seen on the way, found in xml_output. Tags that
+    are not in the output are left out. Raises ParseError if the XML is
+    broken before all the fields were found.
+    '''
+    wanted = set(fields)
+    maybe = set(optional)
+    found = {}
+    parser = XMLPullParser(events=('end',))
+
+    for start in range(0, len(xml_output), chunk_size):
+        parser.feed(xml_output[start:start + chunk_size])
+        for _, element in parser.read_events():
+            tag = element.tag.rpartition('}')[2]
+            if tag in wanted or tag in maybe:
+                found[tag] = (element.text or '').strip()
+                wanted.discard(tag)
+                maybe.discard(tag)
+                if not wanted and not maybe:
+                    return found
+            elif not wanted:
+                # past the wanted fields - the optional ones not seen yet
+                # are not there
+                return found
+            element.clear()
+
+    return found
+